@@ -1,9 +1,15 @@
-from .base_agent import BaseAgent
-from .property_search import PropertySearchAgent
-from .amenities import AmenitiesAgent
-from .negotiation import NegotiationAgent
-from .closing import ClosingAgent
-from .orchestrator import Orchestrator
+import importlib
+
+# Agent classes are imported on first attribute access, so importing the
+# package (e.g. for the orchestrator) doesn't load every agent's dependencies
+_EXPORTS = {
+    'BaseAgent': '.base_agent',
+    'PropertySearchAgent': '.property_search',
+    'AmenitiesAgent': '.amenities',
+    'NegotiationAgent': '.negotiation',
+    'ClosingAgent': '.closing',
+    'Orchestrator': '.orchestrator'
+}
 
 __all__ = [
     'BaseAgent',
@@ -13,3 +19,9 @@ __all__ = [
     'ClosingAgent',
     'Orchestrator'
 ]
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
@@ -1,14 +1,29 @@
+import os
+from .amenity_index import format_distance, get_amenity_index
 from .base_agent import BaseAgent
-import time
-import json
+from .property_catalog import get_property_catalog
+from .schemas import AMENITIES_SCHEMA, parse_json
+
+# Catalogs up to this size get every listing's neighbourhood computed at startup
+AMENITY_PRECOMPUTE_LIMIT = int(os.getenv('AMENITY_PRECOMPUTE_LIMIT', '5000'))
+AMENITY_RADIUS_MILES = float(os.getenv('AMENITY_RADIUS_MILES', '5'))
 
 class AmenitiesAgent(BaseAgent):
+    agent_type = "amenities"
+    details_key = "amenities"
+    schema = AMENITIES_SCHEMA
+    fallback_greeting = "Hello, I'm Emma! 🌟 I love digging into neighborhoods, let's discover what's nearby."
+    
     def __init__(self, api_key):
         super().__init__(api_key)
         self.name = "Emma"
         self.emoji = "🌟"
+        self.catalog = get_property_catalog()
+        self.amenity_index = get_amenity_index()
+        if self.catalog is not None and self.amenity_index is not None and self.catalog.size <= AMENITY_PRECOMPUTE_LIMIT:
+            self.amenity_index.precompute(self.catalog.coordinates(), AMENITY_RADIUS_MILES)
         
-    def get_greeting(self) -> str:
+    def _generate_greeting(self) -> str:
         """Generate a dynamic, personalized greeting"""
         greeting_prompt = """Generate a friendly, enthusiastic greeting from Emma, the Amenities Research Specialist (use emoji 🌟).
         Make it warm and engaging, showing excitement to explore the neighborhood amenities.
@@ -17,12 +32,8 @@ class AmenitiesAgent(BaseAgent):
         response = self.generate_response(greeting_prompt)
         return response.strip()
         
-    def process(self, prompt: str) -> dict:
-        """Process user request and generate amenities information"""
-        # First, send the greeting
-        greeting = self.get_greeting()
-        time.sleep(2)  # Add a natural pause
-        
+    def _build_prompt(self, prompt: str, context: dict = None) -> str:
+        """Build the amenities research prompt"""
         # Generate the amenities response
         search_prompt = f"""As Emma, an enthusiastic Amenities Research Specialist (🌟), create a detailed response about neighborhood amenities:
 
@@ -46,18 +57,70 @@ class AmenitiesAgent(BaseAgent):
         
         Important: Generate new, unique amenities each time. Don't reference real places or websites."""
 
-        response = self.generate_response(search_prompt)
-        amenities_response = response.strip()
+        return search_prompt
         
-        # Structure the response
-        return {
-            "message": f"{greeting}\n\n{amenities_response}",
-            "details": {
-                "type": "amenities",
-                "greeting_delay": 2,
-                "amenities": self._extract_amenities_from_response(amenities_response)
-            }
-        }
+    def _lookup_details(self, prompt: str, context: dict = None):
+        """Nearest amenities per category around the property or area in question"""
+        if self.amenity_index is None:
+            return None
+        place = self._locate(prompt, context)
+        if place is None:
+            return None
+        _, latitude, longitude = place
+        summary = self.amenity_index.summary(latitude, longitude, AMENITY_RADIUS_MILES)
+        if not summary:
+            return None
+        self._count_structured("amenity_index")
+        return summary
+        
+    def _locate(self, prompt: str, context: dict = None):
+        """(name, latitude, longitude) of a listing or area named in the request, else the latest property"""
+        if self.catalog is not None:
+            row = self.catalog.find(prompt)
+            if row is not None:
+                listing = self.catalog.record(row)
+                if "latitude" in listing:
+                    return listing["name"], listing["latitude"], listing["longitude"]
+            locations = (self.catalog.parse_request(prompt) or {}).get("locations")
+            centroid = self.catalog.location_centroid(locations) if locations else None
+            if centroid is not None:
+                return ", ".join(location.title() for location in locations), centroid[0], centroid[1]
+                
+        for prop in (context or {}).get("properties", []):
+            if "latitude" in prop and "longitude" in prop:
+                return prop.get("name", "the property"), prop["latitude"], prop["longitude"]
+        return None
+        
+    def _build_narration_prompt(self, prompt: str, context: dict, details: dict) -> str:
+        """Ask Emma to describe the measured amenities without inventing any"""
+        place = self._locate(prompt, context)
+        place_name = place[0] if place else "the property"
+        amenities = "\n".join(
+            f"- {category.replace('_', ' ').title()}: " + "; ".join(
+                f"{item['name']} ({item['type']}, {item['distance']}) - {item['description']}" for item in items
+            )
+            for category, items in details.items()
+        )
+        
+        return f"""As Emma, an enthusiastic Amenities Research Specialist (🌟), describe what's near {place_name}:
+
+        {amenities}
+
+        User Request: {prompt}
+
+        Create a natural, conversational response that includes:
+        1. A brief acknowledgment of their specific interests
+        2. The amenities above grouped by category, with their distances
+        3. A few specific recommendations based on what they asked about
+        4. A follow-up question about specific amenities they're most interested in
+        
+        Make the response friendly and engaging, with occasional light humor.
+        
+        Important: Use only the amenities and distances listed above, all within {format_distance(AMENITY_RADIUS_MILES)}. Don't invent places."""
+        
+    def _extract_details(self, response: str) -> dict:
+        """Extract the structured details for this agent's response"""
+        return self._extract_amenities_from_response(response)
         
     def _extract_amenities_from_response(self, response: str) -> dict:
         """Extract and structure amenities information from the LLM response"""
@@ -82,8 +145,9 @@ class AmenitiesAgent(BaseAgent):
         Return only the JSON object with categorized amenities."""
         
         try:
-            structured_response = self.generate_response(extraction_prompt)
-            return json.loads(structured_response)
+            # Extraction is deterministic for a given response, so it is cacheable
+            structured_response = self.generate_response(extraction_prompt, cache=True)
+            return parse_json(structured_response)
         except:
             # Fallback to simple structure if JSON parsing fails
             return {
@@ -0,0 +1,194 @@
+import math
+import os
+import threading
+from collections import Counter, OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from .property_catalog import load_records
+
+DEFAULT_AMENITY_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'amenities.csv')
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LAT = 69.0
+
+
+def haversine_miles(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distances in miles from one point to arrays of points, all in degrees"""
+    lat, lon = math.radians(lat), math.radians(lon)
+    lats, lons = np.radians(lats), np.radians(lons)
+    a = np.sin((lats - lat) / 2) ** 2 + math.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(a))
+
+
+def format_distance(miles: float) -> str:
+    return f"{miles:.1f} miles"
+
+
+class AmenityIndex:
+    """Amenity locations in a uniform grid hash for radius and nearest-neighbour queries
+
+    Points are bucketed into cells roughly cell_miles on a side. A query only
+    computes haversine distances for points in the cells around it. Per-point
+    summaries are cached, so each listing's neighbourhood is computed once.
+    """
+
+    def __init__(self, records: list, cell_miles: float = None, cache_size: int = None):
+        records = [r for r in records if r.get("latitude") not in (None, "") and r.get("longitude") not in (None, "")]
+        self.size = len(records)
+        self.names = np.array([str(r.get("name", "")) for r in records], dtype=object)
+        self.types = np.array([str(r.get("type", "")) for r in records], dtype=object)
+        self.descriptions = np.array([str(r.get("description", "")) for r in records], dtype=object)
+        categories, codes = np.unique(np.array([str(r.get("category", "other")) for r in records], dtype=str),
+                                      return_inverse=True)
+        self.categories = [str(category) for category in categories]
+        self.category_codes = codes.astype(np.int32)
+        self.latitudes = np.array([float(r["latitude"]) for r in records], dtype=np.float64)
+        self.longitudes = np.array([float(r["longitude"]) for r in records], dtype=np.float64)
+
+        # Longitude cells are sized at the dataset's mean latitude, fine at metro scale
+        self.cell_miles = cell_miles or float(os.getenv('AMENITY_GRID_CELL_MILES', '1.0'))
+        reference_lat = float(self.latitudes.mean()) if self.size else 0.0
+        self._cell_lat = self.cell_miles / MILES_PER_DEGREE_LAT
+        self._cell_lon = self.cell_miles / (MILES_PER_DEGREE_LAT * max(math.cos(math.radians(reference_lat)), 0.01))
+        self._grid = self._build_grid()
+
+        self.cache_size = cache_size or int(os.getenv('AMENITY_SUMMARY_CACHE_SIZE', '4096'))
+        self._summaries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    @classmethod
+    def load(cls, path: str) -> "AmenityIndex":
+        """Load amenities (name, category, type, latitude, longitude, description) from a file"""
+        return cls(load_records(path, "amenities"))
+
+    def within_radius(self, lat: float, lon: float, radius_miles: float, category: str = None) -> tuple:
+        """(rows, distances) of amenities within the radius, nearest first"""
+        rows = self._candidates(lat, lon, math.ceil(radius_miles / self.cell_miles))
+        rows = self._in_category(rows, category)
+        distances = haversine_miles(lat, lon, self.latitudes[rows], self.longitudes[rows])
+        keep = distances <= radius_miles
+        rows, distances = rows[keep], distances[keep]
+        order = np.argsort(distances, kind="stable")
+        return rows[order], distances[order]
+
+    def nearest(self, lat: float, lon: float, k: int, category: str = None, max_radius: float = None) -> tuple:
+        """(rows, distances) of the k nearest amenities, widening the search ring until they are certain"""
+        max_ring = self._max_ring(lat, lon)
+        if max_radius is not None:
+            max_ring = min(max_ring, math.ceil(max_radius / self.cell_miles))
+        ring = 1
+        while True:
+            rows = self._in_category(self._candidates(lat, lon, ring), category)
+            distances = haversine_miles(lat, lon, self.latitudes[rows], self.longitudes[rows])
+            order = np.argsort(distances, kind="stable")[:k]
+            # Anything outside the ring is at least ring cells away
+            if ring >= max_ring or (order.size == k and distances[order[-1]] <= ring * self.cell_miles):
+                rows, distances = rows[order], distances[order]
+                if max_radius is not None:
+                    keep = distances <= max_radius
+                    rows, distances = rows[keep], distances[keep]
+                return rows, distances
+            ring += 1
+
+    def summary(self, lat: float, lon: float, radius_miles: float = 5.0, per_category: int = 3) -> dict:
+        """Closest amenities per category within the radius, in the amenities details shape"""
+        key = (round(lat, 4), round(lon, 4), radius_miles, per_category)
+        with self._lock:
+            if key in self._summaries:
+                self._summaries.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._summaries[key]
+            self._stats["misses"] += 1
+
+        rows, distances = self.within_radius(lat, lon, radius_miles)
+        codes = self.category_codes[rows]
+        summary = {}
+        for code, category in enumerate(self.categories):
+            selected = np.flatnonzero(codes == code)[:per_category]
+            if selected.size:
+                summary[category] = [self.amenity(rows[i], distances[i]) for i in selected]
+
+        with self._lock:
+            self._summaries[key] = summary
+            while len(self._summaries) > self.cache_size:
+                self._summaries.popitem(last=False)
+        return summary
+
+    def precompute(self, points: list, radius_miles: float = 5.0):
+        """Warm the summary cache for known points such as catalog listings"""
+        for lat, lon in points:
+            self.summary(lat, lon, radius_miles)
+
+    def amenity(self, row: int, distance: float) -> dict:
+        return {
+            "name": self.names[row],
+            "type": self.types[row],
+            "distance": format_distance(distance),
+            "description": self.descriptions[row]
+        }
+
+    def get_stats(self) -> dict:
+        """Summary cache hits and misses"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_summaries"] = len(self._summaries)
+        return stats
+
+    def _cell(self, lat: float, lon: float) -> tuple:
+        return int(math.floor(lat / self._cell_lat)), int(math.floor(lon / self._cell_lon))
+
+    def _build_grid(self) -> dict:
+        cell_rows = np.floor(self.latitudes / self._cell_lat).astype(np.int64)
+        cell_cols = np.floor(self.longitudes / self._cell_lon).astype(np.int64)
+        order = np.lexsort((cell_cols, cell_rows))
+        keys = np.stack([cell_rows[order], cell_cols[order]], axis=1)
+        grid = {}
+        if not self.size:
+            return grid
+        boundaries = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+        for chunk in np.split(order, boundaries):
+            grid[(int(cell_rows[chunk[0]]), int(cell_cols[chunk[0]]))] = chunk
+        return grid
+
+    def _candidates(self, lat: float, lon: float, ring: int) -> np.ndarray:
+        row, col = self._cell(lat, lon)
+        chunks = [
+            self._grid[(r, c)]
+            for r in range(row - ring, row + ring + 1)
+            for c in range(col - ring, col + ring + 1)
+            if (r, c) in self._grid
+        ]
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+    def _in_category(self, rows: np.ndarray, category: Optional[str]) -> np.ndarray:
+        if category is None:
+            return rows
+        if category not in self.categories:
+            return rows[:0]
+        return rows[self.category_codes[rows] == self.categories.index(category)]
+
+    def _max_ring(self, lat: float, lon: float) -> int:
+        # Far enough to reach every occupied cell
+        row, col = self._cell(lat, lon)
+        if not self._grid:
+            return 0
+        return max(max(abs(r - row), abs(c - col)) for r, c in self._grid)
+
+
+_amenity_index = None
+_amenity_index_loaded = False
+_amenity_index_lock = threading.Lock()
+
+
+def get_amenity_index() -> Optional[AmenityIndex]:
+    """Process-wide amenity index from AMENITY_DATA_PATH, or None if there is no dataset"""
+    global _amenity_index, _amenity_index_loaded
+    with _amenity_index_lock:
+        if not _amenity_index_loaded:
+            path = os.getenv('AMENITY_DATA_PATH', DEFAULT_AMENITY_PATH)
+            _amenity_index = AmenityIndex.load(path) if path and os.path.exists(path) else None
+            _amenity_index_loaded = True
+        return _amenity_index
@@ -1,18 +1,57 @@
-import google.generativeai as genai
 from abc import ABC, abstractmethod
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
 import logging
 import json
+import os
+import threading
+from typing import Optional
+from utils.llm_cache import get_llm_cache
+from utils.llm_client import get_llm_client
 from utils.logger import setup_logger
+from utils.metrics import (LLM_CACHE_HITS, LLM_CALLS, LLM_ERRORS, LLM_PROMPT_CHARS, LLM_RESPONSE_CHARS,
+                           STRUCTURED_OUTCOMES, stage_timer)
+from .context_budget import estimate_tokens
+from .greeting_pool import GreetingPool
+from .schemas import ProseStreamFilter, split_structured_response, structured_output_instructions, validate
+
+MODEL_NAME = 'gemini-2.0-flash-lite'
+
+# Seconds the client should pause between showing the greeting and the main
+# response. The pause is purely presentational, the server never sleeps.
+GREETING_DELAY = 2
+
+# Shared by all agents so concurrent LLM calls don't spawn a pool per request
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('AGENT_EXECUTOR_WORKERS', '16')),
+    thread_name_prefix='agent-llm'
+)
+
+# Ask for prose plus a JSON block in one call instead of a second extraction call
+STRUCTURED_OUTPUT = os.getenv('STRUCTURED_OUTPUT', 'true').lower() in ('1', 'true', 'yes')
 
 class BaseAgent(ABC):
+    agent_type = None
+    details_key = None
+    schema = None
+    executor = _executor
+    fallback_greeting = "Hi there! I'm happy to help."
+    structured_output = STRUCTURED_OUTPUT
+    
     def __init__(self, api_key):
         self.logger = setup_logger()
         self.logger.info(f"Initializing {self.__class__.__name__}")
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-lite')
+        # Shared client: one transport, retry policy and circuit breaker for all agents
+        self.model = get_llm_client(api_key, MODEL_NAME)
+        self.llm_cache = get_llm_cache()
         self.shared_context = {}
+        self.greeting_pool = GreetingPool(self._generate_greeting, self.fallback_greeting)
+        self.structured_stats = Counter()
+        self.prompt_stats = Counter()
+        self._stats_lock = threading.Lock()
         
-    @abstractmethod
     def process(self, prompt: str, context: dict = None) -> dict:
         """
         Process a user prompt and return a structured response
@@ -24,16 +63,247 @@ class BaseAgent(ABC):
         Returns:
             dict: A structured response with agent details and message
         """
+        # Agents backed by local data only use the LLM to narrate what they found
+        details = self._timed_lookup(prompt, context)
+        if details is not None:
+            local_text = self._narrate_locally(prompt, context, details)
+            if local_text is not None:
+                return self._compose_response(self.get_greeting(), local_text, details)
+            greeting, response = self._generate_with_greeting(self._main_prompt(prompt, context, details))
+            return self._compose_response(greeting, self._as_text(response), details)
+            
+        # One call returns prose plus structured details; extraction is only a fallback
+        greeting, response, details = self._generate_structured(
+            self._build_prompt(prompt, context), self.schema, self._extract_details
+        )
+        return self._compose_response(greeting, response, details)
+        
+    def stream(self, prompt: str, context: dict = None):
+        """
+        Stream a response as it is generated
+        
+        Yields (event, payload) tuples: ("greeting", text), then ("token", text)
+        for each chunk of prose, ("item", {"path", "value"}) for each object in
+        the structured block's arrays as soon as it closes, then ("response", dict)
+        with the same structured response process() would have returned. Items
+        are previews; only the final response is validated.
+        """
+        details = self._timed_lookup(prompt, context)
+        local_text = self._narrate_locally(prompt, context, details) if details is not None else None
+        
+        greeting = self.get_greeting()
+        yield "greeting", greeting
+        
+        if local_text is not None:
+            yield "token", local_text
+            yield "response", self._compose_response(greeting, local_text, details)
+            return
+            
+        structured = self.structured_output and details is None
+        main_prompt = self._main_prompt(prompt, context, details)
+        
+        # Keep the trailing JSON block out of the streamed prose
+        prose_filter = ProseStreamFilter(enabled=structured)
+        for chunk in self.generate_response_stream(main_prompt):
+            text = prose_filter.feed(chunk)
+            if text:
+                yield "token", text
+            for path, value in prose_filter.drain_items():
+                yield "item", {"path": list(path), "value": value}
+        text = prose_filter.finish()
+        if text:
+            yield "token", text
+        for path, value in prose_filter.drain_items():
+            yield "item", {"path": list(path), "value": value}
+                
+        if details is None:
+            response, details = self._resolve_structured(prose_filter.text, self.schema, self._extract_details)
+        else:
+            response = prose_filter.text.strip()
+        yield "response", self._compose_response(greeting, response, details)
+        
+    async def aprocess(self, prompt: str, context: dict = None) -> dict:
+        """Async variant of process() that awaits the LLM instead of blocking a thread"""
+        local_details = self._timed_lookup(prompt, context)
+        if local_details is not None:
+            local_text = self._narrate_locally(prompt, context, local_details)
+            if local_text is not None:
+                return self._compose_response(await self._aget_greeting(), local_text, local_details)
+        main_prompt = self._main_prompt(prompt, context, local_details)
+            
+        greeting, response = await asyncio.gather(
+            self._aget_greeting(), self.agenerate_response(main_prompt)
+        )
+        if local_details is not None:
+            return self._compose_response(greeting, self._as_text(response), local_details)
+        
+        response, details = self._parse_structured(response, self.schema)
+        if details is None:
+            # The extraction fallback is rare in structured mode, keep it off the event loop
+            loop = asyncio.get_running_loop()
+            details = await loop.run_in_executor(
+                self.executor, contextvars.copy_context().run, self._timed_extract, self._extract_details, response
+            )
+        return self._compose_response(greeting, response, details)
+        
+    @abstractmethod
+    def _build_prompt(self, prompt: str, context: dict = None) -> str:
+        """Build the main generation prompt for a user request"""
         pass
+        
+    @abstractmethod
+    def _extract_details(self, response: str):
+        """Extract structured details from the agent's prose with a second LLM call"""
+        pass
+    
+    @abstractmethod
+    def _generate_greeting(self) -> str:
+        """Generate a fresh greeting with the LLM"""
+        pass
+        
+    def _lookup_details(self, prompt: str, context: dict = None):
+        """Details answered from local data, or None to have the LLM generate them"""
+        return None
+        
+    def _timed_lookup(self, prompt: str, context: dict = None):
+        """_lookup_details() under the "lookup" stage timer"""
+        with stage_timer("lookup", self.agent_type):
+            return self._lookup_details(prompt, context)
+            
+    def _timed_extract(self, extract, prose: str):
+        """Run the extraction fallback under the "extraction" stage timer"""
+        with stage_timer("extraction", self.agent_type):
+            return extract(prose)
+        
+    def _build_narration_prompt(self, prompt: str, context: dict, details) -> Optional[str]:
+        """Prompt asking the LLM to present details found by _lookup_details, or None to use _build_prompt"""
+        return None
+        
+    def _narrate_locally(self, prompt: str, context: dict, details):
+        """Reply text for local details that needs no LLM call, or None to narrate with the LLM"""
+        return None
+        
+    def _main_prompt(self, prompt: str, context: dict = None, details=None) -> str:
+        """Narration prompt for local details, otherwise the generation prompt"""
+        if details is not None:
+            narration_prompt = self._build_narration_prompt(prompt, context, details)
+            return narration_prompt if narration_prompt is not None else self._build_prompt(prompt, context)
+        main_prompt = self._build_prompt(prompt, context)
+        if self.structured_output:
+            main_prompt += structured_output_instructions(self.schema)
+        return main_prompt
+        
+    def _as_text(self, response) -> str:
+        """generate_response() parses JSON-looking replies; narration wants the text"""
+        return response.strip() if isinstance(response, str) else json.dumps(response)
     
-    def generate_response(self, prompt: str, context: dict = None) -> dict:
-        """Generate a response using the Gemini model with context awareness"""
-        self.logger.info(f"{self.__class__.__name__} generating response")
+    def get_greeting(self) -> str:
+        """Return a pre-generated greeting from the agent's pool"""
+        with stage_timer("greeting", self.agent_type):
+            return self.greeting_pool.get()
+        
+    async def _aget_greeting(self) -> str:
+        """Pooled greeting, only touching a worker thread when the pool is still empty"""
+        greeting = self.greeting_pool.peek()
+        if greeting is not None:
+            return greeting
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, contextvars.copy_context().run, self.get_greeting)
         
-        # Add context to the prompt if available
+    def generate_response(self, prompt: str, context: dict = None, cache: bool = False) -> dict:
+        """
+        Generate a response using the Gemini model with context awareness
+        
+        Set cache=True for deterministic call sites (e.g. JSON extraction) so a
+        repeated prompt is served from the LLM cache. Creative call sites such
+        as greetings should leave it off.
+        """
+        enhanced_prompt = self._build_enhanced_prompt(prompt, context)
+        prompt_tokens = self._record_prompt_size(enhanced_prompt)
+        self.logger.info(f"{self.__class__.__name__} generating response, ~{prompt_tokens} prompt tokens")
+        cache_key = self.llm_cache.key(MODEL_NAME, enhanced_prompt) if cache else None
+            
+        try:
+            text = self.llm_cache.get(cache_key) if cache_key else None
+            if text is None:
+                self._count_llm_call("sync", enhanced_prompt)
+                with stage_timer("llm", self.agent_type):
+                    text = self.model.generate_content(enhanced_prompt).text
+                LLM_RESPONSE_CHARS.observe(len(text), agent=self.agent_type)
+                self.logger.info(f"{self.__class__.__name__} response generated successfully")
+                if cache_key:
+                    self.llm_cache.put(cache_key, text)
+            else:
+                LLM_CACHE_HITS.inc(agent=self.agent_type)
+            
+            # Try to parse the response as JSON if it's in JSON format
+            try:
+                return json.loads(text)
+            except json.JSONDecodeError:
+                # If not JSON, return as regular text
+                return text
+                
+        except Exception as e:
+            LLM_ERRORS.inc(agent=self.agent_type, error=type(e).__name__)
+            self.logger.error(f"{self.__class__.__name__} error generating response: {str(e)}")
+            raise
+            
+    async def agenerate_response(self, prompt: str, context: dict = None, cache: bool = False):
+        """Async variant of generate_response() using the model's non-blocking API"""
+        enhanced_prompt = self._build_enhanced_prompt(prompt, context)
+        prompt_tokens = self._record_prompt_size(enhanced_prompt)
+        self.logger.info(f"{self.__class__.__name__} generating response (async), ~{prompt_tokens} prompt tokens")
+        cache_key = self.llm_cache.key(MODEL_NAME, enhanced_prompt) if cache else None
+        
+        try:
+            text = self.llm_cache.get(cache_key) if cache_key else None
+            if text is None:
+                self._count_llm_call("async", enhanced_prompt)
+                with stage_timer("llm", self.agent_type):
+                    text = (await self.model.generate_content_async(enhanced_prompt)).text
+                LLM_RESPONSE_CHARS.observe(len(text), agent=self.agent_type)
+                self.logger.info(f"{self.__class__.__name__} response generated successfully")
+                if cache_key:
+                    self.llm_cache.put(cache_key, text)
+            else:
+                LLM_CACHE_HITS.inc(agent=self.agent_type)
+            
+            try:
+                return json.loads(text)
+            except json.JSONDecodeError:
+                return text
+                
+        except Exception as e:
+            LLM_ERRORS.inc(agent=self.agent_type, error=type(e).__name__)
+            self.logger.error(f"{self.__class__.__name__} error generating response: {str(e)}")
+            raise
+            
+    def generate_response_stream(self, prompt: str, context: dict = None):
+        """Yield response text chunks as the Gemini model produces them"""
+        enhanced_prompt = self._build_enhanced_prompt(prompt, context)
+        prompt_tokens = self._record_prompt_size(enhanced_prompt)
+        self.logger.info(f"{self.__class__.__name__} streaming response, ~{prompt_tokens} prompt tokens")
+        
+        self._count_llm_call("stream", enhanced_prompt)
+        received = 0
+        try:
+            # Measures time to the last chunk, including time the consumer spends between chunks
+            with stage_timer("llm", self.agent_type):
+                for chunk in self.model.generate_content(enhanced_prompt, stream=True):
+                    received += len(chunk.text)
+                    yield chunk.text
+            LLM_RESPONSE_CHARS.observe(received, agent=self.agent_type)
+            self.logger.info(f"{self.__class__.__name__} response streamed successfully")
+        except Exception as e:
+            LLM_ERRORS.inc(agent=self.agent_type, error=type(e).__name__)
+            self.logger.error(f"{self.__class__.__name__} error streaming response: {str(e)}")
+            raise
+            
+    def _build_enhanced_prompt(self, prompt: str, context: dict = None) -> str:
+        """Prefix the prompt with previous context, if any"""
         if context:
             context_str = self._format_context_for_prompt(context)
-            enhanced_prompt = f"""Previous Context:
+            return f"""Previous Context:
 {context_str}
 
 Current Request:
@@ -46,23 +316,88 @@ Important: Ensure your response maintains consistency with the previous context,
 - Any negotiation points or terms discussed
 
 Your response:"""
-        else:
-            enhanced_prompt = prompt
+        return prompt
             
-        try:
-            response = self.model.generate_content(enhanced_prompt)
-            self.logger.info(f"{self.__class__.__name__} response generated successfully")
+    def _generate_with_greeting(self, prompt: str, context: dict = None) -> tuple:
+        """Generate the greeting and the main response concurrently"""
+        # Carry the request's log context into the worker thread
+        greeting_future = self.executor.submit(contextvars.copy_context().run, self.get_greeting)
+        response = self.generate_response(prompt, context)
+        return greeting_future.result(), response
             
-            # Try to parse the response as JSON if it's in JSON format
-            try:
-                return json.loads(response.text)
-            except json.JSONDecodeError:
-                # If not JSON, return as regular text
-                return response.text
-                
-        except Exception as e:
-            self.logger.error(f"{self.__class__.__name__} error generating response: {str(e)}")
-            raise
+    def _generate_structured(self, prompt: str, schema: dict, extract, context: dict = None) -> tuple:
+        """Generate greeting, prose and schema-validated details
+        
+        In structured mode the model returns prose plus a JSON block in a single
+        call; the separate extraction call only runs when that block is missing
+        or fails validation.
+        """
+        if self.structured_output:
+            prompt += structured_output_instructions(schema)
+        greeting, response = self._generate_with_greeting(prompt, context)
+        prose, data = self._resolve_structured(response, schema, extract)
+        return greeting, prose, data
+        
+    def _resolve_structured(self, response, schema: dict, extract) -> tuple:
+        """Split a raw response into prose and validated details, extracting if needed"""
+        prose, data = self._parse_structured(response, schema)
+        if data is None:
+            data = self._timed_extract(extract, prose)
+        return prose, data
+        
+    def _parse_structured(self, response, schema: dict) -> tuple:
+        """Split a raw response into prose and its inline details, or None if they need extracting"""
+        if not isinstance(response, str):
+            response = json.dumps(response)
+        
+        if not self.structured_output:
+            self._count_structured("extraction_call")
+            return response.strip(), None
+            
+        prose, data = split_structured_response(response)
+        errors = validate(data, schema) if data is not None else ["no JSON block in response"]
+        if not errors:
+            self._count_structured("inline")
+            return prose, data
+            
+        self.logger.info(f"{self.__class__.__name__} structured output invalid, falling back to extraction: {errors[:3]}")
+        self._count_structured("fallback")
+        return prose, None
+        
+    def _record_prompt_size(self, prompt: str) -> int:
+        """Count an outgoing prompt's estimated tokens and return them"""
+        tokens = estimate_tokens(prompt)
+        with self._stats_lock:
+            self.prompt_stats["calls"] += 1
+            self.prompt_stats["prompt_tokens"] += tokens
+            self.prompt_stats["max_prompt_tokens"] = max(self.prompt_stats["max_prompt_tokens"], tokens)
+        return tokens
+        
+    def _count_llm_call(self, mode: str, prompt: str):
+        """Count an LLM call that missed the cache, with its prompt size"""
+        LLM_CALLS.inc(agent=self.agent_type, mode=mode)
+        LLM_PROMPT_CHARS.observe(len(prompt), agent=self.agent_type)
+        
+    def get_prompt_stats(self) -> dict:
+        """Return the number of LLM calls and their estimated prompt sizes"""
+        with self._stats_lock:
+            stats = dict(self.prompt_stats)
+        calls = stats.get("calls", 0)
+        stats["avg_prompt_tokens"] = stats.get("prompt_tokens", 0) / calls if calls else 0.0
+        return stats
+        
+    def _count_structured(self, outcome: str):
+        with self._stats_lock:
+            self.structured_stats[outcome] += 1
+        STRUCTURED_OUTCOMES.inc(agent=self.agent_type, outcome=outcome)
+            
+    def get_structured_output_stats(self) -> dict:
+        """Return how often structured output parsed inline versus fell back"""
+        with self._stats_lock:
+            stats = dict(self.structured_stats)
+        structured_total = stats.get("inline", 0) + stats.get("fallback", 0)
+        stats["fallback_rate"] = stats.get("fallback", 0) / structured_total if structured_total else 0.0
+        return stats
             
     def _format_context_for_prompt(self, context: dict) -> str:
         """Format the context into a string for the prompt"""
@@ -80,7 +415,8 @@ Your response:"""
         if 'amenities' in context:
             context_str.append("Nearby Amenities:")
             for amenity in context['amenities']:
-                context_str.append(f"- {amenity['name']} ({amenity.get('distance', 'nearby')})")
+                name = amenity.get('name') or amenity.get('amenity', 'Amenity')
+                context_str.append(f"- {name} ({amenity.get('distance', 'nearby')})")
             context_str.append("")
                 
         if 'negotiation' in context:
@@ -89,8 +425,29 @@ Your response:"""
             context_str.append(f"Current Stage: {context['negotiation'].get('stage', 'Not specified')}")
             context_str.append("")
             
+        summary = self._format_summary(context)
+        if summary:
+            context_str.append(summary)
+            
         return "\n".join(context_str)
+        
+    def _format_summary(self, context: dict) -> str:
+        """Rolling summary of earlier items that did not fit the context budget"""
+        if not context or not context.get('summary'):
+            return ""
+        return f"Also discussed earlier (summary):\n{context['summary']}\n"
             
+    def _compose_response(self, greeting: str, response: str, details) -> dict:
+        """Combine greeting, prose and structured details into the agent response"""
+        return {
+            "message": f"{greeting}\n\n{response}",
+            "details": {
+                "type": self.agent_type,
+                "greeting_delay": GREETING_DELAY,
+                self.details_key: details
+            }
+        }
+        
     def _format_response(self, message: str, details: dict = None) -> dict:
         """Format the agent's response into a structured format"""
         return {
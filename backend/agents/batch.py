@@ -0,0 +1,48 @@
+import os
+from collections import OrderedDict
+from .sessions import valid_session_id
+
+
+def parse_batch(items, max_items: int = None) -> list:
+    """Normalize batch items to [{"id", "messages", "session_id"}, ...], raising ValueError if malformed
+
+    An item is a message string, {"message": ...}, or a transcript
+    {"messages": [...]} replayed turn by turn. Items may carry an "id" to
+    echo back and a "session_id" to continue an existing conversation.
+    """
+    max_items = max_items or int(os.getenv('BATCH_MAX_ITEMS', '10000'))
+    if not isinstance(items, list) or not items:
+        raise ValueError("Batch must be a non-empty list of items")
+    if len(items) > max_items:
+        raise ValueError(f"Batch has {len(items)} items, the limit is {max_items}")
+
+    parsed = []
+    for index, item in enumerate(items):
+        if isinstance(item, str):
+            item = {"message": item}
+        if not isinstance(item, dict):
+            raise ValueError(f"Item {index} must be a string or an object")
+        messages = item.get("messages", [item["message"]] if "message" in item else None)
+        if not isinstance(messages, list) or not messages or not all(isinstance(m, str) and m for m in messages):
+            raise ValueError(f"Item {index} needs a non-empty message or list of messages")
+        if item.get("session_id") is not None and not valid_session_id(item["session_id"]):
+            raise ValueError(f"Item {index} has a malformed session_id")
+        parsed.append({"id": item.get("id", index), "messages": messages, "session_id": item.get("session_id")})
+    return parsed
+
+
+def plan_batch(items: list) -> list:
+    """Group parsed items into units of work, as lists of item indexes
+
+    Items without a session_id are independent replays, so identical ones
+    share a unit and are processed once. Items continuing the same session
+    share a unit too and run in order, never concurrently.
+    """
+    units = OrderedDict()
+    for index, item in enumerate(items):
+        if item["session_id"] is None:
+            key = ("replay", tuple(item["messages"]))
+        else:
+            key = ("session", item["session_id"])
+        units.setdefault(key, []).append(index)
+    return [(kind == "replay", indexes) for (kind, _), indexes in units.items()]
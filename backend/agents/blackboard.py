@@ -0,0 +1,120 @@
+import os
+import threading
+from typing import Callable, NamedTuple
+
+
+class Entry(NamedTuple):
+    version: int
+    agent: str
+    value: object
+
+
+class Snapshot(NamedTuple):
+    version: int
+    # key -> tuple of Entry, oldest first; never mutated once published
+    entries: dict
+
+
+class Blackboard:
+    """Versioned, copy-on-write record of what agents have shared in a session
+
+    Each publish builds a new top-level mapping that shares every untouched
+    key's history with the previous version, so readers take a snapshot
+    without copying or locking. Values are stored by reference and treated as
+    immutable. Each key keeps only its last max_history versions.
+    """
+
+    def __init__(self, max_history: int = None):
+        self.max_history = max(1, max_history or int(os.getenv('BLACKBOARD_MAX_HISTORY', '4')))
+        self._snapshot = Snapshot(0, {})
+        self._views = {}
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def publish(self, agent_type: str, values: dict) -> int:
+        """Record an agent's output as a new version and return its number"""
+        with self._lock:
+            previous = self._snapshot
+            version = previous.version + 1
+            entries = dict(previous.entries)
+            keep = self.max_history - 1
+            for key, value in values.items():
+                history = entries.get(key, ())[-keep:] if keep else ()
+                entries[key] = history + (Entry(version, agent_type, value),)
+            self._snapshot = Snapshot(version, entries)
+        return version
+
+    def snapshot(self) -> Snapshot:
+        """The current version; later publishes never change it"""
+        return self._snapshot
+
+    def latest(self) -> dict:
+        """Newest value of every key"""
+        return {key: history[-1].value for key, history in self._snapshot.entries.items()}
+
+    def history(self, key: str) -> tuple:
+        """Retained (version, agent, value) entries for a key, oldest first"""
+        return self._snapshot.entries.get(key, ())
+
+    def to_state(self) -> list:
+        """[key, agent, value] for the newest version of each key, for persistence"""
+        return [[key, history[-1].agent, history[-1].value] for key, history in self._snapshot.entries.items()]
+
+    @classmethod
+    def from_state(cls, state: list, max_history: int = None) -> "Blackboard":
+        """A board holding saved values as its first version; older history is not kept"""
+        board = cls(max_history)
+        board._snapshot = Snapshot(1 if state else 0, {key: (Entry(1, agent, value),) for key, agent, value in state})
+        return board
+
+    def view(self, agent_type: str, project: Callable[[str, dict], dict]) -> "BlackboardView":
+        """The agent's view, created once per board"""
+        view = self._views.get(agent_type)
+        if view is None:
+            view = self._views.setdefault(agent_type, BlackboardView(self, agent_type, project))
+        return view
+
+    def get_stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version,
+            "keys": len(snapshot.entries),
+            "entries": sum(len(history) for history in snapshot.entries.values())
+        }
+
+
+class BlackboardView:
+    """One agent's read-only projection of a blackboard
+
+    The agent sees the keys it wrote itself plus project(agent_type, latest)
+    of everything on the board. The projection runs on read, and only when
+    the board has changed since the last one.
+    """
+
+    __slots__ = ("board", "agent_type", "project", "_cache")
+
+    def __init__(self, board: Blackboard, agent_type: str, project: Callable[[str, dict], dict]):
+        self.board = board
+        self.agent_type = agent_type
+        self.project = project
+        self._cache = (-1, None)
+
+    @property
+    def version(self) -> int:
+        return self.board.version
+
+    def get(self) -> dict:
+        """The projected context; treat it as read-only, it is shared until the board changes"""
+        snapshot = self.board.snapshot()
+        version, context = self._cache
+        if version != snapshot.version:
+            latest = {key: history[-1].value for key, history in snapshot.entries.items()}
+            context = {key: value for key, value in latest.items()
+                       if snapshot.entries[key][-1].agent == self.agent_type}
+            context.update(self.project(self.agent_type, latest))
+            # One tuple assignment, so concurrent readers never see a torn cache
+            self._cache = (snapshot.version, context)
+        return context
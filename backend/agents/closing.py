@@ -1,14 +1,28 @@
+import math
+import os
+from datetime import date
 from .base_agent import BaseAgent
-import time
-import json
+from .closing_plans import get_closing_planner, parse_closing_date, parse_financing
+from .property_catalog import find_prices, get_property_catalog, parse_price
+from .schemas import CLOSING_SCHEMA, parse_json
+
+# With this off, closing replies are assembled locally with no LLM call at all
+CLOSING_LLM_SUMMARY = os.getenv('CLOSING_LLM_SUMMARY', 'true').lower() in ('1', 'true', 'yes')
 
 class ClosingAgent(BaseAgent):
+    agent_type = "closing"
+    details_key = "process"
+    schema = CLOSING_SCHEMA
+    fallback_greeting = "Hello, I'm Robert! 📝 I'll make sure your closing is smooth and stress-free."
+    
     def __init__(self, api_key):
         super().__init__(api_key)
         self.name = "Robert"
         self.emoji = "📝"
+        self.catalog = get_property_catalog()
+        self.planner = get_closing_planner()
         
-    def get_greeting(self) -> str:
+    def _generate_greeting(self) -> str:
         """Generate a dynamic, personalized greeting"""
         greeting_prompt = """Generate a friendly, reassuring greeting from Robert, the Closing Specialist (use emoji 📝).
         Make it warm and professional, showing expertise in the closing process.
@@ -17,12 +31,8 @@ class ClosingAgent(BaseAgent):
         response = self.generate_response(greeting_prompt)
         return response.strip()
         
-    def process(self, prompt: str) -> dict:
-        """Process user request and generate closing guidance"""
-        # First, send the greeting
-        greeting = self.get_greeting()
-        time.sleep(2)  # Add a natural pause
-        
+    def _build_prompt(self, prompt: str, context: dict = None) -> str:
+        """Build the closing guidance prompt"""
         # Generate the closing process response
         closing_prompt = f"""As Robert, a knowledgeable Closing Specialist (📝), create a detailed closing guide:
 
@@ -46,18 +56,115 @@ class ClosingAgent(BaseAgent):
         
         Important: Generate new, unique guidance each time. Don't reference external websites or specific laws."""
 
-        response = self.generate_response(closing_prompt)
-        closing_response = response.strip()
+        return closing_prompt
         
-        # Structure the response
-        return {
-            "message": f"{greeting}\n\n{closing_response}",
-            "details": {
-                "type": "closing",
-                "greeting_delay": 2,
-                "process": self._extract_closing_details_from_response(closing_response)
-            }
+    def _lookup_details(self, prompt: str, context: dict = None):
+        """Closing plan rendered from the templates for this deal's parameters"""
+        if self.planner is None:
+            return None
+        params = self._closing_parameters(prompt, context)
+        plan = self.planner.render(params["price"], params["financing"], params["closing_date"], params["property_type"])
+        plan["parameters"]["property"] = params["property"]
+        plan["parameters"]["financing_type"] = params["financing"]
+        self._count_structured("closing_template")
+        return plan
+        
+    def _closing_parameters(self, prompt: str, context: dict = None) -> dict:
+        """Price, financing, closing date and property from the request, falling back to the conversation"""
+        context = context or {}
+        previous = context.get("closing", {}).get("parameters") or {}
+        negotiation = context.get("negotiation") or {}
+        params = {
+            "property": previous.get("property"),
+            "price": parse_price(previous["price"]) if previous.get("price") else None,
+            "property_type": previous.get("property_type") or "",
+            "financing": parse_financing(prompt) or previous.get("financing_type") or "conventional",
+            "closing_date": parse_closing_date(prompt)
         }
+        if params["closing_date"] is None and previous.get("closing_date"):
+            params["closing_date"] = max(date.fromisoformat(previous["closing_date"]), date.today())
+            
+        # Most specific source wins: a named listing, then the negotiated property, then the latest one
+        listing = None
+        if self.catalog is not None:
+            row = self.catalog.find(prompt)
+            listing = self.catalog.record(row) if row is not None else None
+        if listing is None and params["price"] is None:
+            if negotiation.get("price"):
+                listing = {"name": negotiation.get("property"), "price": negotiation["price"]}
+            else:
+                listing = next((prop for prop in context.get("properties", []) if prop.get("price")), None)
+        if listing is not None and not listing.get("type") and self.catalog is not None:
+            row = self.catalog.find(listing.get("name") or "")
+            if row is not None:
+                listing = dict(listing, type=self.catalog.record(row)["type"])
+        if listing is not None:
+            price = parse_price(listing.get("price"))
+            params["property"] = listing.get("name") or params["property"]
+            params["price"] = None if math.isnan(price) else price
+            params["property_type"] = listing.get("type", params["property_type"])
+            
+        # A price quoted in the request is the agreed price
+        quoted = find_prices(prompt)
+        if quoted:
+            params["price"] = quoted[0]
+        return params
+        
+    def _narrate_locally(self, prompt: str, context: dict, details: dict):
+        """Template summary when LLM summaries are switched off"""
+        if CLOSING_LLM_SUMMARY:
+            return None
+        params = details["parameters"]
+        deal = f" for {params['property']}" if params.get("property") else ""
+        return (f"Here's your closing plan{deal} ({params['financing']}), "
+                f"targeting a closing date of {params['closing_date']}. I've listed everything you'll need below.")
+        
+    def _build_narration_prompt(self, prompt: str, context: dict, details: dict) -> str:
+        """One short call to personalize the summary; the plan itself comes from the templates"""
+        params = details["parameters"]
+        upcoming = "; ".join(f"{step['date']}: {step['description']}" for step in details["timeline"][:3])
+        cash = details["costs"].get("estimated_cash_to_close", "not yet known")
+        
+        return f"""As Robert, a knowledgeable Closing Specialist (📝), write a short, reassuring summary of this closing plan:
+
+        Property: {params.get('property') or 'not specified'} ({params.get('price') or 'price not set'})
+        Financing: {params['financing']}
+        Target closing date: {params['closing_date']}
+        First steps: {upcoming}
+        Estimated cash to close: {cash}
+
+        User Request: {prompt}
+
+        Write 3-4 friendly sentences that address their request and highlight what to do first.
+        Don't list documents, costs or the full timeline; those are shown separately. Don't invent numbers."""
+        
+    def _compose_response(self, greeting: str, response: str, details) -> dict:
+        """Append the rendered plan to the summary when it came from the templates"""
+        if isinstance(details, dict) and "template_version" in details:
+            response = f"{response}\n\n{self._format_plan(details)}"
+        return super()._compose_response(greeting, response, details)
+        
+    def _format_plan(self, plan: dict) -> str:
+        """Plain-text rendering of a template closing plan"""
+        costs = plan["costs"]
+        lines = ["📄 Documents to gather:"]
+        lines += [f"- {item}" for item in plan["documentation"]]
+        lines += ["", "🗓️ Timeline:"]
+        lines += [f"- {step['date']}: {step['description']}" for step in plan["timeline"]]
+        lines += ["", "🔍 Inspections:"]
+        lines += [f"- {item}" for item in plan["inspections"]["required_inspections"]]
+        lines += ["", "💵 Estimated closing costs:"]
+        lines += [f"- {item}: {amount}" for item, amount in costs["closing_costs_breakdown"].items()]
+        if "estimated_cash_to_close" in costs:
+            lines.append(f"- Total closing costs: {costs['estimated_closing_costs']}, "
+                         f"down payment {costs['down_payment']}, cash to close {costs['estimated_cash_to_close']}")
+        lines += ["", f"🚪 Final walkthrough ({plan['walkthrough']['scheduling_info'].lower()}):"]
+        lines += [f"- {item}" for item in plan["walkthrough"]["checklist"]]
+        return "\n".join(lines)
+        
+    def _extract_details(self, response: str) -> dict:
+        """Extract the structured details for this agent's response"""
+        return self._extract_closing_details_from_response(response)
         
     def _extract_closing_details_from_response(self, response: str) -> dict:
         """Extract and structure closing process details from the LLM response"""
@@ -77,8 +184,9 @@ class ClosingAgent(BaseAgent):
         Return only the JSON object with the structured closing details."""
         
         try:
-            structured_response = self.generate_response(extraction_prompt)
-            return json.loads(structured_response)
+            # Extraction is deterministic for a given response, so it is cacheable
+            structured_response = self.generate_response(extraction_prompt, cache=True)
+            return parse_json(structured_response)
         except:
             # Fallback to simple structure if JSON parsing fails
             return {
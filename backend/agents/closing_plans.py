@@ -0,0 +1,185 @@
+import copy
+import json
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from datetime import date, timedelta
+from typing import Optional
+
+from .property_catalog import format_price
+
+DEFAULT_TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'closing_templates.json')
+
+_FINANCING_KEYWORDS = [
+    ("cash", r"\b(?:all[- ]cash|cash (?:buyer|purchase|offer)|paying cash|in cash)\b"),
+    ("fha", r"\bfha\b"),
+    ("va", r"\bva (?:loan|mortgage)\b|\bveteran"),
+    ("conventional", r"\bconventional\b|\bmortgage\b|\bloan\b")
+]
+
+_MONTHS = {month: index for index, month in enumerate(
+    ["january", "february", "march", "april", "may", "june", "july", "august",
+     "september", "october", "november", "december"], start=1)}
+
+
+def parse_financing(text: str) -> Optional[str]:
+    """Financing type mentioned in the text, or None"""
+    text = text.lower()
+    for financing, pattern in _FINANCING_KEYWORDS:
+        if re.search(pattern, text):
+            return financing
+    return None
+
+
+def parse_closing_date(text: str, today: date = None) -> Optional[date]:
+    """Closing date from "2026-11-20", "November 20", "in 6 weeks" or "in 45 days", or None"""
+    today = today or date.today()
+    text = text.lower()
+    iso = re.search(r"\b(\d{4})-(\d{2})-(\d{2})\b", text)
+    if iso:
+        try:
+            return date(int(iso.group(1)), int(iso.group(2)), int(iso.group(3)))
+        except ValueError:
+            return None
+    relative = re.search(r"\bin (\d+) (day|week|month)s?\b", text)
+    if relative:
+        days = int(relative.group(1)) * {"day": 1, "week": 7, "month": 30}[relative.group(2)]
+        return today + timedelta(days=days)
+    named = re.search(rf"\b({'|'.join(_MONTHS)})\s+(\d{{1,2}})(?:st|nd|rd|th)?\b", text)
+    if named:
+        try:
+            closing = date(today.year, _MONTHS[named.group(1)], int(named.group(2)))
+        except ValueError:
+            return None
+        return closing if closing >= today else closing.replace(year=today.year + 1)
+    return None
+
+
+def _applies(entry: dict, financing: str, property_type: str) -> bool:
+    if "financing" in entry and financing not in entry["financing"]:
+        return False
+    if "property_types" in entry and not any(kind in property_type for kind in entry["property_types"]):
+        return False
+    return True
+
+
+class ClosingPlanner:
+    """Closing plans assembled from a versioned template and a few parameters
+
+    Rendered plans are memoized on (template version, price, financing,
+    closing date, property type). Repeat requests for the same deal cost
+    nothing to render.
+    """
+
+    def __init__(self, template: dict, cache_size: int = None):
+        self.template = template
+        self.version = template.get("version", "unversioned")
+        self.cache_size = cache_size or int(os.getenv('CLOSING_PLAN_CACHE_SIZE', '512'))
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    @classmethod
+    def load(cls, path: str) -> "ClosingPlanner":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def render(self, price: float = None, financing: str = "conventional", closing_date: date = None,
+               property_type: str = "") -> dict:
+        """Closing plan in the closing details shape, served from the memo when possible"""
+        financing = financing if financing in self.template["financing"] else "conventional"
+        closing_date = closing_date or date.today() + timedelta(days=30)
+        price = round(price, -3) if price else None
+        property_type = (property_type or "").lower()
+        key = (self.version, price, financing, closing_date, property_type)
+
+        with self._lock:
+            if key in self._plans:
+                self._plans.move_to_end(key)
+                self._stats["hits"] += 1
+                return copy.deepcopy(self._plans[key])
+            self._stats["misses"] += 1
+
+        plan = self._render(price, financing, closing_date, property_type)
+        with self._lock:
+            self._plans[key] = plan
+            while len(self._plans) > self.cache_size:
+                self._plans.popitem(last=False)
+        return copy.deepcopy(plan)
+
+    def get_stats(self) -> dict:
+        """Memo hits and misses for rendered plans"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_plans"] = len(self._plans)
+        stats["template_version"] = self.version
+        return stats
+
+    def _render(self, price: Optional[float], financing: str, closing_date: date, property_type: str) -> dict:
+        template = self.template
+        applies = lambda entry: _applies(entry, financing, property_type)
+        terms = template["financing"][financing]
+
+        costs = {}
+        for entry in filter(applies, template["costs"]):
+            if "fixed" in entry:
+                costs[entry["item"]] = float(entry["fixed"])
+            elif price:
+                costs[entry["item"]] = max(price * entry["rate"], entry.get("minimum", 0))
+        breakdown = {item: format_price(amount) for item, amount in costs.items()}
+        if not price:
+            # Without a price, show rates instead of amounts
+            breakdown.update({
+                entry["item"]: f"{entry['rate'] * 100:g}% of the price"
+                for entry in filter(applies, template["costs"]) if "rate" in entry
+            })
+
+        plan = {
+            "template_version": self.version,
+            "parameters": {
+                "price": format_price(price) if price else None,
+                "financing": terms["label"],
+                "closing_date": closing_date.isoformat(),
+                "property_type": property_type or None
+            },
+            "documentation": [entry["item"] for entry in filter(applies, template["documentation"])],
+            "timeline": [
+                {
+                    "date": (closing_date - timedelta(days=entry["days_before"])).strftime("%b %d"),
+                    "description": entry["description"]
+                }
+                for entry in filter(applies, template["timeline"])
+            ],
+            "inspections": {
+                "required_inspections": [entry["item"] for entry in filter(applies, template["inspections"]["required"])],
+                "optional_inspections": list(template["inspections"]["optional"]),
+                "scheduling_info": template["inspections"]["scheduling_info"]
+            },
+            "costs": {"closing_costs_breakdown": breakdown},
+            "walkthrough": copy.deepcopy(template["walkthrough"]),
+            "handover": copy.deepcopy(template["handover"]),
+            "tips": list(template["tips"])
+        }
+        if price:
+            down_payment = price * terms["down_payment"]
+            plan["costs"]["estimated_closing_costs"] = format_price(sum(costs.values()))
+            plan["costs"]["down_payment"] = format_price(down_payment)
+            plan["costs"]["estimated_cash_to_close"] = format_price(down_payment + sum(costs.values()))
+        return plan
+
+
+_planner = None
+_planner_loaded = False
+_planner_lock = threading.Lock()
+
+
+def get_closing_planner() -> Optional[ClosingPlanner]:
+    """Process-wide planner from CLOSING_TEMPLATE_PATH, or None if there is no template"""
+    global _planner, _planner_loaded
+    with _planner_lock:
+        if not _planner_loaded:
+            path = os.getenv('CLOSING_TEMPLATE_PATH', DEFAULT_TEMPLATE_PATH)
+            _planner = ClosingPlanner.load(path) if path and os.path.exists(path) else None
+            _planner_loaded = True
+        return _planner
@@ -0,0 +1,114 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, about four characters per token"""
+    return math.ceil(len(text) / 4)
+
+
+def _item_tokens(item) -> int:
+    return estimate_tokens(json.dumps(item, default=str))
+
+
+def _words(text: str) -> set:
+    return {word for word in re.findall(r"[a-z0-9$,]+", text.lower()) if len(word) > 2}
+
+
+class ContextCompactor:
+    """Fits the context handed to an agent into a token budget
+
+    The newest properties and amenities, and those sharing words with the
+    request, are kept verbatim. Everything else is represented by the digest
+    lines the session's ContextIndex maintains as items arrive, so the rolling
+    summary is never regenerated from the full history.
+    """
+
+    def __init__(self, token_budget: int = None, keep_recent: int = None):
+        self.token_budget = token_budget or int(os.getenv('CONTEXT_TOKEN_BUDGET', '800'))
+        self.keep_recent = keep_recent if keep_recent is not None else int(os.getenv('CONTEXT_KEEP_RECENT', '2'))
+        self._stats = Counter()
+        self._lock = threading.Lock()
+
+    def compact(self, index, prompt: str) -> dict:
+        """Budgeted context for a request, with a "summary" of whatever did not fit"""
+        request_words = _words(prompt)
+        context = {"properties": [], "amenities": [], "negotiation": {}, "closing": {}}
+        budget = self.token_budget
+        full_tokens = 0
+
+        # The latest negotiation and closing state is small and always current
+        for kind in ("negotiation", "closing"):
+            state = index.latest(kind)
+            if not state:
+                continue
+            cost = _item_tokens(state)
+            full_tokens += cost
+            if cost <= budget:
+                context[kind] = state
+                budget -= cost
+
+        # Recent items first, then by overlap with the request, then by recency
+        candidates = []
+        for kind in ("properties", "amenities"):
+            for rank, (key, item, line) in enumerate(index.items(kind)):
+                cost = _item_tokens(item)
+                full_tokens += cost
+                relevance = len(request_words & _words(line))
+                candidates.append((rank >= self.keep_recent, -relevance, rank, kind, key, item, line, cost))
+        candidates.sort(key=lambda candidate: candidate[:5])
+
+        kept = {"properties": [], "amenities": []}
+        summarized = []
+        for _, _, rank, kind, _, item, line, cost in candidates:
+            if cost <= budget:
+                kept[kind].append((rank, item))
+                budget -= cost
+            else:
+                summarized.append((rank, line))
+        for kind, items in kept.items():
+            context[kind] = [item for _, item in sorted(items, key=lambda pair: pair[0])]
+
+        summary = self._summary(summarized, index.archive_summary, budget)
+        if summary:
+            context["summary"] = summary
+            budget -= estimate_tokens(summary)
+
+        self._record(full_tokens, self.token_budget - budget, len(summarized))
+        return context
+
+    def get_stats(self) -> dict:
+        """Context tokens before and after compaction, summed over all calls"""
+        with self._lock:
+            stats = dict(self._stats)
+        calls = stats.get("calls", 0)
+        stats["avg_full_tokens"] = stats.get("full_tokens", 0) / calls if calls else 0.0
+        stats["avg_compacted_tokens"] = stats.get("compacted_tokens", 0) / calls if calls else 0.0
+        stats["token_budget"] = self.token_budget
+        return stats
+
+    def _summary(self, summarized: list, archive: str, budget: int) -> str:
+        lines = [f"- {line}" for _, line in sorted(summarized, key=lambda pair: pair[0])]
+        if archive:
+            lines.extend(archive.split("\n"))
+        kept = []
+        for line in lines:
+            cost = estimate_tokens(line) + 1
+            if cost > budget:
+                break
+            kept.append(line)
+            budget -= cost
+        if len(kept) < len(lines):
+            kept.append(f"- ...and {len(lines) - len(kept)} earlier items")
+        return "\n".join(kept)
+
+    def _record(self, full_tokens: int, compacted_tokens: int, summarized: int):
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["full_tokens"] += full_tokens
+            self._stats["compacted_tokens"] += compacted_tokens
+            self._stats["summarized_items"] += summarized
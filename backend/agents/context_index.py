@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+
+
+def fingerprint(item: dict) -> str:
+    """Stable hash of an extracted item, used to deduplicate it"""
+    encoded = json.dumps(item, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def digest(item: dict) -> str:
+    """One-line description of an item for the rolling summary"""
+    name = item.get("name") or item.get("amenity") or "Unnamed"
+    facts = [str(item[key]) for key in ("price", "location", "category", "distance") if item.get(key)]
+    return f"{name} ({', '.join(facts)})" if facts else str(name)
+
+
+class ContextIndex:
+    """Incrementally maintained summary of what agents have shared in a session
+
+    Updated once per agent turn, so building an agent's context no longer
+    rescans the whole conversation history. Plan branches and concurrent
+    requests share a session's index, so reads return copies taken under its lock.
+    """
+
+    def __init__(self, max_items: int = None, max_summary_lines: int = None):
+        self.max_items = max_items or int(os.getenv('CONTEXT_INDEX_MAX_ITEMS', '100'))
+        # Most recently mentioned items live at the end
+        self._properties = OrderedDict()
+        self._amenities = OrderedDict()
+        self.negotiation = {}
+        self.closing = {}
+        # Digests are computed once per item; evicted items survive only as a digest line
+        self.digests = {}
+        self._archive = deque(maxlen=max_summary_lines or int(os.getenv('CONTEXT_SUMMARY_MAX_LINES', '20')))
+        self.archive_summary = ""
+        self._lock = threading.Lock()
+
+    def add(self, new_context: dict):
+        """Fold one agent's formatted output into the index"""
+        with self._lock:
+            if "final_recommendations" in new_context:
+                self._add_items(self._properties, new_context["final_recommendations"].get("properties", []))
+            if "nearby_amenities" in new_context:
+                self._add_items(self._amenities, new_context["nearby_amenities"])
+            if "strategy" in new_context:
+                self.negotiation.update(new_context["strategy"])
+            if "closing_details" in new_context:
+                self.closing.update(new_context["closing_details"])
+
+    def items(self, kind: str) -> list:
+        """(fingerprint, item, digest) for 'properties' or 'amenities', most recent first"""
+        index = self._properties if kind == "properties" else self._amenities
+        with self._lock:
+            return [(key, item, self.digests[key]) for key, item in reversed(index.items())]
+
+    def latest(self, kind: str) -> dict:
+        """A copy of the latest 'negotiation' or 'closing' state"""
+        with self._lock:
+            return dict(self.negotiation if kind == "negotiation" else self.closing)
+
+    def snapshot(self) -> dict:
+        """Context for an agent: most recent items first, latest negotiation and closing state"""
+        with self._lock:
+            return {
+                "properties": list(reversed(self._properties.values())),
+                "amenities": list(reversed(self._amenities.values())),
+                "negotiation": dict(self.negotiation),
+                "closing": dict(self.closing)
+            }
+
+    def to_state(self) -> dict:
+        """Plain data for persistence; digests are rebuilt on restore"""
+        with self._lock:
+            return {
+                "properties": list(self._properties.items()),
+                "amenities": list(self._amenities.items()),
+                "negotiation": dict(self.negotiation),
+                "closing": dict(self.closing),
+                "archive": list(self._archive)
+            }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "ContextIndex":
+        """Rebuild an index saved with to_state() without rehashing its items"""
+        index = cls()
+        for target, pairs in ((index._properties, state.get("properties", ())),
+                              (index._amenities, state.get("amenities", ()))):
+            for key, item in pairs:
+                target[key] = item
+                index.digests[key] = digest(item)
+        index.negotiation.update(state.get("negotiation", {}))
+        index.closing.update(state.get("closing", {}))
+        index._archive.extend(state.get("archive", ()))
+        if index._archive:
+            index.archive_summary = "\n".join(f"- {line}" for line in reversed(index._archive))
+        return index
+
+    def _add_items(self, index: OrderedDict, items: list):
+        # Insert in reverse so the snapshot keeps each turn's original order
+        for item in reversed(items):
+            key = fingerprint(item)
+            if key in index:
+                index.move_to_end(key)
+            else:
+                index[key] = item
+                self.digests[key] = digest(item)
+        evicted = False
+        while len(index) > self.max_items:
+            key, _ = index.popitem(last=False)
+            self._archive.append(self.digests.pop(key))
+            evicted = True
+        if evicted:
+            self.archive_summary = "\n".join(f"- {line}" for line in reversed(self._archive))
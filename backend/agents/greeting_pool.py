@@ -0,0 +1,97 @@
+import logging
+import os
+import random
+import threading
+from collections import deque
+from typing import Callable
+
+logger = logging.getLogger('RealEstateAgent')
+
+
+class GreetingPool:
+    """Bounded pool of pre-generated greetings for a single agent"""
+
+    def __init__(self, generate: Callable[[], str], fallback: str,
+                 max_size: int = None, refresh_interval: float = None, refresh_batch: int = None):
+        self.generate = generate
+        self.fallback = fallback
+        self.max_size = max_size or int(os.getenv('GREETING_POOL_SIZE', '5'))
+        self.refresh_interval = refresh_interval if refresh_interval is not None else float(
+            os.getenv('GREETING_REFRESH_SECONDS', '900'))
+        self.refresh_batch = refresh_batch or int(os.getenv('GREETING_REFRESH_BATCH', '2'))
+        # Oldest greetings fall off the left as fresh ones are appended
+        self._greetings = deque(maxlen=self.max_size)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def get(self) -> str:
+        """Return a random pooled greeting, generating one only if the pool is empty"""
+        with self._lock:
+            if self._greetings:
+                return random.choice(self._greetings)
+
+        greeting = self._generate_one()
+        if greeting is None:
+            return self.fallback
+        self._add(greeting)
+        return greeting
+
+    def peek(self):
+        """Return a random pooled greeting, or None without generating one"""
+        with self._lock:
+            return random.choice(self._greetings) if self._greetings else None
+
+    def fill(self):
+        """Generate greetings until the pool is full"""
+        # Bounded attempts, the LLM may keep repeating the same greeting
+        for _ in range(self.max_size * 2):
+            if len(self._greetings) >= self.max_size or self._stop.is_set():
+                return
+            greeting = self._generate_one()
+            if greeting is None:
+                return
+            self._add(greeting)
+
+    def refresh(self):
+        """Rotate a few fresh greetings into the pool, evicting the oldest"""
+        for _ in range(self.refresh_batch):
+            greeting = self._generate_one()
+            if greeting is None:
+                return
+            self._add(greeting)
+
+    def start(self):
+        """Fill the pool and keep refreshing it on a background thread"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='greeting-pool', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh"""
+        self._stop.set()
+
+    def __len__(self):
+        return len(self._greetings)
+
+    def _run(self):
+        self.fill()
+        if self.refresh_interval <= 0:
+            return
+        while not self._stop.wait(self.refresh_interval):
+            self.refresh()
+
+    def _add(self, greeting: str):
+        with self._lock:
+            if greeting not in self._greetings:
+                self._greetings.append(greeting)
+
+    def _generate_one(self):
+        try:
+            greeting = self.generate()
+        except Exception as e:
+            logger.warning(f"Greeting generation failed, using pooled or static greeting: {str(e)}")
+            return None
+        greeting = greeting.strip() if isinstance(greeting, str) else ""
+        return greeting or None
@@ -0,0 +1,269 @@
+import json
+import re
+from json.decoder import scanstring
+from typing import Any, List, Tuple
+
+_DECODER = json.JSONDecoder()
+# Separators are skipped rather than checked, which also tolerates trailing commas
+_SKIP_RE = re.compile(r"[\s,:]*")
+# Loose on purpose: a number cut at a chunk boundary must still reach the end of the buffer
+_NUMBER_RE = re.compile(r"-?[0-9][0-9.eE+-]*|-$")
+_LITERALS = {"true": True, "false": False, "null": None}
+_START_RE = re.compile(r"[{\[]|```")
+# A "[" followed by something that can start a JSON value, or by nothing because the text was cut off
+_ARRAY_START_RE = re.compile(r"\[\s*(?:[\[{\]\"0-9-]|true|false|null|$)")
+# An unfinished value inside an array element shorter than this is retried whole on the next chunk
+_RETRY_CHARS = 4096
+
+
+class StreamingJSONParser:
+    """Incremental, tolerant JSON parser for LLM output
+
+    Feed it text as it arrives. Leading prose and markdown fences are skipped
+    up to the first object or array, and anything after that value closes is
+    ignored. feed() returns (path, object) pairs for every object that is an
+    array element, as soon as it closes, e.g. (("properties", 0), {...}).
+    close() returns the whole value, closing whatever a truncated response
+    left open and dropping array elements that were cut off.
+
+    Complete subtrees are decoded in one json.raw_decode call. An array
+    element that is still arriving is retried whole once a closing bracket
+    comes in, so it is emitted with the chunk holding its "}". Containers
+    that hold array elements, and large or non-strict values, are walked
+    token by token.
+    """
+
+    def __init__(self, emit_items: bool = True):
+        self.emit_items = emit_items
+        self.value = None
+        self.done = False
+        self.truncated = False
+        self._buf = ""
+        self._pos = 0
+        self._started = False
+        # Set while a nested value is retried whole; nothing can complete before a closing bracket
+        self._waiting = False
+        # Open containers as [container, pending key, path]
+        self._stack = []
+        self._items = []
+
+    def feed(self, chunk: str) -> List[Tuple[tuple, dict]]:
+        """Consume a chunk and return the array-element objects it completed"""
+        if self.done:
+            return []
+        # Drop consumed text so the buffer only holds the unfinished tail
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        if self._waiting and "}" not in chunk and "]" not in chunk:
+            return []
+        self._parse(final=False)
+        return self.drain_items()
+
+    def drain_items(self) -> List[Tuple[tuple, dict]]:
+        """Array-element objects completed since the last feed(), e.g. the ones close() finished"""
+        items, self._items = self._items, []
+        return items
+
+    def close(self) -> Any:
+        """The parsed value, recovered from truncation if needed, or None if no JSON was found
+
+        Objects completed while closing are left for drain_items().
+        """
+        if not self.done:
+            self._parse(final=True)
+        if self._stack:
+            self.truncated = True
+            # Keep complete elements, but not the outermost array element that was cut off
+            for container, _, _ in self._stack[:-1]:
+                if isinstance(container, list):
+                    container.pop()
+                    break
+            self.value = self._stack[0][0]
+            self._stack = []
+        self.done = True
+        return self.value
+
+    def _parse(self, final: bool):
+        buf = self._buf
+        end = len(buf)
+        pos = self._pos
+        stack = self._stack
+        self._waiting = False
+
+        if not self._started:
+            while True:
+                match = _START_RE.search(buf, pos)
+                if match is None:
+                    # Keep a possible partial fence for the next chunk
+                    self._pos = max(pos, end - 2)
+                    return
+                if match.group() == "```":
+                    newline = buf.find("\n", match.end())
+                    if newline == -1:
+                        self._pos = match.start()
+                        return
+                    pos = newline + 1
+                    continue
+                pos = match.start()
+                self._started = True
+                break
+
+        while True:
+            pos = _SKIP_RE.match(buf, pos).end()
+            if pos >= end:
+                break
+            char = buf[pos]
+            frame = stack[-1] if stack else None
+
+            if char in "}]":
+                pos += 1
+                if frame is None:
+                    continue
+                stack.pop()
+                self._closed(frame[0], frame[2], stack)
+                if not stack:
+                    self.value = frame[0]
+                    self.done = True
+                    break
+                continue
+
+            if frame is not None and isinstance(frame[0], dict) and frame[1] is None:
+                # Object keys
+                if char != '"':
+                    pos += 1
+                    continue
+                try:
+                    frame[1], pos = scanstring(buf, pos + 1)
+                except ValueError:
+                    break
+                continue
+
+            if char in "{[":
+                try:
+                    value, pos = _DECODER.raw_decode(buf, pos)
+                except json.JSONDecodeError as error:
+                    if not final and end - pos < _RETRY_CHARS and self._in_element(char) and _incomplete(error, end):
+                        self._waiting = True
+                        break
+                    # Holds array elements, is large, or is not strict JSON: walk into it
+                    container = {} if char == "{" else []
+                    path = self._attach(container, stack)
+                    stack.append([container, None, path])
+                    pos += 1
+                    continue
+                path = self._attach(value, stack)
+                if not stack:
+                    self.value = value
+                    self.done = True
+                    break
+                if self.emit_items and isinstance(value, (dict, list)):
+                    self._emit_nested(value, path, isinstance(stack[-1][0], list))
+                continue
+
+            if char == '"':
+                try:
+                    value, next_pos = scanstring(buf, pos + 1)
+                except ValueError:
+                    break
+            else:
+                match = _NUMBER_RE.match(buf, pos)
+                if match:
+                    if match.end() == end and not final:
+                        break
+                    text = match.group()
+                    try:
+                        value = float(text) if any(c in text for c in ".eE") else int(text)
+                    except ValueError:
+                        pos = match.end()
+                        continue
+                    next_pos = match.end()
+                else:
+                    literal = next((word for word in _LITERALS if buf.startswith(word, pos)), None)
+                    if literal is None:
+                        if not final and any(word.startswith(buf[pos:end]) for word in _LITERALS):
+                            break
+                        # Stray character, e.g. an unquoted word; skip it
+                        pos += 1
+                        continue
+                    value, next_pos = _LITERALS[literal], pos + len(literal)
+            pos = next_pos
+            self._attach(value, stack)
+
+        self._pos = pos
+
+    def _in_element(self, char: str) -> bool:
+        """Whether a value opening here is, or sits inside, an array element (and isn't an array of them)"""
+        stack = self._stack
+        if not any(isinstance(frame[0], list) for frame in stack):
+            return False
+        return not (char == "[" and isinstance(stack[-1][0], list))
+
+    def _attach(self, value, stack: list) -> tuple:
+        """Add a value to the innermost open container and return its path"""
+        if not stack:
+            return ()
+        frame = stack[-1]
+        container = frame[0]
+        if isinstance(container, list):
+            path = frame[2] + (len(container),)
+            container.append(value)
+        else:
+            key = frame[1]
+            if key is None:
+                return frame[2]
+            path = frame[2] + (key,)
+            container[key] = value
+            frame[1] = None
+        return path
+
+    def _closed(self, container, path: tuple, stack: list):
+        if self.emit_items and stack and isinstance(container, dict) and isinstance(stack[-1][0], list):
+            self._items.append((path, container))
+
+    def _emit_nested(self, value, path: tuple, in_list: bool):
+        """Emit the array-element objects inside a subtree that was decoded in one go, innermost first"""
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if isinstance(item, (dict, list)):
+                    self._emit_nested(item, path + (key,), False)
+            if in_list:
+                self._items.append((path, value))
+        else:
+            for index, item in enumerate(value):
+                if isinstance(item, (dict, list)):
+                    self._emit_nested(item, path + (index,), True)
+
+
+def _incomplete(error: json.JSONDecodeError, end: int) -> bool:
+    """Whether a decode error is just the input running out, rather than malformed JSON"""
+    return error.pos >= end - 5 or error.msg.startswith("Unterminated string")
+
+
+def parse_tolerant(text: str) -> Any:
+    """Parse the first JSON object or array in text, skipping fences and prose and recovering truncation
+
+    Raises ValueError when the text holds no JSON value at all.
+    """
+    # A fenced block wins over brackets that happen to appear in prose before it
+    fence = text.find("```")
+    if fence != -1:
+        text = text[fence:]
+    else:
+        # The value starts at the first "{", or earlier at a "[" that opens an array rather than "[some]" prose
+        start = text.find("{")
+        array = _ARRAY_START_RE.search(text)
+        if array is not None and (start == -1 or array.start() < start):
+            start = array.start()
+        if start == -1:
+            raise ValueError("No JSON object or array found")
+        # One clean decode covers complete values; anything else is recovered by the streaming parser
+        try:
+            return _DECODER.raw_decode(text, start)[0]
+        except json.JSONDecodeError:
+            text = text[start:]
+    parser = StreamingJSONParser(emit_items=False)
+    parser.feed(text)
+    value = parser.close()
+    if value is None:
+        raise ValueError("No JSON object or array found")
+    return value
@@ -1,14 +1,26 @@
+import os
 from .base_agent import BaseAgent
-import time
-import json
+from .pricing_engine import PricingEngine
+from .property_catalog import MIN_PRICE, find_prices, get_property_catalog, parse_price
+from .schemas import NEGOTIATION_SCHEMA, parse_json
+
+# Properties from the conversation priced alongside the one being negotiated
+NEGOTIATION_MAX_PROPERTIES = int(os.getenv('NEGOTIATION_MAX_PROPERTIES', '4'))
 
 class NegotiationAgent(BaseAgent):
+    agent_type = "negotiation"
+    details_key = "strategy"
+    schema = NEGOTIATION_SCHEMA
+    fallback_greeting = "Hi, I'm Jessica! 💰 Let's make sure you get the best deal possible."
+    
     def __init__(self, api_key):
         super().__init__(api_key)
         self.name = "Jessica"
         self.emoji = "💰"
+        self.catalog = get_property_catalog()
+        self.pricing_engine = PricingEngine(self.catalog)
         
-    def get_greeting(self) -> str:
+    def _generate_greeting(self) -> str:
         """Generate a dynamic, personalized greeting"""
         greeting_prompt = """Generate a friendly, confident greeting from Jessica, the Master Negotiator (use emoji 💰).
         Make it warm and professional, showing expertise in real estate negotiations.
@@ -17,12 +29,8 @@ class NegotiationAgent(BaseAgent):
         response = self.generate_response(greeting_prompt)
         return response.strip()
         
-    def process(self, prompt: str, context: dict = None) -> dict:
-        """Process user request and generate negotiation strategy with context awareness"""
-        # First, send the greeting
-        greeting = self.get_greeting()
-        time.sleep(2)  # Add a natural pause
-        
+    def _build_prompt(self, prompt: str, context: dict = None) -> str:
+        """Build the negotiation strategy prompt with context awareness"""
         # Build context-aware prompt
         context_info = ""
         initial_price = None
@@ -40,6 +48,7 @@ class NegotiationAgent(BaseAgent):
         
         if property_details:
             context_info = "Current Property Details:\n" + "\n".join(property_details)
+        context_info += self._format_summary(context)
         
         # Generate the negotiation response
         strategy_prompt = f"""As Jessica, a confident Master Negotiator (💰), create a detailed negotiation strategy:
@@ -68,18 +77,84 @@ class NegotiationAgent(BaseAgent):
         - Generate market insights that align with the property's features and value
         - Don't reference external market data or websites"""
 
-        response = self.generate_response(strategy_prompt)
-        negotiation_response = response.strip()
-        
-        # Structure the response
-        return {
-            "message": f"{greeting}\n\n{negotiation_response}",
-            "details": {
-                "type": "negotiation",
-                "greeting_delay": 2,
-                "strategy": self._extract_strategy_from_response(negotiation_response)
-            }
-        }
+        return strategy_prompt
+        
+    def _lookup_details(self, prompt: str, context: dict = None):
+        """Offer numbers from the pricing engine for the property being discussed"""
+        plans = self.pricing_engine.plan(self._negotiation_targets(prompt, context))
+        if not plans:
+            return None
+        self._count_structured("pricing_engine")
+        details = plans[0]
+        if len(plans) > 1:
+            details["alternatives"] = [
+                {
+                    "name": plan["property"]["name"],
+                    "listed_price": plan["property"]["listed_price"],
+                    "initial_offer": plan["offer_strategy"]["initial_offer"],
+                    "walk_away": plan["offer_strategy"]["walk_away"]
+                }
+                for plan in plans[1:]
+            ]
+        return details
+        
+    def _negotiation_targets(self, prompt: str, context: dict = None) -> list:
+        """Property named in the request first, then those from the conversation, most recent first"""
+        targets = []
+        if self.catalog is not None:
+            row = self.catalog.find(prompt)
+            if row is not None:
+                targets.append(self.catalog.record(row))
+                
+        names = {target["name"] for target in targets}
+        for prop in (context or {}).get("properties", []):
+            if prop.get("name") not in names:
+                targets.append(prop)
+                names.add(prop.get("name"))
+        # Listings without a usable price can't be priced, so they don't take a slot
+        targets = [target for target in targets if parse_price(target.get("price")) >= MIN_PRICE]
+                
+        if not targets:
+            # No known property, but the user may have quoted a price
+            prices = find_prices(prompt)
+            if prices:
+                targets.append({"name": "the property", "price": prices[0]})
+        return targets[:NEGOTIATION_MAX_PROPERTIES]
+        
+    def _build_narration_prompt(self, prompt: str, context: dict, details: dict) -> str:
+        """Ask Jessica to explain the computed strategy using exactly its numbers"""
+        offer = details["offer_strategy"]
+        alternatives = "\n".join(
+            f"- {alt['name']}: listed {alt['listed_price']}, open at {alt['initial_offer']}, walk away above {alt['walk_away']}"
+            for alt in details.get("alternatives", [])
+        )
+        others = f"Other properties discussed:\n{alternatives}\n" if alternatives else ""
+        
+        return f"""As Jessica, a confident Master Negotiator (💰), explain this negotiation strategy for {details['property']['name']}:
+
+        Listed price: {details['property']['listed_price']}
+        Estimated fair value: {details['property_valuation']['suggested_value']}
+        Market read: {details['market_analysis']['current_conditions']}
+        Value factors: {'; '.join(details['property_valuation']['value_factors'])}
+        Opening offer: {offer['initial_offer']}
+        Counter-offer ladder: {'; '.join(offer['counter_scenarios'])}
+        Walk-away point: {offer['walk_away']}
+        {others}
+        User Request: {prompt}
+
+        Create a natural, conversational response that includes:
+        1. A brief analysis of the situation
+        2. The strategy above: opening offer, how to move up the ladder, and when to walk away
+        3. A few key negotiation tips
+        4. A follow-up question to refine the strategy
+        
+        Make the response confident but friendly, with occasional light humor.
+        
+        Important: Use exactly the prices above. Don't compute or invent other numbers."""
+        
+    def _extract_details(self, response: str) -> dict:
+        """Extract the structured details for this agent's response"""
+        return self._extract_strategy_from_response(response)
         
     def _extract_strategy_from_response(self, response: str) -> dict:
         """Extract and structure negotiation strategy from the LLM response"""
@@ -98,8 +173,9 @@ class NegotiationAgent(BaseAgent):
         Return only the JSON object with the structured strategy."""
         
         try:
-            structured_response = self.generate_response(extraction_prompt)
-            return json.loads(structured_response)
+            # Extraction is deterministic for a given response, so it is cacheable
+            structured_response = self.generate_response(extraction_prompt, cache=True)
+            return parse_json(structured_response)
         except:
             # Fallback to simple structure if JSON parsing fails
             return {
@@ -1,50 +1,124 @@
 from typing import Dict, List
-from .base_agent import BaseAgent
-from .property_search import PropertySearchAgent
-from .amenities import AmenitiesAgent
-from .negotiation import NegotiationAgent
-from .closing import ClosingAgent
-import google.generativeai as genai
+from .base_agent import BaseAgent, MODEL_NAME
+from .batch import parse_batch, plan_batch
+from .context_budget import ContextCompactor
+from .router import Router, plan_levels
+from .sessions import Session, SessionStore
+from .speculation import Speculator
+from utils.llm_cache import get_llm_cache
+from utils.llm_client import get_llm_client
+from utils.logger import bind_log_context, get_logging_stats, request_log_context
+from utils.metrics import (AGENT_ERRORS, AGENT_FALLBACKS, BATCH_ITEMS, LLM_CACHE_HITS, LLM_CALLS, REGISTRY, REQUEST_SECONDS,
+                           stage_timer)
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
+import contextvars
+import importlib
 import json
+import os
+import threading
+import time
+import uuid
+
+# Runs the parallel branches of multi-agent plans. Kept apart from the agents'
+# executor, which the branches themselves use for greetings.
+_plan_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('PLAN_EXECUTOR_WORKERS', '8')),
+    thread_name_prefix='agent-plan'
+)
 
 class Orchestrator:
     def __init__(self, api_key: str):
+        start = time.perf_counter()
         self.api_key = api_key
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-lite')
+        self.model = get_llm_client(api_key, MODEL_NAME)
+        self.llm_cache = get_llm_cache()
         
-        # Initialize all agents with their personalities
+        # Agents and their personalities. Each agent is built from its
+        # 'factory' (module.Class) on first use, see get_agent()
         self.agents = {
             'property_search': {
-                'agent': PropertySearchAgent(api_key),
+                'factory': 'property_search.PropertySearchAgent',
                 'name': 'Mike',
                 'role': 'Property Search Expert',
                 'emoji': '🏠',
                 'description': 'Specialized in finding perfect properties based on your requirements'
             },
             'amenities': {
-                'agent': AmenitiesAgent(api_key),
+                'factory': 'amenities.AmenitiesAgent',
                 'name': 'Emma',
                 'role': 'Amenities Research Specialist',
                 'emoji': '🌟',
                 'description': 'Researches all amenities within 5 miles of properties'
             },
             'negotiation': {
-                'agent': NegotiationAgent(api_key),
+                'factory': 'negotiation.NegotiationAgent',
                 'name': 'Jessica',
                 'role': 'Master Negotiator',
                 'emoji': '💰',
                 'description': 'Expert in property price negotiations and deal-making'
             },
             'closing': {
-                'agent': ClosingAgent(api_key),
+                'factory': 'closing.ClosingAgent',
                 'name': 'Robert',
                 'role': 'Closing Specialist',
                 'emoji': '📝',
                 'description': 'Handles all aspects of closing and property handover'
             }
         }
-        self.conversation_history = []
+        self.sessions = SessionStore()
+        self.context_compactor = ContextCompactor()
+        self.router = Router(
+            llm_fallback=self._llm_determine_agent,
+            async_llm_fallback=self._allm_determine_agent
+        )
+        # Opt-in: compound requests fan out to several agents instead of one
+        self.fanout = os.getenv('ORCHESTRATOR_FANOUT', 'false').lower() in ('1', 'true', 'yes')
+        # Opt-in: start the locally predicted agent while the LLM router decides
+        self.speculator = Speculator()
+        self._agents_lock = threading.Lock()
+        self.startup_timings = {}
+            
+        # Cache, router, client and session counters are read at scrape time
+        REGISTRY.register_collector("orchestrator", self._collect_metrics)
+        self.startup_timings["init_seconds"] = time.perf_counter() - start
+        
+    def get_agent(self, agent_type: str) -> BaseAgent:
+        """Return the agent for agent_type, building it on first use"""
+        agent_info = self.agents[agent_type]
+        if 'agent' not in agent_info:
+            with self._agents_lock:
+                if 'agent' not in agent_info:
+                    start = time.perf_counter()
+                    # Importing here keeps the agents' data dependencies off the startup path
+                    module_name, class_name = agent_info['factory'].rsplit('.', 1)
+                    agent_class = getattr(importlib.import_module(f".{module_name}", __package__), class_name)
+                    agent = agent_class(self.api_key)
+                    # Pre-generate greetings off the request path
+                    agent.greeting_pool.start()
+                    self.startup_timings[f"build_{agent_type}_seconds"] = time.perf_counter() - start
+                    agent_info['agent'] = agent
+        return agent_info['agent']
+        
+    async def aget_agent(self, agent_type: str) -> BaseAgent:
+        """Async variant of get_agent(); a first-use build (catalog load, precompute) runs off the event loop"""
+        agent = self.agents[agent_type].get('agent')
+        if agent is not None:
+            return agent
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_agent, agent_type)
+        
+    def warm_up(self, fill_greetings: bool = False):
+        """Build every agent before the first request, optionally filling greeting pools synchronously"""
+        start = time.perf_counter()
+        for agent_type in self.agents:
+            agent = self.get_agent(agent_type)
+            if fill_greetings:
+                agent.greeting_pool.fill()
+        self.startup_timings["warm_up_seconds"] = time.perf_counter() - start
+        
+    def _built_agents(self) -> dict:
+        """Agents constructed so far, by type"""
+        return {agent_type: info['agent'] for agent_type, info in self.agents.items() if 'agent' in info}
         
     def welcome_message(self) -> dict:
         """Return a structured welcome message introducing the team"""
@@ -83,7 +157,51 @@ class Orchestrator:
         
     def determine_agent(self, prompt: str) -> str:
         """Determine which agent should handle the user's request"""
-        analysis_prompt = f"""As a Real Estate Team Lead, analyze this user request and determine which specialized agent would be most appropriate to handle it. Consider:
+        # Clear-cut requests are routed locally, only ambiguous ones reach the LLM
+        with stage_timer("routing", "router"):
+            return self.router.route(prompt)["agent"]
+        
+    async def adetermine_agent(self, prompt: str) -> str:
+        """Async variant of determine_agent() that awaits the LLM fallback"""
+        with stage_timer("routing", "router"):
+            return (await self.router.aroute(prompt))["agent"]
+        
+    def plan_agents(self, prompt: str):
+        """Multi-agent plan for a compound request, or None to route to a single agent"""
+        if not self.fanout:
+            return None
+        with stage_timer("planning", "router"):
+            return self.router.plan(prompt)
+            
+    def _llm_determine_agent(self, prompt: str) -> str:
+        """Ask the LLM which agent should handle the user's request"""
+        routing_prompt = self._routing_prompt(prompt)
+        cache_key = self.llm_cache.key(MODEL_NAME, routing_prompt)
+        text = self.llm_cache.get(cache_key)
+        if text is None:
+            LLM_CALLS.inc(agent="router", mode="sync")
+            text = self.model.generate_content(routing_prompt).text
+            self.llm_cache.put(cache_key, text)
+        else:
+            LLM_CACHE_HITS.inc(agent="router")
+        return text.strip().lower()
+        
+    async def _allm_determine_agent(self, prompt: str) -> str:
+        """Async variant of _llm_determine_agent()"""
+        routing_prompt = self._routing_prompt(prompt)
+        cache_key = self.llm_cache.key(MODEL_NAME, routing_prompt)
+        text = self.llm_cache.get(cache_key)
+        if text is None:
+            LLM_CALLS.inc(agent="router", mode="async")
+            text = (await self.model.generate_content_async(routing_prompt)).text
+            self.llm_cache.put(cache_key, text)
+        else:
+            LLM_CACHE_HITS.inc(agent="router")
+        return text.strip().lower()
+        
+    def _routing_prompt(self, prompt: str) -> str:
+        """Prompt asking the LLM to pick the agent for a request"""
+        return f"""As a Real Estate Team Lead, analyze this user request and determine which specialized agent would be most appropriate to handle it. Consider:
 
 Property Search Agent (Mike):
 - Initial property searches
@@ -109,111 +227,607 @@ User Request: {prompt}
 
 Respond with just one agent type: property_search, amenities, negotiation, or closing"""
         
-        response = self.model.generate_content(analysis_prompt)
-        return response.text.strip().lower()
+    def routing_stats(self) -> dict:
+        """Return how many requests took the local fast path versus the LLM"""
+        return self.router.get_stats()
+        
+    def llm_cache_stats(self) -> dict:
+        """Return LLM response cache hit, miss and eviction counters"""
+        return self.llm_cache.get_stats()
+        
+    def llm_client_stats(self) -> dict:
+        """Return LLM client retry, timeout, hedge and circuit breaker counters"""
+        return self.model.get_stats()
+        
+    def prompt_stats(self) -> dict:
+        """Return context compaction savings and per-agent prompt sizes"""
+        return {
+            "context": self.context_compactor.get_stats(),
+            "agents": {
+                agent_type: agent.get_prompt_stats()
+                for agent_type, agent in self._built_agents().items()
+            }
+        }
         
-    def process_request(self, prompt: str) -> dict:
+    def startup_stats(self) -> dict:
+        """Return orchestrator and per-agent construction times and which agents are built"""
+        return {
+            "timings": dict(self.startup_timings),
+            "built_agents": list(self._built_agents())
+        }
+        
+    def speculation_stats(self) -> dict:
+        """Return speculative execution hits, wasted runs, skips and latency saved"""
+        return self.speculator.get_stats()
+        
+    def session_stats(self) -> dict:
+        """Return resident session counts and approximate memory held"""
+        return self.sessions.get_stats()
+        
+    def _collect_metrics(self) -> list:
+        """Existing stats dicts as (name, type, help, samples) for the /metrics registry"""
+        cache = self.llm_cache.get_stats()
+        client = self.model.get_stats()
+        sessions = self.sessions.get_stats()
+        context = self.context_compactor.get_stats()
+        metrics = [
+            ("realestate_llm_response_cache_total", "counter", "Shared LLM response cache lookups",
+             [({"result": "hit"}, cache.get("hits", 0)), ({"result": "miss"}, cache.get("misses", 0))]),
+            ("realestate_llm_response_cache_hit_ratio", "gauge", "Shared LLM response cache hit rate",
+             [({}, cache["hit_rate"])]),
+            ("realestate_llm_response_cache_entries", "gauge", "Entries held by the LLM response cache",
+             [({}, cache["entries"])]),
+            ("realestate_routing_total", "counter", "Routed requests by routing path",
+             [({"source": source}, count) for source, count in self.router.get_stats()["by_source"].items()]),
+            ("realestate_llm_client_events_total", "counter", "LLM client retries, timeouts, hedges and failures",
+             [({"event": event}, client.get(event, 0))
+              for event in ("calls", "retries", "timeouts", "hedges", "failures", "short_circuited")]),
+            ("realestate_llm_circuit_open", "gauge", "1 while the LLM circuit breaker is open",
+             [({}, int(client["breaker_state"] == "open"))]),
+            ("realestate_sessions", "gauge", "Resident conversation sessions",
+             [({}, sessions["sessions"])]),
+            ("realestate_session_bytes", "gauge", "Approximate bytes held by resident sessions",
+             [({}, sessions["approx_bytes"])]),
+            ("realestate_context_tokens_total", "counter", "Agent context tokens before and after compaction",
+             [({"phase": "full"}, context.get("full_tokens", 0)),
+              ({"phase": "compacted"}, context.get("compacted_tokens", 0))])
+        ]
+        
+        # Memo caches of the data-backed agents, when their datasets are present
+        caches = []
+        agents = self._built_agents()
+        amenity_index = getattr(agents.get('amenities'), 'amenity_index', None)
+        if amenity_index is not None:
+            caches.append(("amenity_summary", amenity_index.get_stats()))
+        planner = getattr(agents.get('closing'), 'planner', None)
+        if planner is not None:
+            caches.append(("closing_plan", planner.get_stats()))
+        metrics.append(("realestate_log_records_sampled_out_total", "counter",
+                        "INFO and DEBUG records dropped while the log queue was backed up",
+                        [({}, get_logging_stats()["sampled_out"])]))
+        if caches:
+            metrics.append(("realestate_local_cache_total", "counter", "Lookups in the agents' local memo caches", [
+                ({"cache": name, "result": result}, stats.get(f"{result}s", 0))
+                for name, stats in caches for result in ("hit", "miss")
+            ]))
+        return metrics
+        
+    def structured_output_stats(self) -> dict:
+        """Return per-agent counts of inline structured output versus extraction fallbacks"""
+        return {
+            agent_type: agent.get_structured_output_stats()
+            for agent_type, agent in self._built_agents().items()
+        }
+        
+    def process_request(self, prompt: str, session_id: str = None) -> dict:
         """Process the user's request and return a structured response"""
-        # Keep track of conversation
-        self.conversation_history.append({"role": "user", "message": prompt})
+        with REQUEST_SECONDS.time(mode="sync"), request_log_context(session_id, mode="sync"):
+            # Keep track of conversation, per client session
+            return self._process_request(prompt, self.sessions.get(session_id))
+            
+    def _process_request(self, prompt: str, session: Session) -> dict:
+        bind_log_context(session_id=session.session_id)
+        session.append({"role": "user", "message": prompt})
         
+        plan = self.plan_agents(prompt)
+        if plan is not None:
+            return {
+                "conversation": [self._plan_handoff_entry(plan["agents"]), *self._iter_plan(plan, session)],
+                "plan": plan["agents"],
+                "session_id": session.session_id
+            }
+            
         # Determine which agent should handle the request
+        speculation = self._start_speculation(prompt, session)
         agent_type = self.determine_agent(prompt)
+        speculation = self._check_speculation(speculation, agent_type)
         
-        if agent_type in self.agents:
-            # Get agent info
-            agent_info = self.agents[agent_type]
-            
-            # First, have Sarah acknowledge and hand off
-            response = {
-                "conversation": [
-                    {
-                        "name": "Sarah",
-                        "role": "Lead Real Estate Advisor",
-                        "emoji": "👱‍♀️",
-                        "message": f"I'll have {agent_info['name']}, our {agent_info['role']}, assist you with this.",
-                        "type": "handoff"
-                    }
-                ]
-            }
+        if agent_type not in self.agents:
+            return self._unknown_agent_response(session)
             
-            try:
+        # First, have Sarah acknowledge and hand off
+        agent_info = self.agents[agent_type]
+        bind_log_context(agent=agent_type)
+        response = {
+            "conversation": [self._handoff_entry(agent_info)]
+        }
+        
+        try:
+            if speculation is not None:
+                # The agent already ran (or is running) on the right guess
+                agent_response = self._speculative_response(speculation)
+            else:
                 # Get relevant context from conversation history
-                context = self._build_context_for_agent(agent_type)
+                context = self._build_context_for_agent(agent_type, session, prompt)
                 
                 # Process request with the appropriate agent
-                agent_response = agent_info['agent'].process(prompt, context)
-                
-                # Structure the raw response if it's a string
-                if isinstance(agent_response, str):
-                    agent_response = {
-                        "message": agent_response,
-                        "details": {}
-                    }
-                
-                # Format and update shared context
-                formatted_output = self._format_agent_output(agent_type, agent_response["message"])
-                self._update_shared_context(agent_type, formatted_output)
-                
-                # Add agent's response
-                response["conversation"].append({
-                    "name": agent_info['name'],
-                    "role": agent_info['role'],
-                    "emoji": agent_info['emoji'],
-                    "message": agent_response["message"],
-                    "type": "response",
-                    "details": formatted_output
-                })
+                with stage_timer("agent", agent_type):
+                    agent_response = self.get_agent(agent_type).process(prompt, context)
+            response["conversation"].append(self._record_agent_response(agent_type, agent_response, session))
+            
+        except Exception as e:
+            AGENT_ERRORS.inc(agent=agent_type, error=type(e).__name__)
+            response["conversation"].append(self._clarification_entry(agent_type))
+        
+        response["session_id"] = session.session_id
+        return response
+        
+    async def aprocess_request(self, prompt: str, session_id: str = None) -> dict:
+        """Async variant of process_request() for the ASGI app, never blocking on the LLM"""
+        with REQUEST_SECONDS.time(mode="async"), request_log_context(session_id, mode="async"):
+            return await self._aprocess_request(prompt, await self.sessions.aget(session_id))
+            
+    async def _aprocess_request(self, prompt: str, session: Session) -> dict:
+        bind_log_context(session_id=session.session_id)
+        session.append({"role": "user", "message": prompt})
+        
+        plan = self.plan_agents(prompt)
+        if plan is not None:
+            return {
+                "conversation": [self._plan_handoff_entry(plan["agents"]), *await self._aplan_entries(plan, session)],
+                "plan": plan["agents"],
+                "session_id": session.session_id
+            }
+            
+        speculation = self._astart_speculation(prompt, session)
+        agent_type = await self.adetermine_agent(prompt)
+        speculation = self._check_speculation(speculation, agent_type)
+        if agent_type not in self.agents:
+            return self._unknown_agent_response(session)
+            
+        agent_info = self.agents[agent_type]
+        bind_log_context(agent=agent_type)
+        response = {
+            "conversation": [self._handoff_entry(agent_info)]
+        }
+        
+        try:
+            if speculation is not None:
+                agent_response = await self._aspeculative_response(speculation)
+            else:
+                context = self._build_context_for_agent(agent_type, session, prompt)
+                with stage_timer("agent", agent_type):
+                    agent_response = await (await self.aget_agent(agent_type)).aprocess(prompt, context)
+            response["conversation"].append(self._record_agent_response(agent_type, agent_response, session))
+        except Exception as e:
+            AGENT_ERRORS.inc(agent=agent_type, error=type(e).__name__)
+            response["conversation"].append(self._clarification_entry(agent_type))
+            
+        response["session_id"] = session.session_id
+        return response
+        
+    def process_request_stream(self, prompt: str, session_id: str = None):
+        """
+        Process the user's request, yielding (event, data) pairs as the reply is produced
+        
+        Events are "handoff" (Sarah's entry, sent as soon as routing is done),
+        "token" (chunks of the specialist's greeting and prose), "item" (each
+        property, amenity etc. as soon as its JSON object closes), then either
+        "response" (the specialist's complete entry with details) or
+        "clarification". The final entries match what process_request returns.
+        """
+        # Timed until the last event is consumed, so slow clients count too
+        with REQUEST_SECONDS.time(mode="stream"), request_log_context(session_id, mode="stream"):
+            yield from self._process_request_stream(prompt, session_id)
+            
+    def _process_request_stream(self, prompt: str, session_id: str = None):
+        session = self.sessions.get(session_id)
+        bind_log_context(session_id=session.session_id)
+        session.append({"role": "user", "message": prompt})
+        
+        plan = self.plan_agents(prompt)
+        if plan is not None:
+            # Each agent's entry is sent as soon as its level of the plan finishes
+            yield "handoff", dict(self._plan_handoff_entry(plan["agents"]), session_id=session.session_id)
+            for entry in self._iter_plan(plan, session):
+                yield entry["type"], entry
+            return
+            
+        agent_type = self.determine_agent(prompt)
+        if agent_type not in self.agents:
+            response = self._unknown_agent_response(session)
+            yield "clarification", dict(response["conversation"][0], session_id=session.session_id)
+            return
+            
+        agent_info = self.agents[agent_type]
+        bind_log_context(agent=agent_type)
+        yield "handoff", dict(self._handoff_entry(agent_info), session_id=session.session_id)
+        
+        try:
+            context = self._build_context_for_agent(agent_type, session, prompt)
+            for event, payload in self.get_agent(agent_type).stream(prompt, context):
+                if event == "greeting":
+                    yield "token", {"name": agent_info['name'], "text": f"{payload}\n\n"}
+                elif event == "token":
+                    yield "token", {"name": agent_info['name'], "text": payload}
+                elif event == "item":
+                    yield "item", dict(payload, name=agent_info['name'])
+                else:
+                    yield "response", self._record_agent_response(agent_type, payload, session)
+        except Exception as e:
+            AGENT_ERRORS.inc(agent=agent_type, error=type(e).__name__)
+            yield "clarification", self._clarification_entry(agent_type)
+            
+    def _iter_plan(self, plan: dict, session):
+        """Run a plan level by level, yielding each agent's conversation entry
+        
+        Agents within a level run in parallel; a level starts once the levels
+        it depends on are recorded, so e.g. amenities see the properties just
+        found. Entries come out in plan order.
+        """
+        bind_log_context(agent="+".join(plan["agents"]))
+        for level in plan_levels(plan["agents"]):
+            futures = [
+                _plan_executor.submit(contextvars.copy_context().run,
+                                      self._run_agent, agent_type, plan["prompts"][agent_type], session)
+                for agent_type in level
+            ]
+            for agent_type, future in zip(level, futures):
+                yield self._planned_entry(agent_type, future.exception() or future.result(), session)
                 
-                # Keep track of conversation with context
-                self.conversation_history.append({
-                    "role": "agent",
-                    "agent": agent_info['name'],
-                    "message": agent_response["message"],
-                    "context": formatted_output
-                })
+    async def _aplan_entries(self, plan: dict, session) -> list:
+        """Async variant of _iter_plan(), returning all entries"""
+        bind_log_context(agent="+".join(plan["agents"]))
+        entries = []
+        for level in plan_levels(plan["agents"]):
+            results = await asyncio.gather(*(
+                self._arun_agent(agent_type, plan["prompts"][agent_type], session) for agent_type in level
+            ), return_exceptions=True)
+            entries.extend(self._planned_entry(agent_type, result, session) for agent_type, result in zip(level, results))
+        return entries
+        
+    def _run_agent(self, agent_type: str, prompt: str, session) -> dict:
+        """One plan branch: the agent's reply to its part of the request"""
+        context = self._build_context_for_agent(agent_type, session, prompt)
+        with stage_timer("agent", agent_type):
+            return self.get_agent(agent_type).process(prompt, context)
+            
+    async def _arun_agent(self, agent_type: str, prompt: str, session) -> dict:
+        """Async variant of _run_agent()"""
+        context = self._build_context_for_agent(agent_type, session, prompt)
+        with stage_timer("agent", agent_type):
+            return await (await self.aget_agent(agent_type)).aprocess(prompt, context)
+            
+    def _planned_entry(self, agent_type: str, result, session) -> dict:
+        """Record a plan branch's reply, or a clarification if the branch raised"""
+        try:
+            if isinstance(result, Exception):
+                raise result
+            return self._record_agent_response(agent_type, result, session)
+        except Exception as e:
+            AGENT_ERRORS.inc(agent=agent_type, error=type(e).__name__)
+            return self._clarification_entry(agent_type)
+            
+    def _start_speculation(self, prompt: str, session):
+        """Start the locally predicted agent if routing will need the LLM and the budget allows
+        
+        Returns None when routing is local anyway, otherwise the prediction
+        and, if a run was started, its future. The speculative run only reads
+        the session; nothing is recorded unless the guess is confirmed.
+        """
+        prediction = self.router.predict_local(prompt)
+        if not self.speculator.wants(prediction, self.router.confidence_threshold):
+            return None
+        speculation = {"agent": prediction["agent"], "run": None, "started": time.perf_counter()}
+        if self.speculator.try_start(prediction):
+            speculation["run"] = _plan_executor.submit(
+                contextvars.copy_context().run, self._timed_run_agent, prediction["agent"], prompt, session
+            )
+            speculation["run"].add_done_callback(self.speculator.finished)
+        return speculation
+        
+    def _astart_speculation(self, prompt: str, session):
+        """Async variant of _start_speculation(), running the agent as a task"""
+        prediction = self.router.predict_local(prompt)
+        if not self.speculator.wants(prediction, self.router.confidence_threshold):
+            return None
+        speculation = {"agent": prediction["agent"], "run": None, "started": time.perf_counter()}
+        if self.speculator.try_start(prediction):
+            speculation["run"] = asyncio.ensure_future(self._atimed_run_agent(prediction["agent"], prompt, session))
+            speculation["run"].add_done_callback(self.speculator.finished)
+        return speculation
+        
+    def _check_speculation(self, speculation, agent_type: str):
+        """Score the guess against the routed agent; keep the run on a hit, cancel it on a miss"""
+        if speculation is None:
+            return None
+        speculation["routed"] = time.perf_counter()
+        hit = speculation["agent"] == agent_type
+        if speculation["run"] is None:
+            self.speculator.observe(hit, speculated=False)
+            return None
+        if not hit:
+            # Tasks stop at once; a thread that already started runs to the end and is discarded
+            speculation["run"].cancel()
+            self.speculator.observe(False, speculated=True)
+            return None
+        return speculation
+        
+    def _speculative_response(self, speculation: dict) -> dict:
+        """Wait for a confirmed speculative run and count the time it saved"""
+        try:
+            agent_response, finished = speculation["run"].result()
+        except Exception:
+            self.speculator.observe(True, speculated=True)
+            raise
+        self.speculator.observe(True, speculated=True,
+                                saved_seconds=min(speculation["routed"], finished) - speculation["started"])
+        return agent_response
+        
+    async def _aspeculative_response(self, speculation: dict) -> dict:
+        """Async variant of _speculative_response()"""
+        try:
+            agent_response, finished = await speculation["run"]
+        except Exception:
+            self.speculator.observe(True, speculated=True)
+            raise
+        self.speculator.observe(True, speculated=True,
+                                saved_seconds=min(speculation["routed"], finished) - speculation["started"])
+        return agent_response
+        
+    def _timed_run_agent(self, agent_type: str, prompt: str, session) -> tuple:
+        """_run_agent() plus the time it finished"""
+        return self._run_agent(agent_type, prompt, session), time.perf_counter()
+        
+    async def _atimed_run_agent(self, agent_type: str, prompt: str, session) -> tuple:
+        """Async variant of _timed_run_agent()"""
+        return await self._arun_agent(agent_type, prompt, session), time.perf_counter()
+        
+    def process_batch(self, items: list, concurrency: int = None):
+        """
+        Process a batch of messages or transcripts, yielding one result per item as it finishes
+        
+        Items are normalized by parse_batch(). Work runs on a bounded pool of
+        concurrency threads; identical replays are processed once and the
+        result repeated for each copy. Replays use throwaway sessions so they
+        don't evict live conversations, while routing and LLM caches are
+        shared with regular requests. Results carry the item's "index" and
+        "id" since they arrive in completion order.
+        
+        Malformed batches and concurrency values raise ValueError here, before any work starts.
+        """
+        return self._iter_batch(parse_batch(items), self._batch_concurrency(concurrency))
+        
+    def _iter_batch(self, items: list, concurrency: int):
+        pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='batch')
+        try:
+            futures = [
+                pool.submit(self._run_batch_unit, items, replay, indexes)
+                for replay, indexes in plan_batch(items)
+            ]
+            for future in as_completed(futures):
+                yield from future.result()
+        finally:
+            # If the consumer stops early (client disconnected), drop the queued work
+            pool.shutdown(wait=False, cancel_futures=True)
+            
+    def aprocess_batch(self, items: list, concurrency: int = None):
+        """Async variant of process_batch(), returning an async generator of results as items finish"""
+        return self._aiter_batch(parse_batch(items), self._batch_concurrency(concurrency))
+        
+    async def _aiter_batch(self, items: list, concurrency: int):
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run(replay: bool, indexes: list) -> list:
+            async with semaphore:
+                return await self._arun_batch_unit(items, replay, indexes)
                 
-            except Exception as e:
-                # Generate a friendly fallback response based on agent type
-                fallback_responses = {
-                    'property_search': "I understand you're looking for a property. Could you tell me more about what you're looking for in terms of location, budget, and size?",
-                    'amenities': "I'd be happy to check the amenities. Could you specify which property or area you're interested in?",
-                    'negotiation': "I'll help you negotiate the best price. Could you confirm which property you're interested in?",
-                    'closing': "I'll assist with the closing process. Could you specify which property you're planning to move forward with?"
-                }
+        tasks = [asyncio.ensure_future(run(replay, indexes)) for replay, indexes in plan_batch(items)]
+        try:
+            for task in asyncio.as_completed(tasks):
+                for result in await task:
+                    yield result
+        finally:
+            for task in tasks:
+                task.cancel()
                 
-                friendly_response = fallback_responses.get(
-                    agent_type,
-                    f"I'll help you with that! Could you provide a few more details about what you're looking for?"
-                )
+    def _batch_concurrency(self, concurrency=None) -> int:
+        """Requested concurrency capped at BATCH_MAX_CONCURRENCY, or BATCH_CONCURRENCY when not given"""
+        if concurrency is None:
+            concurrency = int(os.getenv('BATCH_CONCURRENCY', '8'))
+        elif isinstance(concurrency, bool) or not isinstance(concurrency, int) or concurrency < 1:
+            raise ValueError("Concurrency must be a positive integer")
+        return min(concurrency, int(os.getenv('BATCH_MAX_CONCURRENCY', '64')))
+        
+    def _run_batch_unit(self, items: list, replay: bool, indexes: list) -> list:
+        """Results for one unit from plan_batch(): a deduplicated replay or one session's items in order"""
+        if replay:
+            responses, error = self._replay(items[indexes[0]]["messages"])
+            return [self._batch_result(index, items[index], responses, error, copy > 0)
+                    for copy, index in enumerate(indexes)]
+        results = []
+        for index in indexes:
+            responses, error = self._replay(items[index]["messages"], items[index]["session_id"])
+            results.append(self._batch_result(index, items[index], responses, error, False))
+        return results
+        
+    async def _arun_batch_unit(self, items: list, replay: bool, indexes: list) -> list:
+        """Async variant of _run_batch_unit()"""
+        if replay:
+            responses, error = await self._areplay(items[indexes[0]]["messages"])
+            return [self._batch_result(index, items[index], responses, error, copy > 0)
+                    for copy, index in enumerate(indexes)]
+        results = []
+        for index in indexes:
+            responses, error = await self._areplay(items[index]["messages"], items[index]["session_id"])
+            results.append(self._batch_result(index, items[index], responses, error, False))
+        return results
+        
+    def _replay(self, messages: list, session_id: str = None) -> tuple:
+        """Run messages in one session, the client's or a throwaway one, returning (responses, error)"""
+        responses = []
+        try:
+            if session_id is not None:
+                for message in messages:
+                    responses.append(self.process_request(message, session_id))
+                return responses, None
+            session = self._replay_session()
+            for message in messages:
+                with REQUEST_SECONDS.time(mode="sync"), request_log_context(session.session_id, mode="sync"):
+                    responses.append(self._process_request(message, session))
+            return responses, None
+        except Exception as e:
+            return responses, str(e)
                 
-                response["conversation"].append({
-                    "name": agent_info['name'],
-                    "role": agent_info['role'],
-                    "emoji": agent_info['emoji'],
-                    "message": friendly_response,
-                    "type": "clarification"
-                })
-            
-            return response
+    async def _areplay(self, messages: list, session_id: str = None) -> tuple:
+        """Async variant of _replay()"""
+        responses = []
+        try:
+            if session_id is not None:
+                for message in messages:
+                    responses.append(await self.aprocess_request(message, session_id))
+                return responses, None
+            session = self._replay_session()
+            for message in messages:
+                with REQUEST_SECONDS.time(mode="async"), request_log_context(session.session_id, mode="async"):
+                    responses.append(await self._aprocess_request(message, session))
+            return responses, None
+        except Exception as e:
+            return responses, str(e)
             
-        else:
-            # If we can't determine the appropriate agent
-            return {
-                "conversation": [
-                    {
-                        "name": "Sarah",
-                        "role": "Lead Real Estate Advisor",
-                        "emoji": "👱‍♀️",
-                        "message": "I apologize, but I'm not sure which of our specialists would be best suited to help with your request. Could you please provide more specific details about what you're looking for?",
-                        "type": "clarification"
-                    }
-                ]
+    def _replay_session(self) -> Session:
+        """A session outside the store: it never evicts live sessions and is never persisted"""
+        return Session(f"batch-{uuid.uuid4().hex}", self.sessions.max_turns)
+                
+    def _batch_result(self, index: int, item: dict, responses: list, error: str, deduplicated: bool) -> dict:
+        """One JSON Lines record for a batch item"""
+        BATCH_ITEMS.inc(outcome="failed" if error else "deduplicated" if deduplicated else "processed")
+        result = {
+            "index": index,
+            "id": item["id"],
+            "responses": [response["conversation"] for response in responses],
+            "deduplicated": deduplicated
+        }
+        if item["session_id"] is not None:
+            result["session_id"] = item["session_id"]
+        if error:
+            result["error"] = error
+        return result
+        
+    def _plan_handoff_entry(self, agent_types: list) -> dict:
+        """Sarah's message handing a compound request to several specialists"""
+        team = [f"{self.agents[agent_type]['name']} ({self.agents[agent_type]['role']})" for agent_type in agent_types]
+        return {
+            "name": "Sarah",
+            "role": "Lead Real Estate Advisor",
+            "emoji": "👱‍♀️",
+            "message": f"I'll have {', '.join(team[:-1])} and {team[-1]} assist you with this.",
+            "type": "handoff"
+        }
+        
+    def _handoff_entry(self, agent_info: dict) -> dict:
+        """Sarah's message handing the request to a specialist"""
+        return {
+            "name": "Sarah",
+            "role": "Lead Real Estate Advisor",
+            "emoji": "👱‍♀️",
+            "message": f"I'll have {agent_info['name']}, our {agent_info['role']}, assist you with this.",
+            "type": "handoff"
+        }
+        
+    def _record_agent_response(self, agent_type: str, agent_response, session) -> dict:
+        """Update shared context and history with an agent's reply and return its conversation entry"""
+        agent_info = self.agents[agent_type]
+        
+        # Structure the raw response if it's a string
+        if isinstance(agent_response, str):
+            agent_response = {
+                "message": agent_response,
+                "details": {}
             }
+        
+        # Format and update shared context
+        details = agent_response["details"].get(agent_info['agent'].details_key)
+        formatted_output = self._format_agent_output(agent_type, agent_response["message"], details)
+        self._update_shared_context(agent_type, formatted_output, session)
+        
+        # Keep track of conversation with context
+        session.append({
+            "role": "agent",
+            "agent": agent_info['name'],
+            "message": agent_response["message"],
+            "context": formatted_output
+        })
+        
+        return {
+            "name": agent_info['name'],
+            "role": agent_info['role'],
+            "emoji": agent_info['emoji'],
+            "message": agent_response["message"],
+            "type": "response",
+            "details": formatted_output,
+            # Display hint: the client pauses after the greeting
+            "greeting_delay": agent_response["details"].get("greeting_delay", 0)
+        }
+        
+    def _clarification_entry(self, agent_type: str) -> dict:
+        """Friendly fallback reply used when an agent fails"""
+        AGENT_FALLBACKS.inc(agent=agent_type)
+        agent_info = self.agents[agent_type]
+        fallback_responses = {
+            'property_search': "I understand you're looking for a property. Could you tell me more about what you're looking for in terms of location, budget, and size?",
+            'amenities': "I'd be happy to check the amenities. Could you specify which property or area you're interested in?",
+            'negotiation': "I'll help you negotiate the best price. Could you confirm which property you're interested in?",
+            'closing': "I'll assist with the closing process. Could you specify which property you're planning to move forward with?"
+        }
+        
+        friendly_response = fallback_responses.get(
+            agent_type,
+            f"I'll help you with that! Could you provide a few more details about what you're looking for?"
+        )
+        
+        return {
+            "name": agent_info['name'],
+            "role": agent_info['role'],
+            "emoji": agent_info['emoji'],
+            "message": friendly_response,
+            "type": "clarification"
+        }
+        
+    def _unknown_agent_response(self, session) -> dict:
+        """Reply used when no specialist fits the request"""
+        return {
+            "conversation": [
+                {
+                    "name": "Sarah",
+                    "role": "Lead Real Estate Advisor",
+                    "emoji": "👱‍♀️",
+                    "message": "I apologize, but I'm not sure which of our specialists would be best suited to help with your request. Could you please provide more specific details about what you're looking for?",
+                    "type": "clarification"
+                }
+            ],
+            "session_id": session.session_id
+        }
             
-    def _format_agent_output(self, agent_type: str, response: str) -> dict:
-        """Format the agent response into structured output based on agent type"""
+    def _format_agent_output(self, agent_type: str, response: str, details=None) -> dict:
+        """Format the agent response into structured output based on agent type
+        
+        Structured details (catalog listings, measured amenity distances) are
+        preferred over parsing the prose when the agent returned them.
+        """
         if agent_type == "property_search":
+            if self._is_item_list(details):
+                return {"final_recommendations": {"properties": details}}
             return {
                 "final_recommendations": {
                     "properties": [
@@ -222,22 +836,65 @@ Respond with just one agent type: property_search, amenities, negotiation, or cl
                 }
             }
         elif agent_type == "amenities":
+            if isinstance(details, dict) and details and all(self._is_item_list(items) for items in details.values()):
+                return {
+                    "nearby_amenities": [
+                        {
+                            "amenity": item["name"],
+                            "category": category,
+                            "distance": item.get("distance", "Nearby"),
+                            "details": item.get("description", "")
+                        }
+                        for category, items in details.items()
+                        for item in items
+                    ]
+                }
             return {
                 "nearby_amenities": self._extract_amenities_info(response)
             }
         elif agent_type == "negotiation":
-            return {
-                "strategy": {
-                    "message": response,
-                    "points": self._extract_negotiation_points(response)
-                }
+            strategy = {
+                "message": response,
+                "points": self._extract_negotiation_points(response)
             }
+            if isinstance(details, dict) and "property" in details and "offer_strategy" in details:
+                # Computed numbers, so later turns quote the same offer
+                strategy.update({
+                    "property": details["property"]["name"],
+                    "price": details["property"]["listed_price"],
+                    "initial_price": details["property"]["listed_price"],
+                    "initial_offer": details["offer_strategy"]["initial_offer"],
+                    "walk_away": details["offer_strategy"].get("walk_away")
+                })
+            return {"strategy": strategy}
         elif agent_type == "closing":
+            if isinstance(details, dict) and "template_version" in details:
+                # The response embeds the rendered plan; build the summary from the plan, not its text
+                costs = details["costs"]
+                key_terms = {
+                    "Financing": details["parameters"]["financing"],
+                    "Closing date": details["parameters"]["closing_date"],
+                    "Price": details["parameters"].get("price"),
+                    "Cash to close": costs.get("estimated_cash_to_close")
+                }
+                closing_info = {
+                    # Keep the deal parameters so follow-up closing questions render the same plan
+                    "parameters": details["parameters"],
+                    "documents_needed": details["documentation"],
+                    "timeline": [f"{step['date']}: {step['description']}" for step in details["timeline"]],
+                    "key_terms": {term: value for term, value in key_terms.items() if value}
+                }
+            else:
+                closing_info = self._extract_closing_info(response)
             return {
-                "closing_details": self._extract_closing_info(response)
+                "closing_details": closing_info
             }
         return {}
         
+    @staticmethod
+    def _is_item_list(items) -> bool:
+        return isinstance(items, list) and bool(items) and all(isinstance(item, dict) and "name" in item for item in items)
+        
     def _extract_property_info(self, response: str) -> dict:
         """Extract property information from the response"""
         lines = response.split('\n')
@@ -318,49 +975,23 @@ Respond with just one agent type: property_search, amenities, negotiation, or cl
                     
         return closing_info
         
-    def _build_context_for_agent(self, agent_type: str) -> dict:
-        """Build relevant context for the agent based on conversation history"""
-        context = {
-            "properties": [],
-            "amenities": [],
-            "negotiation": {},
-            "closing": {}
-        }
-        
-        # Go through conversation history in reverse to get most recent context
-        for entry in reversed(self.conversation_history):
-            if entry["role"] == "agent" and "context" in entry:
-                if "final_recommendations" in entry["context"]:
-                    for prop in entry["context"]["final_recommendations"]["properties"]:
-                        if prop not in context["properties"]:
-                            context["properties"].append(prop)
-                            
-                elif "nearby_amenities" in entry["context"]:
-                    for amenity in entry["context"]["nearby_amenities"]:
-                        if amenity not in context["amenities"]:
-                            context["amenities"].append(amenity)
-                            
-                elif "strategy" in entry["context"]:
-                    context["negotiation"].update(entry["context"]["strategy"])
-                    
-                elif "closing_details" in entry["context"]:
-                    context["closing"].update(entry["context"]["closing_details"])
-        
-        return context
+    def _build_context_for_agent(self, agent_type: str, session, prompt: str = "") -> dict:
+        """Build relevant context for the agent, compacted to the prompt token budget"""
+        # Every agent sees every section; the blackboard views serve shared_context() reads
+        return self.context_compactor.compact(session.context_index, prompt)
         
-    def _update_shared_context(self, agent_type: str, new_context: dict):
+    def _update_shared_context(self, agent_type: str, new_context: dict, session):
         """Update the shared context with new information from an agent"""
-        # Update the context of the specific agent
-        agent = self.agents[agent_type]["agent"]
-        agent.update_shared_context(new_context)
-        
-        # Share relevant information with other agents
-        for other_type, other_info in self.agents.items():
-            if other_type != agent_type:
-                other_agent = other_info["agent"]
-                # Share only relevant information based on agent type
-                shared_info = self._filter_context_for_agent(other_type, new_context)
-                other_agent.update_shared_context(shared_info)
+        session.context_index.add(new_context)
+        # One versioned write; each agent's filtered view is projected when it is read
+        session.blackboard.publish(agent_type, new_context)
+        
+    def shared_context(self, agent_type: str, session_id: str) -> dict:
+        """What agent_type sees of a session's shared context: its own output plus what's relevant from others"""
+        session = self.sessions.peek(session_id)
+        if session is None:
+            return {}
+        return session.blackboard.view(agent_type, self._filter_context_for_agent).get()
                 
     def _filter_context_for_agent(self, agent_type: str, context: dict) -> dict:
         """Filter context based on what's relevant for each agent type"""
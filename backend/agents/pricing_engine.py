@@ -0,0 +1,156 @@
+import json
+import os
+
+import numpy as np
+
+from .property_catalog import MIN_PRICE, format_price, parse_price
+
+# (minimum listed/fair-value ratio, opening discount off fair value, market label),
+# checked top to bottom. Override with a JSON list in NEGOTIATION_RULES.
+DEFAULT_RULES = [
+    [1.05, 0.07, "Listed above comparable homes, so there is room to push"],
+    [0.97, 0.04, "Priced in line with comparable homes"],
+    [0.0, 0.015, "Priced below comparable homes, expect competition"]
+]
+
+TIMELINE = [
+    {"step": "Submit offer", "description": "Within 48 hours, with a 24-hour response deadline"},
+    {"step": "Counter-offers", "description": "Expect one to three rounds over two to four days"},
+    {"step": "Inspection contingency", "description": "Seven to ten days after acceptance to renegotiate on findings"},
+    {"step": "Appraisal", "description": "Two to three weeks out; a low appraisal reopens the price"}
+]
+
+TIPS = [
+    "Get pre-approved so your offer reads as low risk",
+    "Move up the counter-offer ladder in shrinking steps",
+    "Trade price for terms the seller values, like a flexible closing date",
+    "Decide your walk-away price before the first counter and stick to it"
+]
+
+
+class PricingEngine:
+    """Deterministic offer math for NegotiationAgent
+
+    Fair value blends the listed price with comparable listings' price per
+    square foot. Opening offers, counter-offer ladders and walk-away points
+    follow from configurable rules. Everything is computed on arrays, so every
+    property in a conversation is priced in one pass.
+    """
+
+    def __init__(self, catalog=None, rules: list = None, ladder_steps: int = None,
+                 walk_away_premium: float = None, comparables: int = None):
+        self.catalog = catalog
+        rules = rules or json.loads(os.getenv('NEGOTIATION_RULES', 'null') or 'null') or DEFAULT_RULES
+        rules = sorted(rules, key=lambda rule: rule[0], reverse=True)
+        self._rule_ratios = np.array([rule[0] for rule in rules], dtype=np.float64)
+        self._rule_discounts = np.array([rule[1] for rule in rules], dtype=np.float64)
+        self._rule_labels = [rule[2] for rule in rules]
+        self.ladder_steps = ladder_steps or int(os.getenv('NEGOTIATION_LADDER_STEPS', '3'))
+        # How far above fair value the buyer is willing to go, capped at the listed price
+        self.walk_away_premium = walk_away_premium if walk_away_premium is not None else float(
+            os.getenv('NEGOTIATION_WALK_AWAY_PREMIUM', '0.02'))
+        self.comparables = comparables or int(os.getenv('NEGOTIATION_COMPARABLES', '5'))
+
+    def evaluate(self, listed: np.ndarray, fair: np.ndarray) -> dict:
+        """Opening offer, counter ladder and walk-away point for each listed/fair-value pair"""
+        listed = np.asarray(listed, dtype=np.float64)
+        fair = np.asarray(fair, dtype=np.float64)
+        ratio = listed / fair
+        # First rule whose threshold the ratio reaches, else the most lenient one
+        matched = ratio[:, None] >= self._rule_ratios[None, :]
+        rule = np.where(matched.any(axis=1), matched.argmax(axis=1), len(self._rule_labels) - 1)
+        opening = np.minimum(listed, fair) * (1 - self._rule_discounts[rule])
+        walk_away = np.minimum(listed, fair * (1 + self.walk_away_premium))
+        walk_away = np.maximum(walk_away, opening)
+        # Steps shrink as they approach the walk-away point
+        fractions = 1 - (1 - np.arange(1, self.ladder_steps + 1) / self.ladder_steps) ** 2
+        ladder = opening[:, None] + (walk_away - opening)[:, None] * fractions[None, :]
+        return {
+            "ratio": ratio,
+            "rule": rule,
+            "opening": np.round(opening, -3),
+            "ladder": np.round(ladder, -3),
+            "walk_away": np.round(walk_away, -3)
+        }
+
+    def plan(self, properties: list) -> list:
+        """Negotiation details for each property whose listed price parses as a home price"""
+        priced = [(prop, parse_price(prop.get("price"))) for prop in properties]
+        # NaN fails the comparison too
+        priced = [(prop, price) for prop, price in priced if price >= MIN_PRICE]
+        if not priced:
+            return []
+
+        listed = np.array([price for _, price in priced])
+        comparables = [self._comparables(prop) for prop, _ in priced]
+        fair = np.array([
+            self._fair_value(price, prop, comps) for (prop, price), comps in zip(priced, comparables)
+        ])
+        result = self.evaluate(listed, fair)
+        return [
+            self._details(prop, listed[i], fair[i], comparables[i], {key: value[i] for key, value in result.items()})
+            for i, (prop, _) in enumerate(priced)
+        ]
+
+    def _comparables(self, prop: dict) -> dict:
+        if self.catalog is None or not prop.get("location"):
+            return {"count": 0}
+        exclude = self.catalog.find(prop.get("name", ""))
+        sqft = _sqft(prop)
+        rows = self.catalog.comparables(prop["location"], prop.get("type"), sqft, exclude, self.comparables)
+        per_sqft = self.catalog.prices[rows] / self.catalog.sqft[rows]
+        per_sqft = per_sqft[~np.isnan(per_sqft)]
+        return {
+            "count": int(rows.size),
+            "median_price": float(np.median(self.catalog.prices[rows])) if rows.size else None,
+            "median_per_sqft": float(np.median(per_sqft)) if per_sqft.size else None
+        }
+
+    def _fair_value(self, listed: float, prop: dict, comps: dict) -> float:
+        sqft = _sqft(prop)
+        if not np.isnan(sqft) and comps.get("median_per_sqft"):
+            estimate = comps["median_per_sqft"] * sqft
+        elif comps.get("median_price"):
+            estimate = comps["median_price"]
+        else:
+            return listed
+        # Comparables inform the value but don't override the listing outright
+        return 0.5 * listed + 0.5 * estimate
+
+    def _details(self, prop: dict, listed: float, fair: float, comps: dict, result: dict) -> dict:
+        percent = (result["ratio"] - 1) * 100
+        position = f"{abs(percent):.1f}% {'above' if percent >= 0 else 'below'}"
+        ladder = [format_price(step) for step in result["ladder"]]
+        value_factors = [f"Listed at {format_price(listed)}, {position} the estimated fair value"]
+        if comps["count"]:
+            value_factors.append(f"{comps['count']} comparable listings in {prop['location']}")
+            if comps.get("median_per_sqft"):
+                value_factors.append(f"Comparables sell for about ${comps['median_per_sqft']:,.0f} per sq ft")
+
+        return {
+            "property": {"name": prop.get("name", "the property"), "listed_price": format_price(listed)},
+            "market_analysis": {
+                "current_conditions": self._rule_labels[result["rule"]],
+                "trends": f"Listing is {position} comparable value"
+            },
+            "property_valuation": {"suggested_value": format_price(round(fair, -3)), "value_factors": value_factors},
+            "negotiation_points": [
+                f"Open at {format_price(result['opening'])}",
+                f"Counter in steps: {', '.join(ladder)}",
+                f"Walk away above {format_price(result['walk_away'])}",
+                f"Ask for closing cost credits of up to {format_price(round(listed * 0.015, -3))} instead of price cuts"
+            ],
+            "offer_strategy": {
+                "initial_offer": format_price(result["opening"]),
+                "counter_scenarios": [f"If the seller counters, come up to {step}" for step in ladder],
+                "walk_away": format_price(result["walk_away"])
+            },
+            "timeline": [dict(step) for step in TIMELINE],
+            "tips": list(TIPS)
+        }
+
+
+def _sqft(prop: dict) -> float:
+    """Square footage from a number or text like "1,850 sq ft", NaN if missing or unparseable"""
+    sqft = parse_price(prop.get("sqft"))
+    return sqft if sqft > 0 else np.nan
@@ -0,0 +1,403 @@
+import csv
+import json
+import os
+import re
+import threading
+from typing import Optional
+
+import numpy as np
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'properties.csv')
+
+# Words that appear in most feature strings and say nothing on their own
+_FEATURE_STOPWORDS = {"bedroom", "bedrooms", "bathroom", "bathrooms", "with", "and", "the", "room", "rooms", "home", "homes"}
+
+# Request words mapped to a fragment of the catalog's property type names
+_TYPE_KEYWORDS = {
+    "condo": "condo", "condominium": "condo", "apartment": "condo", "flat": "condo",
+    "townhouse": "townhouse", "townhome": "townhouse", "loft": "loft",
+    "house": "single-family", "single-family": "single-family", "single family": "single-family",
+    "duplex": "multi-family", "multi-family": "multi-family", "ranch": "ranch", "cottage": "cottage"
+}
+
+_NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6}
+
+# "in <place>" phrases: up to three words, ending before the next criterion or punctuation
+_PLACE_RE = re.compile(
+    r"\b(?:in|near|around)\s+([a-z][a-z'-]*(?:\s+[a-z][a-z'-]*){0,2}?)"
+    r"(?=\s+(?:under|below|over|above|with|for|between|that|which|and|or|priced|at|from|within|less|more|up|no|budget)\b|\s*[,.;!?]|\s*$)"
+)
+# First words of "in ..." phrases that are not places ("in a quiet area", "in my budget")
+_NOT_PLACE_WORDS = {
+    "a", "an", "the", "my", "our", "your", "this", "that", "these", "those", "it", "them", "mind", "good",
+    "great", "excellent", "total", "terms", "order", "case", "general", "particular", "addition", "person",
+    "advance", "time", "cash", "price", "range", "town", "area", "city", "one", "two", "three", "any", "some",
+    "me", "us", "here"
+}
+# Smaller amounts ("400", "at least 2 bedrooms") are not home prices
+MIN_PRICE = 10_000
+_AMOUNT = r"\$?\s*(\d[\d,]*(?:\.\d+)?)\s*(k|m|thousand|million)?\b"
+
+
+def parse_price(value) -> float:
+    """Turn "$525,000", "525k", "1.2m" or a number into a float, NaN if unparseable"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.search(_AMOUNT, str(value or "").lower())
+    return _amount(match.group(1), match.group(2)) if match else float("nan")
+
+
+def find_prices(text: str) -> list:
+    """Amounts in the text that look like prices: a $ sign or a k/m unit, at least $10,000"""
+    matches = re.findall(r"\$\s*\d[\d,]*(?:\.\d+)?\s*[km]?\b|\b\d[\d,]*(?:\.\d+)?\s*[km]\b", text, re.IGNORECASE)
+    prices = [parse_price(match) for match in matches]
+    return [price for price in prices if price >= MIN_PRICE]
+
+
+def format_price(value: float) -> str:
+    # Listings whose price didn't parse are shown, not as "$nan"
+    if value != value:
+        return "Price on request"
+    return f"${value:,.0f}"
+
+
+def _amount(number: str, unit: Optional[str]) -> float:
+    value = float(number.replace(",", ""))
+    if unit in ("k", "thousand"):
+        value *= 1_000
+    elif unit in ("m", "million"):
+        value *= 1_000_000
+    return value
+
+
+def load_records(path: str, key: str) -> list:
+    """Read a list of records from CSV, JSON (a list or {key: [...]}) or Parquet"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+    if extension == ".json":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return data.get(key, []) if isinstance(data, dict) else data
+    if extension == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet files requires pyarrow")
+        return pq.read_table(path).to_pylist()
+    raise ValueError(f"Unsupported data format: {path}")
+
+
+def _float(value) -> float:
+    return float(value) if value not in (None, "") else float("nan")
+
+
+def _price_bound(number: str, unit: Optional[str]) -> Optional[float]:
+    # Small bare numbers ("at least 2 bedrooms") are not prices
+    value = _amount(number, unit)
+    return value if value >= MIN_PRICE else None
+
+
+def _features(value) -> list:
+    if isinstance(value, (list, tuple)):
+        return [str(feature).strip() for feature in value if str(feature).strip()]
+    return [feature.strip() for feature in str(value or "").split(";") if feature.strip()]
+
+
+def _keywords(text: str) -> set:
+    return {word for word in re.findall(r"[a-z][a-z-]{3,}", text.lower()) if word not in _FEATURE_STOPWORDS}
+
+
+class PropertyCatalog:
+    """Columnar, NumPy-backed store of property listings
+
+    Each attribute is a column array. Price and bedrooms have sorted indexes
+    answered with searchsorted; type, location and feature keywords have
+    inverted indexes of sorted int32 row numbers, so index memory grows with
+    the number of matches rather than rows x keywords. Filtering and ranking
+    are vectorized over the columns.
+    """
+
+    def __init__(self, records: list):
+        self.size = len(records)
+        self.names = np.array([str(r.get("name", "")) for r in records], dtype=object)
+        self.prices = np.array([parse_price(r.get("price")) for r in records], dtype=np.float64)
+        self.bedrooms = np.array([int(float(r.get("bedrooms") or 0)) for r in records], dtype=np.int16)
+        self.bathrooms = np.array([float(r.get("bathrooms") or 0) for r in records], dtype=np.float32)
+        self.sqft = np.array([_float(r.get("sqft")) for r in records], dtype=np.float64)
+        self.latitudes = np.array([_float(r.get("latitude")) for r in records], dtype=np.float64)
+        self.longitudes = np.array([_float(r.get("longitude")) for r in records], dtype=np.float64)
+        self.types, self.type_codes = self._encode([r.get("type", "") for r in records])
+        self.locations, self.location_codes = self._encode([r.get("location", "") for r in records])
+        self.features = np.empty(self.size, dtype=object)
+        for row, record in enumerate(records):
+            self.features[row] = tuple(_features(record.get("features")))
+
+        # Sorted indexes for range predicates
+        self._price_order = np.argsort(self.prices, kind="stable")
+        self._price_sorted = self.prices[self._price_order]
+        self._bedroom_order = np.argsort(self.bedrooms, kind="stable")
+        self._bedroom_sorted = self.bedrooms[self._bedroom_order]
+
+        # Inverted indexes (row arrays) for categorical predicates
+        self._type_rows = self._rows_by_code(self.type_codes, len(self.types))
+        self._location_rows = self._rows_by_code(self.location_codes, len(self.locations))
+        self._feature_rows = self._keyword_rows(self.features)
+        self._location_parts = [
+            (code, [part.strip().lower() for part in name.split(",") if part.strip()])
+            for code, name in enumerate(self.locations)
+        ]
+        self._rows_by_name = {name.lower(): row for row, name in enumerate(self.names)}
+        self._max_name_words = max((len(name.split()) for name in self._rows_by_name), default=0)
+
+    @classmethod
+    def load(cls, path: str) -> "PropertyCatalog":
+        """Load listings from a .csv, .json or .parquet file"""
+        return cls(load_records(path, "properties"))
+
+    def search(self, min_price: float = None, max_price: float = None, min_bedrooms: int = None,
+               max_bedrooms: int = None, types: list = None, locations: list = None,
+               features: list = None, limit: int = 3) -> list:
+        """Return the best-ranked listings matching every given criterion"""
+        mask = self._filter(min_price, max_price, min_bedrooms, max_bedrooms, types, locations)
+        rows = np.flatnonzero(mask)
+        if rows.size == 0:
+            return []
+
+        scores, feature_hits = self._score(rows, min_price, max_price, min_bedrooms, features)
+        if rows.size > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(rows.size)
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        criteria = {"max_price": max_price, "min_bedrooms": min_bedrooms, "locations": locations}
+        return [self.record(rows[i], self._match_reasons(rows[i], criteria, feature_hits[i])) for i in top]
+
+    def record(self, row: int, match_reasons: list = None) -> dict:
+        """A listing as a dict in the property_search details shape"""
+        record = {
+            "name": self.names[row],
+            "type": self.types[self.type_codes[row]],
+            "price": format_price(self.prices[row]),
+            "location": self.locations[self.location_codes[row]],
+            "bedrooms": int(self.bedrooms[row]),
+            "bathrooms": float(self.bathrooms[row]),
+            "features": list(self.features[row]),
+            "match_reasons": match_reasons or []
+        }
+        if not np.isnan(self.sqft[row]):
+            record["sqft"] = int(self.sqft[row])
+        if not np.isnan(self.latitudes[row]):
+            record["latitude"] = float(self.latitudes[row])
+            record["longitude"] = float(self.longitudes[row])
+        return record
+
+    def find(self, text: str) -> Optional[int]:
+        """Row of a listing named in the text, or None"""
+        words = re.findall(r"[\w'-]+", text.lower())
+        for width in range(min(self._max_name_words, len(words)), 0, -1):
+            for start in range(len(words) - width + 1):
+                row = self._rows_by_name.get(" ".join(words[start:start + width]))
+                if row is not None:
+                    return row
+        return None
+
+    def comparables(self, location: str, property_type: str = None, sqft: float = None,
+                    exclude: int = None, limit: int = 5) -> np.ndarray:
+        """Rows of listings like the given one: same location (and type if enough), closest in size"""
+        codes = [code for code, name in enumerate(self.locations) if name.lower() == (location or "").lower()]
+        if not codes:
+            mask = self._filter(None, None, None, None, None, [location]) if location else np.zeros(self.size, bool)
+        else:
+            mask = self._union(self._location_rows, codes)
+        if exclude is not None:
+            mask[exclude] = False
+        if property_type:
+            same_type = mask & self._filter(None, None, None, None, [property_type], None)
+            if same_type.sum() >= 3:
+                mask = same_type
+        rows = np.flatnonzero(mask)
+        if sqft is not None and not np.isnan(sqft) and rows.size > limit:
+            gaps = np.nan_to_num(np.abs(self.sqft[rows] - sqft), nan=np.inf)
+            rows = rows[np.argpartition(gaps, limit - 1)[:limit]]
+        return rows[:limit]
+
+    def coordinates(self) -> list:
+        """(latitude, longitude) of every listing that has them"""
+        known = ~np.isnan(self.latitudes)
+        return list(zip(self.latitudes[known].tolist(), self.longitudes[known].tolist()))
+
+    def location_centroid(self, locations: list) -> Optional[tuple]:
+        """Mean coordinates of the listings in the given locations, or None"""
+        mask = self._filter(None, None, None, None, None, locations) & ~np.isnan(self.latitudes)
+        if not mask.any():
+            return None
+        return float(self.latitudes[mask].mean()), float(self.longitudes[mask].mean())
+
+    def parse_request(self, prompt: str) -> Optional[dict]:
+        """Pull search criteria out of a free-text request
+
+        Returns None when the request names a place the catalog has no
+        listings for, so callers don't answer "Denver" with Round Rock homes.
+        """
+        text = prompt.lower()
+        if self._unknown_place(text):
+            return None
+        criteria = {}
+
+        between = re.search(rf"between\s+{_AMOUNT}\s+(?:and|to|-)\s+{_AMOUNT}", text)
+        upper = re.search(rf"(?:under|below|less than|max(?:imum)?|up to|no more than|budget(?: of| is)?)\s+{_AMOUNT}", text)
+        lower = re.search(rf"(?:over|above|more than|at least|min(?:imum)?|from)\s+{_AMOUNT}", text)
+        bare = re.search(r"\$\s*(\d[\d,]*(?:\.\d+)?)\s*(k|m|thousand|million)?\b", text)
+        if between:
+            criteria["min_price"] = _price_bound(between.group(1), between.group(2))
+            criteria["max_price"] = _price_bound(between.group(3), between.group(4))
+        else:
+            if upper:
+                criteria["max_price"] = _price_bound(upper.group(1), upper.group(2))
+            if lower:
+                criteria["min_price"] = _price_bound(lower.group(1), lower.group(2))
+            if bare and not criteria.get("max_price") and not criteria.get("min_price"):
+                criteria["max_price"] = _price_bound(bare.group(1), bare.group(2))
+        criteria = {key: value for key, value in criteria.items() if value is not None}
+
+        bedrooms = re.search(r"\b(\d+|one|two|three|four|five|six)\s*\+?\s*-?\s*(?:bed|bedroom|bedrooms|br|bd)\b", text)
+        if bedrooms:
+            count = bedrooms.group(1)
+            criteria["min_bedrooms"] = int(count) if count.isdigit() else _NUMBER_WORDS[count]
+
+        types = {fragment for keyword, fragment in _TYPE_KEYWORDS.items() if re.search(rf"\b{keyword}s?\b", text)}
+        if types:
+            criteria["types"] = sorted(types)
+
+        locations = [part for _, parts in self._location_parts for part in parts
+                     if re.search(rf"\b{re.escape(part)}\b", text)]
+        if locations:
+            criteria["locations"] = sorted(set(locations))
+
+        words = _keywords(text)
+        words |= {word[:-1] for word in words if word.endswith("s")}
+        features = sorted(words & self._feature_rows.keys())
+        if features:
+            criteria["features"] = features
+        return criteria
+
+    def _filter(self, min_price, max_price, min_bedrooms, max_bedrooms, types, locations) -> np.ndarray:
+        mask = np.ones(self.size, dtype=bool)
+        if min_price is not None or max_price is not None:
+            mask &= self._range(self._price_order, self._price_sorted, min_price, max_price)
+        if min_bedrooms is not None or max_bedrooms is not None:
+            mask &= self._range(self._bedroom_order, self._bedroom_sorted, min_bedrooms, max_bedrooms)
+        if types:
+            codes = [code for code, name in enumerate(self.types)
+                     if any(fragment.lower() in name.lower() for fragment in types)]
+            mask &= self._union(self._type_rows, codes)
+        if locations:
+            wanted = {location.lower() for location in locations}
+            codes = [code for code, parts in self._location_parts if wanted & set(parts)]
+            mask &= self._union(self._location_rows, codes)
+        return mask
+
+    def _unknown_place(self, text: str) -> bool:
+        """Whether the text asks for a place ("in Denver") that matches none of the catalog's locations"""
+        known = {part for _, parts in self._location_parts for part in parts}
+        for match in _PLACE_RE.finditer(text):
+            place = match.group(1)
+            words = place.split()
+            first = words[0]
+            if (first in _NOT_PLACE_WORDS or first.endswith("ing") or first.rstrip("s") in _TYPE_KEYWORDS
+                    or first.rstrip("s") in self._feature_rows):
+                continue
+            if not any(re.search(rf"\b{re.escape(part)}\b", place) or place in part for part in known):
+                return True
+        return False
+
+    def _range(self, order: np.ndarray, sorted_values: np.ndarray, low, high) -> np.ndarray:
+        start = 0 if low is None else np.searchsorted(sorted_values, low, side="left")
+        stop = self.size if high is None else np.searchsorted(sorted_values, high, side="right")
+        mask = np.zeros(self.size, dtype=bool)
+        mask[order[start:stop]] = True
+        return mask
+
+    def _union(self, index: list, codes: list) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        for code in codes:
+            mask[index[code]] = True
+        return mask
+
+    def _score(self, rows: np.ndarray, min_price, max_price, min_bedrooms, features) -> tuple:
+        prices = self.prices[rows]
+        scores = np.zeros(rows.size, dtype=np.float64)
+
+        # Space for the money, normalized across the candidates
+        value = np.nan_to_num(self.sqft[rows] / prices)
+        if value.max() > 0:
+            scores += 0.4 * value / value.max()
+
+        # Closest to the top of the budget, where buyers usually land
+        target = max_price or min_price
+        if target:
+            scores += 0.3 * (1 - np.clip(np.abs(prices - target) / target, 0, 1))
+
+        if min_bedrooms is not None:
+            scores += 0.1 * (self.bedrooms[rows] == min_bedrooms)
+
+        feature_hits = np.zeros(rows.size, dtype=np.int16)
+        for keyword in features or []:
+            # Both arrays are sorted, so membership is a binary search per candidate
+            keyword_rows = self._feature_rows[keyword]
+            positions = np.minimum(np.searchsorted(keyword_rows, rows), keyword_rows.size - 1)
+            feature_hits += keyword_rows[positions] == rows
+        if features:
+            scores += 0.2 * feature_hits / len(features)
+        return scores, feature_hits
+
+    def _match_reasons(self, row: int, criteria: dict, feature_hits: int) -> list:
+        reasons = []
+        if criteria["max_price"]:
+            reasons.append(f"Within your budget of {format_price(criteria['max_price'])}")
+        if criteria["min_bedrooms"]:
+            reasons.append(f"{self.bedrooms[row]} bedrooms")
+        if criteria["locations"]:
+            reasons.append(f"Located in {self.locations[self.location_codes[row]]}")
+        if feature_hits:
+            reasons.append(f"Has {feature_hits} of the features you asked for")
+        return reasons
+
+    @staticmethod
+    def _encode(values: list) -> tuple:
+        categories, codes = np.unique(np.array(values, dtype=str), return_inverse=True)
+        return [str(category) for category in categories], codes.astype(np.int32)
+
+    @staticmethod
+    def _rows_by_code(codes: np.ndarray, count: int) -> list:
+        order = np.argsort(codes, kind="stable").astype(np.int32)
+        bounds = np.searchsorted(codes[order], np.arange(count + 1))
+        return [order[bounds[code]:bounds[code + 1]] for code in range(count)]
+
+    @staticmethod
+    def _keyword_rows(features: np.ndarray) -> dict:
+        rows_by_keyword = {}
+        for row, row_features in enumerate(features):
+            for keyword in _keywords(" ".join(row_features)):
+                rows_by_keyword.setdefault(keyword, []).append(row)
+        # Rows are appended in order, so each array is already sorted
+        return {keyword: np.array(rows, dtype=np.int32) for keyword, rows in rows_by_keyword.items()}
+
+
+_catalog = None
+_catalog_loaded = False
+_catalog_lock = threading.Lock()
+
+
+def get_property_catalog() -> Optional[PropertyCatalog]:
+    """Process-wide catalog from PROPERTY_CATALOG_PATH, or None if there is no catalog file"""
+    global _catalog, _catalog_loaded
+    with _catalog_lock:
+        if not _catalog_loaded:
+            path = os.getenv('PROPERTY_CATALOG_PATH', DEFAULT_CATALOG_PATH)
+            _catalog = PropertyCatalog.load(path) if path and os.path.exists(path) else None
+            _catalog_loaded = True
+        return _catalog
@@ -1,14 +1,20 @@
 from .base_agent import BaseAgent
-import time
-import json
+from .property_catalog import get_property_catalog
+from .schemas import PROPERTY_SCHEMA, parse_json
 
 class PropertySearchAgent(BaseAgent):
+    agent_type = "property_search"
+    details_key = "properties"
+    schema = PROPERTY_SCHEMA
+    fallback_greeting = "Hi there, I'm Mike! 🏠 Let's find you a place that feels like home. What are you looking for in a property?"
+    
     def __init__(self, api_key):
         super().__init__(api_key)
         self.name = "Mike"
         self.emoji = "🏠"
+        self.catalog = get_property_catalog()
 
-    def get_greeting(self) -> str:
+    def _generate_greeting(self) -> str:
         """Generate a dynamic, personalized greeting"""
         greeting_prompt = """Generate a friendly, slightly humorous greeting from a real estate agent named Mike (use emoji 🏠).
         The greeting should be warm and welcoming, showing enthusiasm to help find the perfect property.
@@ -17,12 +23,8 @@ class PropertySearchAgent(BaseAgent):
         response = self.generate_response(greeting_prompt)
         return response.strip()
         
-    def process(self, prompt: str, context: dict = None) -> dict:
-        """Process user request and generate property recommendations with context awareness"""
-        # First, send the greeting
-        greeting = self.get_greeting()
-        time.sleep(2)  # Add a natural pause
-        
+    def _build_prompt(self, prompt: str, context: dict = None) -> str:
+        """Build the property search prompt with context awareness"""
         # Check context for existing properties
         existing_properties = []
         if context and "properties" in context:
@@ -39,7 +41,7 @@ class PropertySearchAgent(BaseAgent):
         search_prompt = f"""As Mike, an enthusiastic real estate agent (🏠), analyze this request and generate a detailed response:
 
         {''.join(existing_properties) if existing_properties else ''}
-        
+        {self._format_summary(context)}
         User Request: {prompt}
 
         Create a natural, conversational response that includes:
@@ -62,18 +64,51 @@ class PropertySearchAgent(BaseAgent):
         - Don't reference external websites or listings
         - If the user is asking about a specific property mentioned before, use those exact details"""
 
-        response = self.generate_response(search_prompt)
-        properties_response = response.strip()
+        return search_prompt
+        
+    def _lookup_details(self, prompt: str, context: dict = None):
+        """Top catalog listings for the request, or None when the catalog can't answer it"""
+        if self.catalog is None:
+            return None
+        # None also covers a request for a place the catalog has no listings in
+        criteria = self.catalog.parse_request(prompt)
+        if not criteria:
+            return None
+        matches = self.catalog.search(**criteria)
+        if not matches:
+            return None
+        self._count_structured("catalog")
+        return matches
+        
+    def _build_narration_prompt(self, prompt: str, context: dict, details: list) -> str:
+        """Ask Mike to present catalog listings without inventing any"""
+        listings = "\n".join(
+            f"- {prop['name']}: {prop['type']}, {prop['price']}, {prop['location']}, "
+            f"{prop['bedrooms']} bed / {prop['bathrooms']:g} bath"
+            f"{', ' + str(prop['sqft']) + ' sq ft' if 'sqft' in prop else ''}. "
+            f"Features: {', '.join(prop['features'])}. Matches because: {'; '.join(prop['match_reasons'])}"
+            for prop in details
+        )
+        
+        return f"""As Mike, an enthusiastic real estate agent (🏠), present these listings from our catalog:
+
+        {listings}
+        {self._format_summary(context)}
+        User Request: {prompt}
+
+        Create a natural, conversational response that includes:
+        1. A brief acknowledgment of their specific needs
+        2. Each listing above with its name, type, price, location, standout features and why it matches
+        3. A follow-up question to refine the search
+        
+        Make the response friendly and engaging, adding occasional light humor.
+        Format properties clearly but keep the tone conversational.
+        
+        Important: Use only the listings and details above. Don't invent properties, prices or features."""
         
-        # Structure the response
-        return {
-            "message": f"{greeting}\n\n{properties_response}",
-            "details": {
-                "type": "property_search",
-                "greeting_delay": 2,
-                "properties": self._extract_properties_from_response(properties_response)
-            }
-        }
+    def _extract_details(self, response: str) -> list:
+        """Extract the structured details for this agent's response"""
+        return self._extract_properties_from_response(response)
         
     def _extract_properties_from_response(self, response: str) -> list:
         """Extract and structure property information from the LLM response"""
@@ -92,8 +127,9 @@ class PropertySearchAgent(BaseAgent):
         Return only the JSON array of properties."""
         
         try:
-            structured_response = self.generate_response(extraction_prompt)
-            return json.loads(structured_response)
+            # Extraction is deterministic for a given response, so it is cacheable
+            structured_response = self.generate_response(extraction_prompt, cache=True)
+            return parse_json(structured_response)
         except:
             # Fallback to simple structure if JSON parsing fails
             return [{
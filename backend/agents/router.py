@@ -0,0 +1,319 @@
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+AGENT_TYPES = ('property_search', 'amenities', 'negotiation', 'closing')
+
+# Phrase rules: (regex, agent type, weight). Multi-word phrases carry more
+# weight than single keywords because they are far less ambiguous.
+KEYWORD_RULES = [
+    (r"\b(find|search|show)\b.*\b(home|house|condo|apartment|propert(y|ies)|listing)s?\b", 'property_search', 3),
+    (r"\blooking (for|to buy)\b", 'property_search', 2),
+    (r"\b\d+\s*-?\s*(bed|bedroom|br|bath|bathroom)s?\b", 'property_search', 2),
+    (r"\b(house|home|condo|townhouse|apartment|listing|sq\s?ft|square feet)s?\b", 'property_search', 1),
+    (r"\b(budget|under \$|below \$)", 'property_search', 1),
+    (r"\bamenit(y|ies)\b", 'amenities', 3),
+    (r"\b(what'?s|what is|anything) (nearby|near|around)\b", 'amenities', 3),
+    (r"\b(school|park|hospital|restaurant|grocery|groceries|shopping|gym|transit|bus|subway|commute|neighbou?rhood)s?\b", 'amenities', 1),
+    (r"\bnegotiat(e|ion|ing)\b", 'negotiation', 3),
+    (r"\b(counter[- ]?offer|make an offer|initial offer|lowball|asking price)\b", 'negotiation', 3),
+    (r"\b(offer|discount|bargain|price drop|lower the price|deal)s?\b", 'negotiation', 1),
+    (r"\b(closing|close the deal|escrow|walk-?through|handover|title insurance)\b", 'closing', 3),
+    (r"\b(paperwork|documents?|inspections?|closing costs|keys|move[- ]in date)\b", 'closing', 1),
+]
+
+# Seed corpus for the bag-of-words classifier. Kept small on purpose: the
+# classifier only has to separate four fairly distinct vocabularies.
+TRAINING_EXAMPLES = {
+    'property_search': [
+        "I'm looking for a 3 bedroom house in Austin",
+        "find me a condo under 400k",
+        "show me homes with a big backyard",
+        "I want to buy a family home near downtown",
+        "any apartments with two bathrooms and parking",
+        "search for properties in a quiet area",
+        "we need a larger place with a home office",
+        "what houses are available in my price range",
+        "recommend a townhouse with a garage",
+        "looking for a waterfront property",
+        "I need a starter home for a young couple",
+        "do you have listings with a pool",
+    ],
+    'amenities': [
+        "what schools are near this property",
+        "are there parks nearby",
+        "how far is the nearest hospital",
+        "tell me about restaurants and shopping in the area",
+        "what is the neighborhood like",
+        "is there public transit close by",
+        "how long is the commute to downtown",
+        "are there grocery stores within walking distance",
+        "what entertainment options are around",
+        "any gyms or recreation centers nearby",
+        "what amenities does the area have",
+        "is it a good area for kids",
+    ],
+    'negotiation': [
+        "can we negotiate the price",
+        "what should my initial offer be",
+        "how do I make a counter offer",
+        "the asking price seems too high",
+        "help me get a better deal",
+        "should I offer below asking",
+        "the seller rejected my offer what now",
+        "can we get a discount on this house",
+        "how much room is there to bargain",
+        "what is a fair price for this property",
+        "I want to lower the price",
+        "how do I structure the deal",
+    ],
+    'closing': [
+        "what documents do I need for closing",
+        "how does the closing process work",
+        "when do I get the keys",
+        "what are the closing costs",
+        "how do I schedule the final walkthrough",
+        "what happens at escrow",
+        "do I need a home inspection before closing",
+        "what paperwork is required to finalize",
+        "how long until the deal closes",
+        "what is title insurance",
+        "I'm ready to close on the house",
+        "what is the handover process",
+    ],
+}
+
+# Agents whose answer builds on another agent's output in the same plan:
+# amenities and offers need the properties found, closing needs the offer
+AGENT_DEPENDENCIES = {
+    'amenities': ('property_search',),
+    'negotiation': ('property_search',),
+    'closing': ('property_search', 'negotiation'),
+}
+
+# Clause boundaries for compound requests ("find a 3-bed and tell me about schools")
+_CLAUSE_SPLIT_RE = re.compile(r"[;?!]+|\.(?!\d)|,?\s+\b(?:and then|and also|and|also|plus|then)\b\s+", re.IGNORECASE)
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize a prompt for cache lookups (case, punctuation, whitespace)"""
+    return " ".join(_TOKEN_RE.findall(prompt.lower()))
+
+
+def plan_levels(agents: List[str]) -> List[List[str]]:
+    """Order a plan's agents into levels; agents in a level only depend on earlier levels"""
+    levels, done = [], set()
+    remaining = list(agents)
+    while remaining:
+        level = [agent for agent in remaining
+                 if all(dep in done or dep not in agents for dep in AGENT_DEPENDENCIES.get(agent, ()))]
+        levels.append(level)
+        done.update(level)
+        remaining = [agent for agent in remaining if agent not in done]
+    return levels
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into unigram and bigram features"""
+    words = _TOKEN_RE.findall(text.lower())
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+class BagOfWordsClassifier:
+    """Multinomial naive Bayes over unigram and bigram counts"""
+
+    def __init__(self, examples: Dict[str, List[str]] = None, alpha: float = 1.0):
+        self.alpha = alpha
+        self.labels = []
+        self.log_priors = {}
+        self.log_likelihoods = {}
+        self.log_unseen = {}
+        self.vocabulary = set()
+        self.train(examples or TRAINING_EXAMPLES)
+
+    def train(self, examples: Dict[str, List[str]]):
+        """Fit class priors and smoothed token likelihoods"""
+        counts = {label: Counter() for label in examples}
+        vocabulary = set()
+        for label, texts in examples.items():
+            for text in texts:
+                tokens = tokenize(text)
+                counts[label].update(tokens)
+                vocabulary.update(tokens)
+
+        total_docs = sum(len(texts) for texts in examples.values())
+        vocab_size = len(vocabulary)
+        self.vocabulary = vocabulary
+        self.labels = list(examples)
+        for label in self.labels:
+            total_tokens = sum(counts[label].values())
+            denominator = total_tokens + self.alpha * vocab_size
+            self.log_priors[label] = math.log(len(examples[label]) / total_docs)
+            self.log_likelihoods[label] = {
+                token: math.log((count + self.alpha) / denominator)
+                for token, count in counts[label].items()
+            }
+            self.log_unseen[label] = math.log(self.alpha / denominator)
+
+    def predict(self, text: str) -> Dict[str, float]:
+        """Return the posterior probability of each label"""
+        # Tokens unknown to every class carry no signal, skip them
+        tokens = [token for token in tokenize(text) if token in self.vocabulary]
+        scores = {}
+        for label in self.labels:
+            likelihoods = self.log_likelihoods[label]
+            unseen = self.log_unseen[label]
+            scores[label] = self.log_priors[label] + sum(
+                likelihoods.get(token, unseen) for token in tokens)
+
+        best = max(scores.values())
+        exp_scores = {label: math.exp(score - best) for label, score in scores.items()}
+        total = sum(exp_scores.values())
+        return {label: value / total for label, value in exp_scores.items()}
+
+
+class Router:
+    """Local routing engine that only asks the LLM when it is unsure"""
+
+    def __init__(self, llm_fallback: Callable[[str], str] = None,
+                 confidence_threshold: float = None, cache_size: int = None,
+                 async_llm_fallback: Callable[[str], Awaitable[str]] = None):
+        self.llm_fallback = llm_fallback
+        self.async_llm_fallback = async_llm_fallback
+        self.confidence_threshold = confidence_threshold if confidence_threshold is not None else float(
+            os.getenv('ROUTER_CONFIDENCE_THRESHOLD', '0.8'))
+        self.cache_size = cache_size if cache_size is not None else int(os.getenv('ROUTER_CACHE_SIZE', '1024'))
+        self.max_plan_agents = int(os.getenv('ROUTER_MAX_PLAN_AGENTS', '3'))
+        self.classifier = BagOfWordsClassifier()
+        self.rules = [(re.compile(pattern, re.IGNORECASE), agent, weight)
+                      for pattern, agent, weight in KEYWORD_RULES]
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    def route(self, prompt: str) -> dict:
+        """Route a prompt and return the agent type, confidence and source"""
+        local_decision = decision = self.predict_local(prompt)
+        if local_decision['confidence'] < self.confidence_threshold and self.llm_fallback:
+            decision = self._cached_llm_decision(prompt)
+            if decision is None:
+                try:
+                    answer = self.llm_fallback(prompt)
+                except Exception:
+                    answer = None
+                decision = self._llm_decision(prompt, answer, local_decision)
+        return self._record(decision)
+
+    async def aroute(self, prompt: str) -> dict:
+        """Async variant of route() that awaits the LLM fallback instead of blocking"""
+        local_decision = decision = self.predict_local(prompt)
+        if local_decision['confidence'] < self.confidence_threshold and self.async_llm_fallback:
+            decision = self._cached_llm_decision(prompt)
+            if decision is None:
+                try:
+                    answer = await self.async_llm_fallback(prompt)
+                except Exception:
+                    answer = None
+                decision = self._llm_decision(prompt, answer, local_decision)
+        return self._record(decision)
+
+    def plan(self, prompt: str) -> Optional[dict]:
+        """Plan for a compound request that clearly asks several agents, or None
+
+        The prompt is split into clauses and each clause is routed locally;
+        only clauses routed with confidence count. Returns {"agents": [...],
+        "prompts": {agent: its clauses}, "source": "plan"} when at least two
+        agents are needed, in the order they were asked for.
+        """
+        prompts = OrderedDict()
+        for clause in _CLAUSE_SPLIT_RE.split(prompt):
+            clause = clause.strip(" ,")
+            if len(_TOKEN_RE.findall(clause.lower())) < 3:
+                continue
+            decision = self.predict_local(clause)
+            if decision['confidence'] >= self.confidence_threshold:
+                prompts.setdefault(decision['agent'], []).append(clause)
+        if len(prompts) < 2:
+            return None
+        agents = list(prompts)[:self.max_plan_agents]
+        return self._record({
+            "agents": agents,
+            "prompts": {agent: ". ".join(prompts[agent]) for agent in agents},
+            "source": "plan"
+        })
+
+    def predict_local(self, prompt: str) -> dict:
+        """Best local guess without ever calling the LLM"""
+        return self._route_by_rules(prompt) or self._route_by_classifier(prompt)
+
+    def _route_by_rules(self, prompt: str) -> Optional[dict]:
+        scores = Counter()
+        for pattern, agent, weight in self.rules:
+            if pattern.search(prompt):
+                scores[agent] += weight
+        if not scores:
+            return None
+
+        (best, best_score), *rest = scores.most_common()
+        runner_up = rest[0][1] if rest else 0
+        # Only trust rules that clearly point at one agent
+        if best_score >= 3 and best_score >= 3 * runner_up:
+            return {"agent": best, "confidence": best_score / (best_score + runner_up), "source": "rules"}
+        return None
+
+    def _route_by_classifier(self, prompt: str) -> dict:
+        posteriors = self.classifier.predict(prompt)
+        best = max(posteriors, key=posteriors.get)
+        return {"agent": best, "confidence": posteriors[best], "source": "classifier"}
+
+    def _cached_llm_decision(self, prompt: str) -> Optional[dict]:
+        key = normalize_prompt(prompt)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return {"agent": self._cache[key], "confidence": 1.0, "source": "llm_cache"}
+        return None
+
+    def _llm_decision(self, prompt: str, answer: Optional[str], local_decision: dict) -> dict:
+        if answer is None:
+            # The local guess beats failing the whole request
+            return dict(local_decision, source="local_fallback")
+
+        answer = answer.strip().lower()
+        agent = answer if answer in AGENT_TYPES else next(
+            (agent_type for agent_type in AGENT_TYPES if agent_type in answer), None)
+        if agent is None:
+            return {"agent": answer, "confidence": 0.0, "source": "llm"}
+
+        key = normalize_prompt(prompt)
+        with self._lock:
+            self._cache[key] = agent
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return {"agent": agent, "confidence": 1.0, "source": "llm"}
+
+    def _record(self, decision: dict) -> dict:
+        with self._lock:
+            self._stats[decision['source']] += 1
+        return decision
+
+    def get_stats(self) -> dict:
+        """Counts of requests per routing path"""
+        with self._lock:
+            stats = dict(self._stats)
+            cache_entries = len(self._cache)
+        # Multi-agent plans are split locally, without an LLM call
+        fast_path = sum(stats.get(source, 0) for source in ('rules', 'classifier', 'llm_cache', 'plan'))
+        llm_path = stats.get('llm', 0) + stats.get('local_fallback', 0)
+        return {
+            "fast_path": fast_path,
+            "llm_path": llm_path,
+            "by_source": stats,
+            "llm_cache_entries": cache_entries
+        }
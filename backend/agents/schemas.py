@@ -0,0 +1,261 @@
+import json
+import re
+from typing import Any, List, Tuple
+
+from .json_stream import StreamingJSONParser, parse_tolerant
+
+# Minimal JSON-schema subset (type, required, properties, items,
+# additionalProperties) describing the structured block each agent returns
+# alongside its prose. Kept dependency free so validation stays local and cheap.
+
+_AMENITY_LIST = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "required": ["name", "distance"],
+        "properties": {
+            "name": {"type": "string"},
+            "type": {"type": "string"},
+            "distance": {"type": ["string", "number"]},
+            "description": {"type": "string"}
+        }
+    }
+}
+
+PROPERTY_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "required": ["name", "price", "location", "features"],
+        "properties": {
+            "name": {"type": "string"},
+            "type": {"type": "string"},
+            "price": {"type": ["string", "number"]},
+            "location": {"type": "string"},
+            "features": {"type": "array", "items": {"type": "string"}},
+            "match_reasons": {"type": "array", "items": {"type": "string"}}
+        }
+    }
+}
+
+AMENITIES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "shopping_dining": _AMENITY_LIST,
+        "education": _AMENITY_LIST,
+        "parks_recreation": _AMENITY_LIST,
+        "transportation": _AMENITY_LIST,
+        "healthcare": _AMENITY_LIST,
+        "entertainment": _AMENITY_LIST
+    },
+    "additionalProperties": _AMENITY_LIST
+}
+
+NEGOTIATION_SCHEMA = {
+    "type": "object",
+    "required": ["negotiation_points", "offer_strategy"],
+    "properties": {
+        "market_analysis": {
+            "type": "object",
+            "properties": {
+                "current_conditions": {"type": "string"},
+                "trends": {"type": ["string", "array"]}
+            }
+        },
+        "property_valuation": {
+            "type": "object",
+            "properties": {
+                "suggested_value": {"type": ["string", "number"]},
+                "value_factors": {"type": "array"}
+            }
+        },
+        "negotiation_points": {"type": "array", "items": {"type": "string"}},
+        "offer_strategy": {
+            "type": "object",
+            "required": ["initial_offer"],
+            "properties": {
+                "initial_offer": {"type": ["string", "number"]},
+                "counter_scenarios": {"type": "array"}
+            }
+        },
+        "timeline": {"type": "array"},
+        "tips": {"type": "array", "items": {"type": "string"}}
+    }
+}
+
+CLOSING_SCHEMA = {
+    "type": "object",
+    "required": ["documentation", "timeline"],
+    "properties": {
+        "documentation": {"type": "array", "items": {"type": "string"}},
+        "timeline": {"type": "array"},
+        "inspections": {"type": "object"},
+        "costs": {"type": "object"},
+        "walkthrough": {"type": "object"},
+        "handover": {"type": "object"},
+        "tips": {"type": "array", "items": {"type": "string"}}
+    }
+}
+
+_TYPES = {
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+    "null": type(None)
+}
+
+_FENCED_JSON_RE = re.compile(r"```(json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+
+
+def validate(value: Any, schema: dict, path: str = "$") -> List[str]:
+    """Validate a value against a schema and return a list of error messages"""
+    errors = []
+    expected = schema.get("type")
+    if expected:
+        names = expected if isinstance(expected, list) else [expected]
+        matches = any(
+            isinstance(value, _TYPES[name]) and not (name in ("number", "integer") and isinstance(value, bool))
+            for name in names
+        )
+        if not matches:
+            return [f"{path}: expected {' or '.join(names)}, got {type(value).__name__}"]
+
+    if isinstance(value, dict):
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}: missing required key '{key}'")
+        properties = schema.get("properties", {})
+        extra_schema = schema.get("additionalProperties")
+        for key, item in value.items():
+            item_schema = properties.get(key, extra_schema)
+            if isinstance(item_schema, dict):
+                errors.extend(validate(item, item_schema, f"{path}.{key}"))
+
+    elif isinstance(value, list) and "items" in schema:
+        for index, item in enumerate(value):
+            errors.extend(validate(item, schema["items"], f"{path}[{index}]"))
+
+    return errors
+
+
+def structured_output_instructions(schema: dict) -> str:
+    """Prompt suffix asking for a JSON block that follows the schema"""
+    return f"""
+
+After your conversational response, add a single fenced ```json code block containing the structured data
+you just described. It must be valid JSON matching this JSON schema:
+{json.dumps(schema)}
+Do not add any text after the JSON block."""
+
+
+def parse_json(text: Any) -> Any:
+    """Parse JSON that may be wrapped in markdown fences, surrounded by prose or cut off"""
+    if not isinstance(text, str):
+        return text
+    match = _FENCED_JSON_RE.search(text)
+    try:
+        return json.loads(match.group(2) if match else text)
+    except json.JSONDecodeError:
+        # Truncated or sloppy output is repaired locally rather than asked for again
+        return parse_tolerant(text)
+
+
+def split_structured_response(text: str) -> Tuple[str, Any]:
+    """Split a response into its prose and the trailing JSON block, if any
+
+    A block is only taken out of the prose when its fence is tagged json or
+    its body parses; other fenced blocks, like code samples, stay in the prose.
+    """
+    matches = list(_FENCED_JSON_RE.finditer(text))
+    if matches:
+        block = matches[-1]
+        start, end, tagged, body = block.start(), block.end(), bool(block.group(1)), block.group(2)
+    else:
+        # A response cut off inside its block never gets the closing fence
+        start = text.rfind("```")
+        if start == -1:
+            return text.strip(), None
+        header, _, body = text[start + 3:].partition("\n")
+        end, tagged = len(text), header.strip().lower() == "json"
+
+    value = _parse_block(body, tagged)
+    if value is _NOT_JSON:
+        return text.strip(), None
+    return (text[:start] + text[end:]).strip(), value
+
+
+# Marks a fenced block that isn't JSON, as opposed to a JSON block that failed to parse (None)
+_NOT_JSON = object()
+
+
+def _parse_block(body: str, tagged: bool) -> Any:
+    try:
+        return json.loads(body)
+    except json.JSONDecodeError:
+        pass
+    # An untagged block counts as JSON only if it opens like a value, so brackets in code don't
+    if not tagged and not body.lstrip().startswith(("{", "[")):
+        return _NOT_JSON
+    try:
+        return parse_tolerant(body)
+    except ValueError:
+        return None if tagged else _NOT_JSON
+
+
+class ProseStreamFilter:
+    """Pass streamed prose through while holding back the trailing JSON block
+
+    The held back block is parsed as it arrives, so objects in its arrays
+    (a property, an amenity) can be sent on as soon as each one closes.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._chunks = []
+        self._pending = ""
+        self._stopped = False
+        self._parser = StreamingJSONParser()
+        self._items = []
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far, including the held back block"""
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk and return the prose that is safe to emit"""
+        self._chunks.append(chunk)
+        if not self.enabled:
+            return chunk
+        if self._stopped:
+            self._items.extend(self._parser.feed(chunk))
+            return ""
+
+        pending = self._pending + chunk
+        fence = pending.find("```")
+        if fence != -1:
+            self._stopped = True
+            self._pending = ""
+            self._items.extend(self._parser.feed(pending[fence:]))
+            return pending[:fence]
+
+        # A chunk may end in the first backticks of a fence, hold those back
+        keep = len(pending) - len(pending.rstrip("`"))
+        self._pending = pending[len(pending) - keep:]
+        return pending[:len(pending) - keep]
+
+    def finish(self) -> str:
+        """End of stream: return held back trailing backticks, and queue items a truncated block completes"""
+        if self._stopped:
+            self._parser.close()
+            self._items.extend(self._parser.drain_items())
+        pending, self._pending = self._pending, ""
+        return pending
+
+    def drain_items(self) -> List[Tuple[tuple, dict]]:
+        """(path, object) pairs completed in the JSON block since the last call"""
+        items, self._items = self._items, []
+        return items
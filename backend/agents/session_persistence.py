@@ -0,0 +1,283 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from typing import Callable, Iterable, Optional, Tuple
+
+
+class SessionBackend(ABC):
+    """Where serialized sessions are kept so they survive a restart"""
+
+    @abstractmethod
+    def load(self, session_id: str, max_age: float = 0) -> Optional[bytes]:
+        """The stored session, or None if missing or last written more than max_age seconds ago"""
+
+    @abstractmethod
+    def save_many(self, records: Iterable[Tuple[str, bytes, float]]):
+        """Store (session_id, data, updated_at) records, replacing older versions"""
+
+    @abstractmethod
+    def delete_many(self, session_ids: Iterable[str]):
+        """Forget sessions"""
+
+    @abstractmethod
+    def purge(self, older_than: float) -> int:
+        """Remove sessions last written before the older_than timestamp and return how many"""
+
+    def close(self):
+        pass
+
+    def get_stats(self) -> dict:
+        return {"backend": self.name}
+
+
+class MemorySessionBackend(SessionBackend):
+    """Keeps serialized sessions in a dict: survives SessionStore eviction, not a process restart"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str, max_age: float = 0) -> Optional[bytes]:
+        with self._lock:
+            record = self._records.get(session_id)
+        if record is None or (max_age > 0 and record[1] < time.time() - max_age):
+            return None
+        return record[0]
+
+    def save_many(self, records: Iterable[Tuple[str, bytes, float]]):
+        with self._lock:
+            for session_id, data, updated_at in records:
+                self._records[session_id] = (data, updated_at)
+
+    def delete_many(self, session_ids: Iterable[str]):
+        with self._lock:
+            for session_id in session_ids:
+                self._records.pop(session_id, None)
+
+    def purge(self, older_than: float) -> int:
+        with self._lock:
+            stale = [session_id for session_id, (_, updated_at) in self._records.items() if updated_at < older_than]
+            for session_id in stale:
+                del self._records[session_id]
+        return len(stale)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "stored_sessions": len(self._records),
+                "stored_bytes": sum(len(data) for data, _ in self._records.values())
+            }
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """Sessions in one SQLite table in WAL mode, so restores read while a flush writes"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv('SESSION_DB_PATH', os.path.join('data', 'sessions.db'))
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection per thread; WAL lets request threads read during a flush
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, data BLOB NOT NULL, updated_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # Durable across a process crash; an OS crash may lose the last flush
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def load(self, session_id: str, max_age: float = 0) -> Optional[bytes]:
+        cutoff = time.time() - max_age if max_age > 0 else 0
+        row = self._connection().execute(
+            "SELECT data FROM sessions WHERE session_id = ? AND updated_at >= ?", (session_id, cutoff)
+        ).fetchone()
+        return row[0] if row else None
+
+    def save_many(self, records: Iterable[Tuple[str, bytes, float]]):
+        with self._connection() as connection:
+            connection.executemany(
+                "INSERT INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                records
+            )
+
+    def delete_many(self, session_ids: Iterable[str]):
+        with self._connection() as connection:
+            connection.executemany("DELETE FROM sessions WHERE session_id = ?", ((sid,) for sid in session_ids))
+
+    def purge(self, older_than: float) -> int:
+        with self._connection() as connection:
+            return connection.execute("DELETE FROM sessions WHERE updated_at < ?", (older_than,)).rowcount
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+    def get_stats(self) -> dict:
+        count = self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {"backend": self.name, "path": self.path, "stored_sessions": count}
+
+
+def create_backend(name: str = None) -> Optional[SessionBackend]:
+    """Backend named by SESSION_BACKEND: 'none' (default), 'memory' or 'sqlite'"""
+    name = (name or os.getenv('SESSION_BACKEND', 'none')).lower()
+    if name == 'memory':
+        return MemorySessionBackend()
+    if name == 'sqlite':
+        return SQLiteSessionBackend()
+    if name in ('none', ''):
+        return None
+    raise ValueError(f"Unknown SESSION_BACKEND '{name}', expected none, memory or sqlite")
+
+
+class WriteBehindPersister:
+    """Batches session writes on a background thread, keeping persistence off the request path
+
+    Requests only mark a session dirty. Every flush_interval seconds, or
+    sooner once max_batch sessions are waiting, the writer encodes each dirty
+    session once, however many turns it took since the last flush, and
+    stores them all in one backend call.
+    """
+
+    def __init__(self, backend: SessionBackend, encode: Callable, flush_interval: float = None,
+                 max_batch: int = None, ttl_seconds: float = 0):
+        self.backend = backend
+        self.encode = encode
+        self.flush_interval = flush_interval or float(os.getenv('SESSION_FLUSH_INTERVAL', '0.5'))
+        self.max_batch = max_batch or int(os.getenv('SESSION_FLUSH_MAX_BATCH', '256'))
+        self.ttl_seconds = ttl_seconds
+        self._dirty = OrderedDict()
+        self._deleted = set()
+        self._cond = threading.Condition()
+        # Serializes flushes from the writer thread, flush() callers and shutdown
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._last_purge = time.time()
+        self._stats = Counter()
+
+    def mark(self, session):
+        """Queue a changed session for the next flush"""
+        with self._cond:
+            if self._closed:
+                return
+            self._deleted.discard(session.session_id)
+            self._dirty[session.session_id] = session
+            if self._thread is None:
+                self._start()
+            if len(self._dirty) >= self.max_batch:
+                self._cond.notify()
+
+    def forget(self, session_id: str):
+        """Drop a queued write and delete the stored copy"""
+        with self._cond:
+            self._dirty.pop(session_id, None)
+            self._deleted.add(session_id)
+
+    def pending(self, session_id: str):
+        """The session if it is still waiting to be written, so a restore never reads a stale copy"""
+        with self._cond:
+            return self._dirty.get(session_id)
+
+    def flush(self) -> int:
+        """Write everything queued so far and return the number of sessions written"""
+        with self._flush_lock:
+            with self._cond:
+                dirty, self._dirty = self._dirty, OrderedDict()
+                deleted, self._deleted = self._deleted, set()
+            if deleted:
+                self.backend.delete_many(list(deleted))
+            written = 0
+            sessions = list(dirty.values())
+            for start in range(0, len(sessions), self.max_batch):
+                records = []
+                for session in sessions[start:start + self.max_batch]:
+                    try:
+                        data = self.encode(session)
+                    except RuntimeError:
+                        # Changed mid-encode by a request; it is marked again and goes out next flush
+                        self.mark(session)
+                        continue
+                    records.append((session.session_id, data, time.time()))
+                    self._stats["bytes_written"] += len(data)
+                try:
+                    self.backend.save_many(records)
+                except Exception:
+                    self._stats["write_errors"] += 1
+                    for session in sessions[start:start + self.max_batch]:
+                        self.mark(session)
+                    raise
+                written += len(records)
+            self._stats["flushes"] += 1
+            self._stats["sessions_written"] += written
+            self._maybe_purge()
+            return written
+
+    def close(self):
+        """Stop the writer after a final flush"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+        self.backend.close()
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            queued = len(self._dirty)
+        stats = dict(self._stats)
+        stats["queued"] = queued
+        stats["flush_interval"] = self.flush_interval
+        stats.update(self.backend.get_stats())
+        return stats
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._dirty) < self.max_batch:
+                    self._cond.wait(self.flush_interval)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                # Failed sessions are re-queued; wait for the next interval before retrying
+                time.sleep(self.flush_interval)
+
+    def _maybe_purge(self):
+        if self.ttl_seconds <= 0 or time.time() - self._last_purge < max(self.ttl_seconds, 60):
+            return
+        self._last_purge = time.time()
+        self._stats["purged"] += self.backend.purge(time.time() - self.ttl_seconds)
@@ -0,0 +1,269 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+import uuid
+import weakref
+import zlib
+from collections import OrderedDict, deque
+from typing import Callable, Optional
+from .blackboard import Blackboard
+from .context_index import ContextIndex
+from .session_persistence import SessionBackend, WriteBehindPersister, create_backend
+
+# First byte of a stored session; bump it when the layout changes
+_FORMAT_VERSION = 1
+# Client-supplied ids end up in logs and storage keys; anything else gets a fresh id
+_SESSION_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,128}")
+
+
+def valid_session_id(session_id) -> bool:
+    """Whether a client-supplied id is 1-128 letters, digits, '-' or '_'"""
+    return isinstance(session_id, str) and _SESSION_ID_RE.fullmatch(session_id) is not None
+
+
+class Session:
+    """Conversation history for a single client, capped at max_turns entries"""
+
+    def __init__(self, session_id: str, max_turns: int, on_change: Callable = None):
+        self.session_id = session_id
+        self.max_turns = max_turns
+        self.history = deque()
+        self.context_index = ContextIndex()
+        self.blackboard = Blackboard()
+        self.created_at = time.time()
+        self.last_access = time.monotonic()
+        self.approx_bytes = 0
+        self._entry_sizes = deque()
+        self._lock = threading.Lock()
+        # Called after each turn is recorded, e.g. to queue a write-behind save
+        self.on_change = on_change
+
+    def append(self, entry: dict):
+        """Record a turn, dropping the oldest one once the cap is reached"""
+        size = len(json.dumps(entry, default=str))
+        with self._lock:
+            self.history.append(entry)
+            self._entry_sizes.append(size)
+            self.approx_bytes += size
+            while len(self.history) > self.max_turns:
+                self.history.popleft()
+                self.approx_bytes -= self._entry_sizes.popleft()
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def touch(self):
+        self.last_access = time.monotonic()
+
+
+def encode_session(session: Session) -> bytes:
+    """Compact form of a session: history plus extracted context as compressed JSON
+
+    Agent turns keep their extracted context in history, so repeated items
+    compress well. Entry sizes are stored so a restore doesn't re-measure them.
+    """
+    with session._lock:
+        history = list(session.history)
+        sizes = list(session._entry_sizes)
+    state = {
+        "id": session.session_id,
+        "created_at": session.created_at,
+        "history": history,
+        "sizes": sizes,
+        "index": session.context_index.to_state(),
+        "board": session.blackboard.to_state()
+    }
+    payload = json.dumps(state, separators=(',', ':'), default=str).encode('utf-8')
+    return bytes([_FORMAT_VERSION]) + zlib.compress(payload, 6)
+
+
+def decode_session(data: bytes, max_turns: int, on_change: Callable = None) -> Session:
+    """Rebuild a session stored by encode_session()"""
+    if not data or data[0] != _FORMAT_VERSION:
+        raise ValueError(f"Unsupported session format {data[:1]!r}")
+    state = json.loads(zlib.decompress(data[1:]))
+    session = Session(state["id"], max_turns)
+    session.created_at = state["created_at"]
+    history, sizes = state["history"][-max_turns:], state["sizes"][-max_turns:]
+    session.history.extend(history)
+    session._entry_sizes.extend(sizes)
+    session.approx_bytes = sum(sizes)
+    session.context_index = ContextIndex.from_state(state["index"])
+    session.blackboard = Blackboard.from_state(state["board"])
+    session.on_change = on_change
+    return session
+
+
+class SessionStore:
+    """Per-session conversation state with LRU eviction and idle expiry
+
+    With a persistence backend (SESSION_BACKEND=memory or sqlite), changed
+    sessions are saved write-behind, and a session that is not resident, e.g.
+    after a restart or LRU eviction, is restored on its first request.
+    """
+
+    def __init__(self, max_sessions: int = None, max_turns: int = None, ttl_seconds: float = None,
+                 backend: SessionBackend = None):
+        self.max_sessions = max_sessions or int(os.getenv('SESSION_MAX_SESSIONS', '1000'))
+        self.max_turns = max_turns or int(os.getenv('SESSION_MAX_TURNS', '50'))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(
+            os.getenv('SESSION_TTL_SECONDS', '3600'))
+        self._sessions = OrderedDict()
+        # Evicted sessions still referenced (by an in-flight request or a queued write), so a
+        # restore hands back the live object instead of a second copy that would race it
+        self._evicted = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.expired = 0
+        self.restored = 0
+        self.restore_failures = 0
+        self.rejected_ids = 0
+        backend = backend if backend is not None else create_backend()
+        self.persister = WriteBehindPersister(
+            backend, encode_session, ttl_seconds=self.ttl_seconds
+        ) if backend is not None else None
+
+    def get(self, session_id: Optional[str] = None) -> Session:
+        """Return the session for an id, restoring or creating it (and an id) when missing or malformed"""
+        session_id = self._checked(session_id)
+        session = self._resident(session_id)
+        if session is not None:
+            return session
+        # Read outside the lock so a restore doesn't stall other sessions' requests
+        restored = self._restore(session_id) if session_id is not None else None
+        return self._admit(session_id, restored)
+
+    async def aget(self, session_id: Optional[str] = None) -> Session:
+        """Async variant of get(); a restore reads and decodes on a worker thread, off the event loop"""
+        session_id = self._checked(session_id)
+        session = self._resident(session_id)
+        if session is not None:
+            return session
+        restored = None
+        if session_id is not None:
+            if self.persister is not None:
+                restored = await asyncio.get_running_loop().run_in_executor(None, self._restore, session_id)
+            else:
+                restored = self._restore(session_id)
+        return self._admit(session_id, restored)
+
+    def _checked(self, session_id) -> Optional[str]:
+        """The id if it is well formed, else None so a new one is minted"""
+        if session_id is None or valid_session_id(session_id):
+            return session_id
+        with self._lock:
+            self.rejected_ids += 1
+        return None
+
+    def _resident(self, session_id: Optional[str]) -> Optional[Session]:
+        if session_id is None:
+            return None
+        with self._lock:
+            self._expire_idle()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                session.touch()
+            return session
+
+    def _admit(self, session_id: Optional[str], restored: Optional[Session]) -> Session:
+        """Make a restored or new session resident, unless another request got there first"""
+        session_id = session_id or uuid.uuid4().hex
+        with self._lock:
+            self._expire_idle()
+            session = self._sessions.get(session_id)
+            if session is None:
+                if restored is not None:
+                    self.restored += 1
+                session = restored or Session(session_id, self.max_turns, self._on_change)
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    evicted_id, evicted = self._sessions.popitem(last=False)
+                    self._evicted[evicted_id] = evicted
+                    self.evicted += 1
+            else:
+                self._sessions.move_to_end(session_id)
+            session.touch()
+            return session
+
+    def peek(self, session_id: str) -> Optional[Session]:
+        """The session if it is resident or stored, without creating or admitting one"""
+        if self._checked(session_id) is None:
+            return None
+        return self._resident(session_id) or self._restore(session_id)
+
+    def drop(self, session_id: str):
+        """Forget a session, including its stored copy"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._evicted.pop(session_id, None)
+        if self.persister is not None:
+            self.persister.forget(session_id)
+
+    def flush(self) -> int:
+        """Write queued session changes now and return how many sessions were written"""
+        return self.persister.flush() if self.persister is not None else 0
+
+    def close(self):
+        """Flush and release the persistence backend"""
+        if self.persister is not None:
+            self.persister.close()
+
+    def _on_change(self, session: Session):
+        if self.persister is not None:
+            self.persister.mark(session)
+
+    def _restore(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            session = self._evicted.get(session_id)
+        if session is not None or self.persister is None:
+            return session
+        # An evicted session whose write is still queued is newer than the stored copy
+        session = self.persister.pending(session_id)
+        if session is None:
+            try:
+                data = self.persister.backend.load(session_id, max_age=self.ttl_seconds)
+                session = decode_session(data, self.max_turns, self._on_change) if data else None
+            except Exception:
+                self.restore_failures += 1
+                return None
+        return session
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _expire_idle(self):
+        if self.ttl_seconds <= 0:
+            return
+        cutoff = time.monotonic() - self.ttl_seconds
+        # Sessions are kept in access order, so idle ones sit at the front
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_access >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+    def get_stats(self) -> dict:
+        """Resident sessions, approximate bytes held and eviction counts"""
+        with self._lock:
+            self._expire_idle()
+            sessions = list(self._sessions.values())
+            evicted, expired = self.evicted, self.expired
+        return {
+            "sessions": len(sessions),
+            "turns": sum(len(session.history) for session in sessions),
+            "approx_bytes": sum(session.approx_bytes for session in sessions),
+            "blackboard_entries": sum(session.blackboard.get_stats()["entries"] for session in sessions),
+            "evicted_lru": evicted,
+            "expired_idle": expired,
+            "max_sessions": self.max_sessions,
+            "max_turns_per_session": self.max_turns,
+            "ttl_seconds": self.ttl_seconds,
+            "restored": self.restored,
+            "rejected_ids": self.rejected_ids,
+            "restore_failures": self.restore_failures,
+            "persistence": self.persister.get_stats() if self.persister is not None else None
+        }
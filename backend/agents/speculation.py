@@ -0,0 +1,83 @@
+import os
+import threading
+from collections import Counter, deque
+
+from utils.metrics import SPECULATION_OUTCOMES, SPECULATION_SAVED_SECONDS
+
+
+class Speculator:
+    """Decides when to start an agent on the local routing guess, and tracks how that pays off
+
+    Speculation only happens when the local router is unsure (so the real
+    decision needs the LLM and there is time to overlap). Local guesses are
+    scored against the real decision on every such request, speculated or
+    not, and speculation pauses while the recent miss rate, i.e. the share
+    of speculative calls that would be wasted, is above max_waste_ratio.
+    """
+
+    def __init__(self, enabled: bool = None, min_confidence: float = None, max_waste_ratio: float = None,
+                 window: int = None, max_in_flight: int = None):
+        self.enabled = enabled if enabled is not None else os.getenv(
+            'SPECULATIVE_EXECUTION', 'false').lower() in ('1', 'true', 'yes')
+        self.min_confidence = min_confidence if min_confidence is not None else float(
+            os.getenv('SPECULATION_MIN_CONFIDENCE', '0.5'))
+        self.max_waste_ratio = max_waste_ratio if max_waste_ratio is not None else float(
+            os.getenv('SPECULATION_MAX_WASTE_RATIO', '0.25'))
+        self.max_in_flight = max_in_flight or int(os.getenv('SPECULATION_MAX_IN_FLIGHT', '8'))
+        # Recent guesses, True when the local guess matched the real decision
+        self._outcomes = deque(maxlen=window or int(os.getenv('SPECULATION_WINDOW', '50')))
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    def wants(self, prediction: dict, confidence_threshold: float) -> bool:
+        """Whether the request's routing is uncertain enough to be worth a guess at all"""
+        return self.enabled and prediction["confidence"] < confidence_threshold
+
+    def try_start(self, prediction: dict) -> bool:
+        """Reserve a speculative run for the prediction, or refuse it (low confidence, budget, in flight)"""
+        with self._lock:
+            if prediction["confidence"] < self.min_confidence:
+                reason = "low_confidence"
+            elif self._in_flight >= self.max_in_flight:
+                reason = "in_flight_cap"
+            elif self._waste_ratio() > self.max_waste_ratio:
+                reason = "waste_budget"
+            else:
+                self._in_flight += 1
+                self._stats["started"] += 1
+                return True
+            self._stats[f"skipped_{reason}"] += 1
+        SPECULATION_OUTCOMES.inc(outcome="skipped")
+        return False
+
+    def finished(self, *_):
+        """Release a run reserved by try_start(), once it is done or cancelled"""
+        with self._lock:
+            self._in_flight -= 1
+
+    def observe(self, hit: bool, speculated: bool, saved_seconds: float = 0.0):
+        """Score a local guess against the real decision"""
+        with self._lock:
+            self._outcomes.append(hit)
+            if speculated:
+                self._stats["hits" if hit else "wasted"] += 1
+                self._stats["saved_ms"] += int(saved_seconds * 1000)
+        if speculated:
+            SPECULATION_OUTCOMES.inc(outcome="hit" if hit else "wasted")
+            if hit:
+                SPECULATION_SAVED_SECONDS.observe(saved_seconds)
+
+    def get_stats(self) -> dict:
+        """Speculative runs started, hit, wasted and skipped, with latency saved"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = self._in_flight
+            stats["recent_waste_ratio"] = self._waste_ratio()
+        speculated = stats.get("hits", 0) + stats.get("wasted", 0)
+        stats["hit_rate"] = stats.get("hits", 0) / speculated if speculated else 0.0
+        stats["enabled"] = self.enabled
+        return stats
+
+    def _waste_ratio(self) -> float:
+        return self._outcomes.count(False) / len(self._outcomes) if self._outcomes else 0.0
@@ -1,6 +1,10 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from agents.orchestrator import Orchestrator
+from utils.logger import configure_logging
+from utils.metrics import CONTENT_TYPE, render_metrics
+from utils.jsonl import format_jsonl
+from utils.sse import format_sse
 import os
 from dotenv import load_dotenv
 import logging
@@ -8,11 +12,8 @@ import logging
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging once for the whole process
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Initialize Flask app
@@ -21,11 +22,14 @@ CORS(app, resources={r"/*": {"origins": ["http://localhost:3000"], "methods": ["
 
 # Get API key from environment
 api_key = os.getenv('GEMINI_API_KEY')
-if not api_key:
+if not api_key and os.getenv('LLM_BACKEND', 'gemini').lower() != 'fake':
     raise ValueError("GEMINI_API_KEY not found in environment variables")
 
 # Initialize orchestrator
 orchestrator = Orchestrator(api_key)
+# Agents are built on first use; AGENT_WARMUP=true builds them before serving
+if os.getenv('AGENT_WARMUP', 'false').lower() in ('1', 'true', 'yes'):
+    orchestrator.warm_up()
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -40,6 +44,42 @@ def get_welcome():
         logger.error(f"Error getting welcome message: {str(e)}")
         return jsonify({"error": "Failed to get welcome message"}), 500
 
+@app.route('/stats/routing', methods=['GET'])
+def routing_stats():
+    return jsonify(orchestrator.routing_stats())
+
+@app.route('/stats/structured-output', methods=['GET'])
+def structured_output_stats():
+    return jsonify(orchestrator.structured_output_stats())
+
+@app.route('/stats/prompts', methods=['GET'])
+def prompt_stats():
+    return jsonify(orchestrator.prompt_stats())
+
+@app.route('/stats/startup', methods=['GET'])
+def startup_stats():
+    return jsonify(orchestrator.startup_stats())
+
+@app.route('/stats/speculation', methods=['GET'])
+def speculation_stats():
+    return jsonify(orchestrator.speculation_stats())
+
+@app.route('/stats/sessions', methods=['GET'])
+def session_stats():
+    return jsonify(orchestrator.session_stats())
+
+@app.route('/stats/llm-cache', methods=['GET'])
+def llm_cache_stats():
+    return jsonify(orchestrator.llm_cache_stats())
+
+@app.route('/stats/llm-client', methods=['GET'])
+def llm_client_stats():
+    return jsonify(orchestrator.llm_client_stats())
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), content_type=CONTENT_TYPE)
+
 @app.route('/chat', methods=['POST'])
 def chat():
     try:
@@ -48,11 +88,56 @@ def chat():
             return jsonify({"error": "No message provided"}), 400
         
         message = data['message']
-        response = orchestrator.process_request(message)
+        response = orchestrator.process_request(message, data.get('session_id'))
         return jsonify(response)
     except Exception as e:
         logger.error(f"Error processing chat request: {str(e)}")
         return jsonify({"error": "Failed to process your request"}), 500
 
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    data = request.json
+    if not data or 'message' not in data:
+        return jsonify({"error": "No message provided"}), 400
+        
+    message = data['message']
+    session_id = data.get('session_id')
+    
+    def generate():
+        try:
+            for event, payload in orchestrator.process_request_stream(message, session_id):
+                yield format_sse(event, payload)
+        except Exception as e:
+            logger.error(f"Error streaming chat request: {str(e)}")
+            yield format_sse("error", {"error": "Failed to process your request"})
+            
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    data = request.json
+    if not isinstance(data, dict):
+        return jsonify({"error": "No items provided"}), 400
+        
+    try:
+        results = orchestrator.process_batch(data.get('items'), data.get('concurrency'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+        
+    def generate():
+        try:
+            for result in results:
+                yield format_jsonl(result)
+        except Exception as e:
+            logger.error(f"Error processing chat batch: {str(e)}")
+            yield format_jsonl({"error": "Failed to process the batch"})
+            
+    # One JSON object per line, written as each item finishes
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
@@ -0,0 +1,176 @@
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from agents.orchestrator import Orchestrator
+from utils.logger import configure_logging
+from utils.metrics import CONTENT_TYPE, render_metrics
+from utils.jsonl import format_jsonl
+from utils.sse import format_sse
+import os
+from dotenv import load_dotenv
+import logging
+
+# ASGI entry point serving the same API as app.py. Chat requests go through
+# Orchestrator.aprocess_request, so requests waiting on Gemini share the event
+# loop instead of each holding a thread. Run with:
+#     uvicorn asgi:app --port 5000
+
+# Load environment variables
+load_dotenv()
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="Real Estate Agent")
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:3000"],
+    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["*"]
+)
+
+# Get API key from environment
+api_key = os.getenv('GEMINI_API_KEY')
+if not api_key and os.getenv('LLM_BACKEND', 'gemini').lower() != 'fake':
+    raise ValueError("GEMINI_API_KEY not found in environment variables")
+
+orchestrator = Orchestrator(api_key)
+# Agents are built on first use; AGENT_WARMUP=true builds them before serving
+if os.getenv('AGENT_WARMUP', 'false').lower() in ('1', 'true', 'yes'):
+    orchestrator.warm_up()
+
+
+async def _read_message(request: Request):
+    """Return the JSON body if it carries a message, otherwise None"""
+    try:
+        data = await request.json()
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or 'message' not in data:
+        return None
+    return data
+
+
+@app.get('/health')
+async def health_check():
+    return {"status": "healthy"}
+
+
+@app.get('/welcome')
+async def get_welcome():
+    try:
+        return orchestrator.welcome_message()
+    except Exception as e:
+        logger.error(f"Error getting welcome message: {str(e)}")
+        return JSONResponse({"error": "Failed to get welcome message"}, status_code=500)
+
+
+@app.get('/stats/routing')
+async def routing_stats():
+    return orchestrator.routing_stats()
+
+
+@app.get('/stats/structured-output')
+async def structured_output_stats():
+    return orchestrator.structured_output_stats()
+
+
+@app.get('/stats/prompts')
+async def prompt_stats():
+    return orchestrator.prompt_stats()
+
+
+@app.get('/stats/startup')
+async def startup_stats():
+    return orchestrator.startup_stats()
+
+
+@app.get('/stats/speculation')
+async def speculation_stats():
+    return orchestrator.speculation_stats()
+
+
+@app.get('/stats/sessions')
+async def session_stats():
+    return orchestrator.session_stats()
+
+
+@app.get('/stats/llm-cache')
+async def llm_cache_stats():
+    return orchestrator.llm_cache_stats()
+
+
+@app.get('/stats/llm-client')
+async def llm_client_stats():
+    return orchestrator.llm_client_stats()
+
+
+@app.get('/metrics')
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+
+@app.post('/chat')
+async def chat(request: Request):
+    data = await _read_message(request)
+    if data is None:
+        return JSONResponse({"error": "No message provided"}, status_code=400)
+
+    try:
+        return await orchestrator.aprocess_request(data['message'], data.get('session_id'))
+    except Exception as e:
+        logger.error(f"Error processing chat request: {str(e)}")
+        return JSONResponse({"error": "Failed to process your request"}, status_code=500)
+
+
+@app.post('/chat/stream')
+async def chat_stream(request: Request):
+    data = await _read_message(request)
+    if data is None:
+        return JSONResponse({"error": "No message provided"}, status_code=400)
+
+    def generate():
+        # Gemini's streaming iterator is synchronous; Starlette drives it in its threadpool
+        try:
+            for event, payload in orchestrator.process_request_stream(data['message'], data.get('session_id')):
+                yield format_sse(event, payload)
+        except Exception as e:
+            logger.error(f"Error streaming chat request: {str(e)}")
+            yield format_sse("error", {"error": "Failed to process your request"})
+
+    return StreamingResponse(
+        generate(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.post('/chat/batch')
+async def chat_batch(request: Request):
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return JSONResponse({"error": "No items provided"}, status_code=400)
+
+    try:
+        results = orchestrator.aprocess_batch(data.get('items'), data.get('concurrency'))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    async def generate():
+        try:
+            async for result in results:
+                yield format_jsonl(result)
+        except Exception as e:
+            logger.error(f"Error processing chat batch: {str(e)}")
+            yield format_jsonl({"error": "Failed to process the batch"})
+
+    # One JSON object per line, written as each item finishes
+    return StreamingResponse(generate(), media_type='application/x-ndjson')
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='127.0.0.1', port=5000)
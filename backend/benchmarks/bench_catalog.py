@@ -0,0 +1,106 @@
+"""Microbenchmark: property catalog search latency as the listing count grows
+
+Builds synthetic catalogs and times PropertyCatalog.search against a plain
+Python scan over the same records for a mix of multi-criteria queries.
+
+Run from the backend directory:
+    python -m benchmarks.bench_catalog
+"""
+import argparse
+import random
+import statistics
+import time
+
+from agents.property_catalog import PropertyCatalog
+
+LOCATIONS = ["Hyde Park, Austin", "East Riverside, Austin", "Mueller, Austin", "Cedar Park",
+             "Round Rock", "Pflugerville", "Georgetown", "Westlake"]
+TYPES = ["Single-family home", "Condo", "Townhouse", "Loft"]
+FEATURES = ["Updated kitchen", "Two-car garage", "Large backyard", "Swimming pool", "Home office",
+            "Fireplace", "Solar panels", "Covered patio"]
+
+
+def make_records(count: int, rng: random.Random) -> list:
+    records = []
+    for i in range(count):
+        bedrooms = rng.randint(1, 5)
+        records.append({
+            "name": f"Listing {i}",
+            "type": rng.choice(TYPES),
+            "price": rng.randint(150, 1500) * 1000,
+            "bedrooms": bedrooms,
+            "bathrooms": max(1, bedrooms - 1),
+            "sqft": 500 + bedrooms * 400 + rng.randint(0, 400),
+            "location": rng.choice(LOCATIONS),
+            "features": rng.sample(FEATURES, 3)
+        })
+    return records
+
+
+def make_queries(count: int, rng: random.Random) -> list:
+    queries = []
+    for _ in range(count):
+        low = rng.randint(150, 900) * 1000
+        queries.append({
+            "min_price": low,
+            "max_price": low + rng.randint(100, 400) * 1000,
+            "min_bedrooms": rng.randint(1, 4),
+            "types": [rng.choice(TYPES).split()[0]],
+            "locations": [rng.choice(LOCATIONS).split(",")[0]],
+            "features": ["garage"]
+        })
+    return queries
+
+
+def scan(records: list, query: dict, limit: int = 3) -> list:
+    """Row-at-a-time filter and sort, the baseline the catalog replaces"""
+    matches = [
+        r for r in records
+        if query["min_price"] <= r["price"] <= query["max_price"]
+        and r["bedrooms"] >= query["min_bedrooms"]
+        and query["types"][0].lower() in r["type"].lower()
+        and r["location"].split(",")[0] in query["locations"]
+    ]
+    matches.sort(key=lambda r: (-r["sqft"] / r["price"], abs(r["price"] - query["max_price"])))
+    return matches[:limit]
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def timed(fn, queries: list) -> list:
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 500000])
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'listings':>9} {'build s':>8} {'catalog p50 ms':>15} {'catalog p95 ms':>15} {'scan p50 ms':>12}")
+    for size in args.sizes:
+        rng = random.Random(args.seed)
+        records = make_records(size, rng)
+        queries = make_queries(args.queries, rng)
+
+        start = time.perf_counter()
+        catalog = PropertyCatalog(records)
+        build = time.perf_counter() - start
+
+        indexed = timed(lambda query: catalog.search(**query), queries)
+        scanned = timed(lambda query: scan(records, query), queries)
+        print(f"{size:>9} {build:>8.2f} {statistics.median(indexed):>15.2f} "
+              f"{percentile(indexed, 0.95):>15.2f} {statistics.median(scanned):>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Microbenchmark: per-request context build cost as a session's history grows
+
+Compares the old approach (rescan the whole history with list-membership
+dedup on every request) against the incrementally maintained ContextIndex.
+
+Run from the backend directory:
+    python -m benchmarks.bench_context_index
+"""
+import argparse
+import time
+
+from agents.context_index import ContextIndex
+
+
+def make_turn(i: int) -> dict:
+    """Synthetic agent output cycling through the four agent types"""
+    kind = i % 4
+    if kind == 0:
+        return {"final_recommendations": {"properties": [{
+            "name": f"Property {i % 500}",
+            "price": f"${400 + i % 500},000",
+            "highlight": "Bright and airy",
+            "features": ["garage", "garden", f"feature {i % 7}"]
+        }]}}
+    if kind == 1:
+        return {"nearby_amenities": [
+            {"amenity": f"Park {i % 300}", "category": "Parks", "distance": "Nearby", "details": ""},
+            {"amenity": f"School {i % 200}", "category": "Education", "distance": "Nearby", "details": ""}
+        ]}
+    if kind == 2:
+        return {"strategy": {"message": f"Offer {i}", "points": [f"point {i}"]}}
+    return {"closing_details": {"documents_needed": ["ID"], "timeline": [f"step {i}"], "key_terms": {}}}
+
+
+def rescan_history(history: list) -> dict:
+    """The pre-index implementation of Orchestrator._build_context_for_agent"""
+    context = {"properties": [], "amenities": [], "negotiation": {}, "closing": {}}
+    for entry in reversed(history):
+        if "final_recommendations" in entry["context"]:
+            for prop in entry["context"]["final_recommendations"]["properties"]:
+                if prop not in context["properties"]:
+                    context["properties"].append(prop)
+        elif "nearby_amenities" in entry["context"]:
+            for amenity in entry["context"]["nearby_amenities"]:
+                if amenity not in context["amenities"]:
+                    context["amenities"].append(amenity)
+        elif "strategy" in entry["context"]:
+            context["negotiation"].update(entry["context"]["strategy"])
+        elif "closing_details" in entry["context"]:
+            context["closing"].update(entry["context"]["closing_details"])
+    return context
+
+
+def time_per_call(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'turns':>8} {'rescan us/req':>15} {'index us/req':>14} {'index update us':>16}")
+    for size in args.sizes:
+        turns = [make_turn(i) for i in range(size)]
+        history = [{"role": "agent", "context": turn} for turn in turns]
+
+        index = ContextIndex()
+        update_cost = time_per_call(lambda: [index.add(turn) for turn in turns], 1) / max(size, 1)
+
+        rescan = time_per_call(lambda: rescan_history(history), args.repeat)
+        indexed = time_per_call(index.snapshot, args.repeat)
+        print(f"{size:>8} {rescan:>15.1f} {indexed:>14.1f} {update_cost:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
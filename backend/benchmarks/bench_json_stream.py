@@ -0,0 +1,120 @@
+"""Streaming JSON benchmark: throughput and time to first item on large structured responses
+
+Builds a response the way agents return them (prose, then a fenced ```json
+block holding a list of properties) and feeds it in small chunks, as the
+Gemini stream delivers it. Compares:
+
+  stream     StreamingJSONParser, emitting each property as it closes
+  whole      json.loads once the full response has arrived (no early items)
+  reparse    re-parsing the accumulated text after every chunk, the naive
+             way to get early items (quadratic in response size)
+
+Also checks truncation recovery: the response is cut at several points and
+the number of properties recovered without another LLM call is reported.
+
+Run from the backend directory:
+    python -m benchmarks.bench_json_stream --properties 2000 --chunk 24
+"""
+import argparse
+import json
+import time
+
+from agents.json_stream import StreamingJSONParser
+from agents.schemas import parse_json, split_structured_response
+
+
+def build_response(properties: int) -> str:
+    listings = [
+        {
+            "name": f"Listing {index}",
+            "type": "Single family",
+            "price": 450000 + index * 125,
+            "location": "Austin, TX",
+            "features": ["3 bedrooms", "2 bathrooms", "Updated kitchen", "Fenced yard"],
+            "match_reasons": ["Within budget", "Close to schools"]
+        }
+        for index in range(properties)
+    ]
+    prose = "Great news! I found several homes that match what you're looking for.\n\n"
+    return f"{prose}```json\n{json.dumps(listings, indent=2)}\n```"
+
+
+def chunked(text: str, size: int) -> list:
+    return [text[start:start + size] for start in range(0, len(text), size)]
+
+
+def bench_stream(chunks: list) -> tuple:
+    parser = StreamingJSONParser()
+    first_item = None
+    items = 0
+    start = time.perf_counter()
+    for chunk in chunks:
+        completed = parser.feed(chunk)
+        if completed and first_item is None:
+            first_item = time.perf_counter() - start
+        items += len(completed)
+    parser.close()
+    return time.perf_counter() - start, first_item, items
+
+
+def bench_whole(chunks: list) -> tuple:
+    start = time.perf_counter()
+    text = "".join(chunks)
+    items = len(parse_json(text))
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed, items
+
+
+def bench_reparse(chunks: list, budget: float) -> tuple:
+    """Re-parse after every chunk; gives up once the time budget is spent"""
+    start = time.perf_counter()
+    text = ""
+    seen = 0
+    first_item = None
+    for done, chunk in enumerate(chunks, 1):
+        text += chunk
+        _, data = split_structured_response(text)
+        if data and len(data) > seen:
+            seen = len(data)
+            if first_item is None:
+                first_item = time.perf_counter() - start
+        if time.perf_counter() - start > budget:
+            return None, first_item, done / len(chunks)
+    return time.perf_counter() - start, first_item, seen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--properties', type=int, default=2000)
+    parser.add_argument('--chunk', type=int, default=24, help='characters per streamed chunk')
+    parser.add_argument('--reparse-budget', type=float, default=10.0, help='seconds before the naive run gives up')
+    args = parser.parse_args()
+
+    text = build_response(args.properties)
+    chunks = chunked(text, args.chunk)
+    megabytes = len(text.encode()) / 1e6
+    print(f"{args.properties} properties, {megabytes:.2f} MB in {len(chunks)} chunks of {args.chunk} chars\n")
+    print(f"{'parser':<10} {'total ms':>10} {'MB/s':>8} {'first item ms':>14} {'items':>7}")
+
+    for name, run in (('stream', bench_stream), ('whole', bench_whole)):
+        elapsed, first_item, items = run(chunks)
+        print(f"{name:<10} {elapsed * 1000:10.1f} {megabytes / elapsed:8.1f} {first_item * 1000:14.2f} {items:7}")
+
+    elapsed, first_item, items = bench_reparse(chunks, args.reparse_budget)
+    first = f"{first_item * 1000:14.2f}" if first_item is not None else f"{'-':>14}"
+    if elapsed is None:
+        print(f"{'reparse':<10} {'timeout':>10} {'-':>8} {first} {f'{items:.0%} fed':>7}")
+    else:
+        print(f"{'reparse':<10} {elapsed * 1000:10.1f} {megabytes / elapsed:8.1f} {first} {items:7}")
+
+    print("\ntruncation recovery (no extra LLM call)")
+    for fraction in (0.25, 0.5, 0.9, 0.999):
+        cut = text[:int(len(text) * fraction)]
+        start = time.perf_counter()
+        _, data = split_structured_response(cut)
+        elapsed = time.perf_counter() - start
+        print(f"  cut at {fraction:6.1%}: {len(data or []):5} of {args.properties} properties in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""End-to-end latency benchmark for the chat pipeline
+
+Drives Orchestrator.process_request (threads), Orchestrator.aprocess_request
+(asyncio) or a running server's /chat endpoint at a configurable
+concurrency, and reports p50/p95/p99 latency, throughput and, for the
+in-process targets, LLM calls per request.
+
+In-process targets default to the offline fake Gemini backend, so no quota
+is spent (see utils/fake_gemini.py for its latency and failure settings).
+
+Run from the backend directory, e.g.:
+    python -m benchmarks.bench_latency --target orchestrator --requests 200 --concurrency 20
+    python -m benchmarks.bench_latency --target async --requests 1000 --concurrency 200
+    python -m benchmarks.bench_latency --target http --url http://localhost:5000 --concurrency 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+SAMPLE_MESSAGES = [
+    "I'm looking for a 3 bedroom house in Austin under $600k",
+    "find me a condo close to downtown",
+    "what schools are near the Maple Grove Craftsman?",
+    "are there parks and grocery stores nearby?",
+    "can we negotiate the price on the Riverside Loft?",
+    "what should my initial offer be?",
+    "what documents do I need for closing?",
+    "how long does escrow usually take?",
+    "tell me more about the second one",
+    "is this a good deal?",
+]
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(label: str, latencies: list, errors: int, elapsed: float, llm_calls: int = None):
+    completed = len(latencies)
+    print(f"\n{label}")
+    print(f"  requests     {completed + errors} ({errors} errors)")
+    print(f"  throughput   {completed / elapsed:.1f} req/s over {elapsed:.2f}s")
+    if latencies:
+        print(f"  mean         {statistics.mean(latencies) * 1000:.0f} ms")
+        for pct in (50, 95, 99):
+            print(f"  p{pct:<11} {percentile(latencies, pct) * 1000:.0f} ms")
+    if llm_calls is not None and completed:
+        print(f"  LLM calls    {llm_calls / completed:.2f} per request")
+
+
+def run_orchestrator(orchestrator, messages: list, concurrency: int):
+    latencies, errors = [], 0
+
+    def one(message):
+        start = time.perf_counter()
+        orchestrator.process_request(message)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(one, message) for message in messages]:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                errors += 1
+    return latencies, errors, time.perf_counter() - start
+
+
+def run_async(orchestrator, messages: list, concurrency: int):
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(message):
+            async with semaphore:
+                start = time.perf_counter()
+                await orchestrator.aprocess_request(message)
+                return time.perf_counter() - start
+
+        return await asyncio.gather(*[one(message) for message in messages], return_exceptions=True)
+
+    start = time.perf_counter()
+    results = asyncio.run(main())
+    elapsed = time.perf_counter() - start
+    latencies = [result for result in results if not isinstance(result, BaseException)]
+    return latencies, len(results) - len(latencies), elapsed
+
+
+def run_http(url: str, messages: list, concurrency: int, timeout: float):
+    latencies, errors = [], 0
+
+    def one(message):
+        body = json.dumps({"message": message}).encode('utf-8')
+        request = urllib.request.Request(f"{url.rstrip('/')}/chat", data=body,
+                                         headers={'Content-Type': 'application/json'})
+        start = time.perf_counter()
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(one, message) for message in messages]:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                errors += 1
+    return latencies, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', choices=['orchestrator', 'async', 'http'], default='orchestrator')
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--backend', choices=['fake', 'gemini'], default='fake',
+                        help='LLM backend for in-process targets')
+    args = parser.parse_args()
+
+    messages = [SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)] for i in range(args.requests)]
+    label = f"{args.target}: {args.requests} requests at concurrency {args.concurrency}"
+
+    if args.target == 'http':
+        latencies, errors, elapsed = run_http(args.url, messages, args.concurrency, args.timeout)
+        report(label, latencies, errors, elapsed)
+        return
+
+    os.environ['LLM_BACKEND'] = args.backend
+    from agents.orchestrator import Orchestrator
+    from utils.fake_gemini import FakeGenerativeModel
+
+    orchestrator = Orchestrator(os.getenv('GEMINI_API_KEY', 'offline'))
+    # Build agents and fill greeting pools up front so warm-up calls don't count against requests
+    orchestrator.warm_up(fill_greetings=True)
+    FakeGenerativeModel.reset_calls()
+    runner = run_async if args.target == 'async' else run_orchestrator
+    latencies, errors, elapsed = runner(orchestrator, messages, args.concurrency)
+
+    llm_calls = FakeGenerativeModel.total_calls() if args.backend == 'fake' else None
+    report(label, latencies, errors, elapsed, llm_calls)
+    if llm_calls is not None:
+        print(f"  by call site {dict(FakeGenerativeModel.calls)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Session persistence benchmark: request-path overhead, write-behind flushes and lazy restore
+
+Builds sessions shaped like real conversations (user turns plus agent turns
+carrying extracted properties) and measures:
+
+  - the serialized size against plain JSON of the same state
+  - the time a request spends recording a turn with and without persistence
+  - flush throughput into the SQLite (WAL) backend
+  - restore latency for a session's first request after a restart
+
+Run from the backend directory:
+    python -m benchmarks.bench_sessions --sessions 2000 --turns 20
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from agents.session_persistence import SQLiteSessionBackend
+from agents.sessions import SessionStore, encode_session
+
+
+def agent_turn(turn: int) -> dict:
+    properties = [
+        {"name": f"Listing {turn}-{index}", "price": f"${450 + index * 15},000", "location": "Austin, TX",
+         "features": ["3 bedrooms", "2 bathrooms", "Updated kitchen"]}
+        for index in range(3)
+    ]
+    context = {"final_recommendations": {"properties": properties}}
+    return {"role": "agent", "agent": "Mike", "message": "Here are a few homes that fit. " * 8, "context": context}
+
+
+def fill(store: SessionStore, sessions: int, turns: int) -> float:
+    """Record every turn and return the mean seconds per recorded turn"""
+    elapsed = 0.0
+    for number in range(sessions):
+        session = store.get(f"bench-{number}")
+        for turn in range(turns):
+            entry = agent_turn(turn) if turn % 2 else {"role": "user", "message": "Show me homes in Austin"}
+            start = time.perf_counter()
+            session.append(entry)
+            if entry["role"] == "agent":
+                session.context_index.add(entry["context"])
+                session.blackboard.publish("property_search", entry["context"])
+            elapsed += time.perf_counter() - start
+    return elapsed / (sessions * turns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=2000)
+    parser.add_argument('--turns', type=int, default=20)
+    args = parser.parse_args()
+    # Hold every write for the explicit flush below so it is timed on its own
+    os.environ['SESSION_FLUSH_INTERVAL'] = '3600'
+    os.environ['SESSION_FLUSH_MAX_BATCH'] = str(args.sessions + 1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        plain = fill(SessionStore(max_sessions=args.sessions, ttl_seconds=0), args.sessions, args.turns)
+
+        backend = SQLiteSessionBackend(os.path.join(directory, 'sessions.db'))
+        store = SessionStore(max_sessions=args.sessions, ttl_seconds=0, backend=backend)
+        persisted = fill(store, args.sessions, args.turns)
+        print(f"{args.sessions} sessions x {args.turns} turns")
+        print(f"  record a turn      {plain * 1e6:8.1f} us without persistence, {persisted * 1e6:.1f} us with")
+
+        start = time.perf_counter()
+        written = store.flush()
+        elapsed = time.perf_counter() - start
+        print(f"  flush              {elapsed * 1000:8.1f} ms for {written} sessions ({written / elapsed:,.0f}/s)")
+
+        session = store.get("bench-0")
+        encoded = len(encode_session(session))
+        as_json = len(json.dumps({"history": list(session.history), "index": session.context_index.to_state(),
+                                  "board": session.blackboard.to_state()}))
+        print(f"  stored size        {encoded:8} bytes per session ({as_json} as plain JSON)")
+
+        # A new store over the same database stands in for a restarted process
+        restarted = SessionStore(max_sessions=args.sessions, ttl_seconds=0,
+                                 backend=SQLiteSessionBackend(backend.path))
+        timings = []
+        for number in range(0, args.sessions, max(1, args.sessions // 500)):
+            start = time.perf_counter()
+            restarted.get(f"bench-{number}")
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        print(f"  restore            {statistics.median(timings) * 1000:8.3f} ms median, "
+              f"{timings[int(len(timings) * 0.99)] * 1000:.3f} ms p99 over {len(timings)} sessions")
+        store.close()
+        restarted.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Startup benchmark: import, construction and first-request cost in fresh processes
+
+Each run starts a new interpreter and times importing the orchestrator,
+constructing it, and then either serving a first request (lazy agents, built
+on demand) or calling warm_up() (every agent built up front). It also records
+whether numpy and the Gemini SDK were loaded before the first request. Track
+these numbers over time to catch startup regressions.
+
+Uses the offline fake Gemini backend. Run from the backend directory:
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+from agents.orchestrator import Orchestrator
+imported = time.perf_counter()
+orchestrator = Orchestrator('offline')
+constructed = time.perf_counter()
+loaded = {name: name in sys.modules for name in ('numpy', 'google.generativeai')}
+if sys.argv[1] == 'warm_up':
+    orchestrator.warm_up()
+else:
+    orchestrator.process_request("I'm looking for a 3 bedroom house in Austin under $600k")
+finished = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "init_ms": (constructed - imported) * 1000,
+    "ready_ms": (constructed - start) * 1000,
+    f"{sys.argv[1]}_ms": (finished - constructed) * 1000,
+    "loaded_at_ready": loaded
+}))
+"""
+
+
+def run_child(mode: str) -> dict:
+    env = dict(os.environ, LLM_BACKEND='fake', FAKE_GEMINI_LATENCY='constant:0',
+               LOG_TO_FILE='false', LOG_LEVEL='WARNING')
+    result = subprocess.run([sys.executable, '-c', CHILD, mode], env=env, capture_output=True,
+                            text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    for mode in ('first_request', 'warm_up'):
+        runs = [run_child(mode) for _ in range(args.runs)]
+        print(f"\n{mode}: median of {args.runs} fresh processes")
+        for key in ("import_ms", "init_ms", "ready_ms", f"{mode}_ms"):
+            print(f"  {key:<18} {statistics.median(run[key] for run in runs):8.1f}")
+        loaded = runs[-1]["loaded_at_ready"]
+        print(f"  loaded at ready    {', '.join(name for name, flag in loaded.items() if flag) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import pytest
+
+from agents.json_stream import StreamingJSONParser, parse_tolerant
+from agents.schemas import split_structured_response
+
+
+def test_parse_tolerant_recovers_truncated_object_without_fence():
+    text = 'Here you go: {"x": [{"k": 0}, {"k": 1}, {"k"'
+    assert parse_tolerant(text) == {"x": [{"k": 0}, {"k": 1}]}
+
+
+def test_parse_tolerant_recovers_truncated_array_without_fence():
+    assert parse_tolerant('[{"name": "A"}, {"name') == [{"name": "A"}]
+    assert parse_tolerant('[{"name') == []
+
+
+def test_parse_tolerant_skips_bracketed_prose():
+    assert parse_tolerant('See [note] below {"a": [1, 2]} thanks') == {"a": [1, 2]}
+
+
+def test_parse_tolerant_prefers_fenced_block():
+    assert parse_tolerant('Try [this]\n```json\n{"a": 1}\n```') == {"a": 1}
+
+
+def test_parse_tolerant_without_json():
+    with pytest.raises(ValueError):
+        parse_tolerant("no structured data here")
+
+
+def test_parser_emits_elements_as_they_close():
+    parser = StreamingJSONParser()
+    assert parser.feed('{"properties": [{"name": "A"}') == [(("properties", 0), {"name": "A"})]
+    assert parser.feed(', {"name": "B"') == []
+    assert parser.feed('}]}') == [(("properties", 1), {"name": "B"})]
+    assert parser.close() == {"properties": [{"name": "A"}, {"name": "B"}]}
+
+
+def test_parser_drops_cut_off_element_on_close():
+    parser = StreamingJSONParser()
+    parser.feed('```json\n{"properties": [{"name": "A"}, {"name": "B", "price"')
+    assert parser.close() == {"properties": [{"name": "A"}]}
+    assert parser.truncated
+
+
+def test_split_keeps_non_json_code_blocks_in_prose():
+    text = "Run this:\n```python\nprint([1, 2])\n```"
+    assert split_structured_response(text) == (text, None)
+
+
+def test_split_removes_truncated_json_block():
+    assert split_structured_response('Homes:\n```json\n{"a": [1, 2') == ("Homes:", {"a": [1, 2]})
+
+
+def test_split_keeps_unterminated_code_block():
+    text = "Example:\n```python\nx = [1,"
+    assert split_structured_response(text) == (text, None)
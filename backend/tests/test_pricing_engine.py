@@ -0,0 +1,37 @@
+from agents.pricing_engine import TIMELINE, PricingEngine
+from agents.property_catalog import get_property_catalog, parse_price
+
+
+def test_plan_skips_properties_without_a_home_price():
+    engine = PricingEngine()
+    plans = engine.plan([
+        {"name": "Tiny", "price": "400"},
+        {"name": "Unknown", "price": "call for price"},
+        {"name": "Real", "price": "$450,000"}
+    ])
+    assert [plan["property"]["name"] for plan in plans] == ["Real"]
+
+
+def test_offers_stay_below_the_listed_price():
+    plan = PricingEngine().plan([{"name": "Home", "price": "$500k"}])[0]
+    opening = parse_price(plan["offer_strategy"]["initial_offer"])
+    walk_away = parse_price(plan["offer_strategy"]["walk_away"])
+    assert 0 < opening <= walk_away <= 500_000
+
+
+def test_sqft_text_is_parsed_and_bad_values_are_ignored():
+    catalog = get_property_catalog()
+    engine = PricingEngine(catalog)
+    listing = {"name": "X", "price": "$450,000", "location": catalog.locations[catalog.location_codes[0]]}
+    as_text = engine.plan([dict(listing, sqft="1,850 sq ft")])[0]
+    as_number = engine.plan([dict(listing, sqft=1850)])[0]
+    unparseable = engine.plan([dict(listing, sqft="spacious")])[0]
+    assert as_text["property_valuation"] == as_number["property_valuation"]
+    assert unparseable["property_valuation"]["suggested_value"]
+
+
+def test_plans_get_their_own_timeline():
+    plan = PricingEngine().plan([{"name": "Home", "price": "$300,000"}])[0]
+    plan["timeline"][0]["step"] = "changed"
+    plan["tips"].append("changed")
+    assert TIMELINE[0]["step"] != "changed"
@@ -0,0 +1,48 @@
+from agents.router import Router
+
+
+def _router(answers):
+    calls = []
+
+    def llm(prompt):
+        calls.append(prompt)
+        return answers.pop(0)
+
+    return Router(llm_fallback=llm, confidence_threshold=0.8), calls
+
+
+def test_clear_requests_are_routed_without_the_llm():
+    router, calls = _router([])
+    decision = router.route("Find me a 3 bedroom house for sale in Austin")
+    assert decision["agent"] == "property_search"
+    assert decision["source"] in ("rules", "classifier")
+    assert calls == []
+
+
+def test_llm_answers_are_cached_per_normalized_prompt():
+    router, calls = _router(["closing"])
+    prompt = "hmm, what now?"
+    first = router.route(prompt)
+    second = router.route(prompt.upper())
+    assert first == {"agent": "closing", "confidence": 1.0, "source": "llm"}
+    assert second["source"] == "llm_cache"
+    assert len(calls) == 1
+
+
+def test_llm_failure_falls_back_to_the_local_guess():
+    def failing(prompt):
+        raise RuntimeError("upstream down")
+
+    router = Router(llm_fallback=failing, confidence_threshold=1.1)
+    assert router.route("hmm, what now?")["source"] == "local_fallback"
+
+
+def test_stats_count_local_sources_as_fast_path():
+    router, _ = _router(["negotiation"])
+    router.route("Find me a 3 bedroom house for sale in Austin")
+    router.route("hmm, what now?")
+    router.route("hmm, what now?")
+    router.plan("Find me a 3 bedroom house in Austin and what schools and parks are nearby")
+    stats = router.get_stats()
+    assert stats["fast_path"] + stats["llm_path"] == sum(stats["by_source"].values())
+    assert stats["llm_path"] == 1
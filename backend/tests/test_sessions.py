@@ -0,0 +1,54 @@
+import asyncio
+import gc
+
+from agents.session_persistence import MemorySessionBackend
+from agents.sessions import Session, SessionStore, decode_session, encode_session, valid_session_id
+
+
+def _conversation(session: Session):
+    session.append({"role": "user", "message": "Find homes in Austin"})
+    context = {"final_recommendations": {"properties": [{"name": "Oak Villa", "price": "$450,000"}]}}
+    session.append({"role": "agent", "agent": "Mike", "message": "Here you go", "context": context})
+    session.context_index.add(context)
+    session.blackboard.publish("property_search", context)
+
+
+def test_encode_decode_round_trip():
+    session = Session("abc", max_turns=10)
+    _conversation(session)
+    restored = decode_session(encode_session(session), max_turns=10)
+    assert restored.session_id == "abc"
+    assert list(restored.history) == list(session.history)
+    assert restored.context_index.snapshot() == session.context_index.snapshot()
+    assert restored.blackboard.latest() == session.blackboard.latest()
+
+
+def test_store_restores_evicted_sessions_from_the_backend():
+    store = SessionStore(max_sessions=1, ttl_seconds=0, backend=MemorySessionBackend())
+    _conversation(store.get("first"))
+    store.get("second")
+    store.flush()
+    gc.collect()
+    assert len(store.get("first").history) == 2
+    assert store.get_stats()["restored"] == 1
+    store.close()
+
+
+def test_async_get_restores_too():
+    store = SessionStore(max_sessions=1, ttl_seconds=0, backend=MemorySessionBackend())
+    _conversation(store.get("first"))
+    store.get("second")
+    store.flush()
+    gc.collect()
+    session = asyncio.run(store.aget("first"))
+    assert len(session.history) == 2
+    store.close()
+
+
+def test_malformed_ids_get_a_fresh_session():
+    store = SessionStore(ttl_seconds=0)
+    assert store.get("ok_id-1").session_id == "ok_id-1"
+    assert store.get("../etc/passwd").session_id != "../etc/passwd"
+    assert store.peek("bad id") is None
+    assert not valid_session_id("x" * 129)
+    assert store.get_stats()["rejected_ids"] == 2
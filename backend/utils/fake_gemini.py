@@ -0,0 +1,250 @@
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+
+# Offline stand-in for google.generativeai.GenerativeModel, used for load
+# testing and benchmarks without spending Gemini quota. Select it with
+# LLM_BACKEND=fake. Behaviour is configured through the environment:
+#
+#   FAKE_GEMINI_LATENCY          constant:S | uniform:LO:HI | normal:MEAN:SD | lognormal:MEDIAN:SIGMA
+#                                (seconds, default lognormal:0.8:0.35)
+#   FAKE_GEMINI_FAILURE_RATE     probability a call raises FakeGeminiError (default 0)
+#   FAKE_GEMINI_MALFORMED_RATE   probability structured output omits its JSON block (default 0)
+#   FAKE_GEMINI_RESPONSES_PATH   JSON file of {"prompt substring": "canned response"} overrides
+#   FAKE_GEMINI_SEED             seed for repeatable runs
+
+
+class FakeGeminiError(Exception):
+    """Injected upstream failure"""
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+_PROPERTIES = [
+    {"name": "Maple Grove Craftsman", "type": "Single-family home", "price": "$525,000",
+     "location": "Hyde Park, Austin", "features": ["3 bedrooms", "2 bathrooms", "Updated kitchen"],
+     "match_reasons": ["Within budget", "Quiet street"]},
+    {"name": "Riverside Loft", "type": "Condo", "price": "$389,000",
+     "location": "East Riverside, Austin", "features": ["2 bedrooms", "River views", "Gym"],
+     "match_reasons": ["Low maintenance", "Close to downtown"]},
+    {"name": "Cedar Park Colonial", "type": "Single-family home", "price": "$610,000",
+     "location": "Cedar Park", "features": ["4 bedrooms", "Large backyard", "Two-car garage"],
+     "match_reasons": ["Top-rated schools", "Room to grow"]},
+]
+
+_AMENITIES = {
+    "shopping_dining": [{"name": "Oak Street Market", "type": "Grocery", "distance": "0.6 miles",
+                         "description": "Local produce and deli"}],
+    "education": [{"name": "Lakeside Elementary", "type": "Public school", "distance": "0.9 miles",
+                   "description": "Highly rated elementary school"}],
+    "parks_recreation": [{"name": "Willow Creek Park", "type": "Park", "distance": "0.4 miles",
+                          "description": "Trails and playground"}],
+    "transportation": [{"name": "Route 7 bus stop", "type": "Bus", "distance": "0.2 miles",
+                        "description": "Downtown in 20 minutes"}],
+    "healthcare": [{"name": "Northside Medical Center", "type": "Hospital", "distance": "2.3 miles",
+                    "description": "Full-service hospital"}],
+    "entertainment": [{"name": "Starlight Cinema", "type": "Cinema", "distance": "1.8 miles",
+                       "description": "Eight-screen theater"}],
+}
+
+_STRATEGY = {
+    "market_analysis": {"current_conditions": "Balanced market", "trends": "Prices flat over 6 months"},
+    "property_valuation": {"suggested_value": "$505,000", "value_factors": ["Dated bathrooms", "Strong comps"]},
+    "negotiation_points": ["Days on market", "Inspection findings", "Flexible closing date"],
+    "offer_strategy": {"initial_offer": "$495,000",
+                       "counter_scenarios": ["Meet at $510,000", "Ask for closing credits"]},
+    "timeline": [{"step": "Submit offer", "description": "Within 48 hours"}],
+    "tips": ["Get pre-approved", "Keep emotions out of it"],
+}
+
+_CLOSING = {
+    "documentation": ["Photo ID", "Proof of funds", "Mortgage approval letter"],
+    "timeline": [{"date": "Day 1", "description": "Open escrow"}, {"date": "Day 30", "description": "Close"}],
+    "inspections": {"required_inspections": ["General", "Termite"], "scheduling_info": "Within 10 days"},
+    "costs": {"closing_costs_breakdown": {"title_insurance": "$1,200", "escrow_fees": "$900"}},
+    "walkthrough": {"checklist": ["Appliances", "Repairs completed"], "scheduling_info": "24 hours before closing"},
+    "handover": {"process_steps": ["Sign documents", "Receive keys"], "requirements": ["Funds wired"]},
+    "tips": ["Do not open new credit lines before closing"],
+}
+
+_AGENTS = {
+    "Mike": ("property_search", _PROPERTIES,
+             "Great news, I found a few homes that fit what you described. The Maple Grove Craftsman "
+             "in Hyde Park is listed at $525,000 and has an updated kitchen. Would you like more options?"),
+    "Emma": ("amenities", _AMENITIES,
+             "This neighborhood has a lot going for it. Willow Creek Park is just 0.4 miles away and "
+             "Lakeside Elementary is under a mile. Which amenities matter most to you?"),
+    "Jessica": ("negotiation", _STRATEGY,
+                "The market is fairly balanced right now, so I'd open at $495,000 and be ready to meet "
+                "around $510,000. How flexible is your closing date?"),
+    "Robert": ("closing", _CLOSING,
+               "We're in the home stretch! You'll need your photo ID, proof of funds and the mortgage "
+               "approval letter. Shall I schedule the inspections?"),
+}
+
+_ROUTING_KEYWORDS = [
+    ("negotiation", ("negotiat", "offer", "price", "deal")),
+    ("closing", ("closing", "close", "document", "escrow", "keys")),
+    ("amenities", ("school", "park", "nearby", "amenit", "neighborhood")),
+]
+
+
+class FakeGenerativeModel:
+    """Drop-in replacement for genai.GenerativeModel with synthetic latency and responses"""
+
+    # Shared across instances so benchmarks can count calls per request
+    calls = Counter()
+    _calls_lock = threading.Lock()
+
+    def __init__(self, model_name: str = 'gemini-2.0-flash-lite', latency: str = None,
+                 failure_rate: float = None, malformed_rate: float = None, seed: int = None):
+        self.model_name = model_name
+        self.latency = parse_latency(latency or os.getenv('FAKE_GEMINI_LATENCY', 'lognormal:0.8:0.35'))
+        self.failure_rate = failure_rate if failure_rate is not None else float(
+            os.getenv('FAKE_GEMINI_FAILURE_RATE', '0'))
+        self.malformed_rate = malformed_rate if malformed_rate is not None else float(
+            os.getenv('FAKE_GEMINI_MALFORMED_RATE', '0'))
+        seed = seed if seed is not None else os.getenv('FAKE_GEMINI_SEED')
+        self._random = random.Random(int(seed) if seed is not None else None)
+        self._random_lock = threading.Lock()
+        self.canned = _load_canned(os.getenv('FAKE_GEMINI_RESPONSES_PATH'))
+
+    def generate_content(self, prompt: str, stream: bool = False, request_options: dict = None, **kwargs):
+        prompt_type, text, delay = self._prepare(prompt)
+        if stream:
+            return self._stream(text, delay)
+        timeout = (request_options or {}).get("timeout")
+        # Like the SDK's transport timeout: give up at the deadline instead of holding the thread
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Fake {prompt_type} call exceeded its {timeout:.3f}s transport timeout")
+        time.sleep(delay)
+        return FakeResponse(text)
+
+    async def generate_content_async(self, prompt: str, stream: bool = False, request_options: dict = None,
+                                     **kwargs):
+        prompt_type, text, delay = self._prepare(prompt)
+        timeout = (request_options or {}).get("timeout")
+        if timeout is not None and delay > timeout:
+            await asyncio.sleep(timeout)
+            raise TimeoutError(f"Fake {prompt_type} call exceeded its {timeout:.3f}s transport timeout")
+        await asyncio.sleep(delay)
+        return FakeResponse(text)
+
+    @classmethod
+    def reset_calls(cls):
+        with cls._calls_lock:
+            cls.calls.clear()
+
+    @classmethod
+    def total_calls(cls) -> int:
+        with cls._calls_lock:
+            return sum(cls.calls.values())
+
+    def _prepare(self, prompt: str):
+        prompt_type = classify_prompt(prompt)
+        with self._calls_lock:
+            self.calls[prompt_type] += 1
+        with self._random_lock:
+            delay = self.latency(self._random)
+            fail = self._random.random() < self.failure_rate
+            malformed = self._random.random() < self.malformed_rate
+        if fail:
+            raise FakeGeminiError(f"Injected failure for {prompt_type} prompt")
+        return prompt_type, self._respond(prompt, prompt_type, malformed), delay
+
+    def _stream(self, text: str, delay: float):
+        # Roughly a third of the latency goes to the first token
+        words = re.findall(r"\S+\s*", text) or [text]
+        time.sleep(delay / 3)
+        per_chunk = (delay * 2 / 3) / max(len(words) / 4, 1)
+        for start in range(0, len(words), 4):
+            yield FakeResponse("".join(words[start:start + 4]))
+            time.sleep(per_chunk)
+
+    def _respond(self, prompt: str, prompt_type: str, malformed: bool) -> str:
+        for needle, canned in self.canned.items():
+            if needle in prompt:
+                return canned
+
+        if prompt_type == "routing":
+            # Drop the trailer listing every agent type, or "negotiation" matches every request
+            request = prompt.rsplit("User Request:", 1)[-1].split("Respond with", 1)[0].lower()
+            for agent_type, keywords in _ROUTING_KEYWORDS:
+                if any(keyword in request for keyword in keywords):
+                    return agent_type
+            return "property_search"
+
+        agent = _agent_for_prompt(prompt)
+        if prompt_type == "greeting":
+            return f"Hi there, I'm {agent or 'your agent'}! Great to meet you. How can I help today?"
+        if prompt_type == "extraction":
+            data = _extraction_payload(prompt)
+            return f"```json\n{json.dumps(data)}\n```"
+
+        _, data, prose = _AGENTS.get(agent, (None, None, "Happy to help! Could you tell me a bit more?"))
+        if prompt_type == "structured" and data is not None and not malformed:
+            return f"{prose}\n\n```json\n{json.dumps(data)}\n```"
+        return prose
+
+
+def classify_prompt(prompt: str) -> str:
+    """Label a prompt by the call site that produced it"""
+    if "Respond with just one agent type" in prompt:
+        return "routing"
+    if "Return only the JSON" in prompt:
+        return "extraction"
+    if prompt.lstrip().startswith("Generate a friendly"):
+        return "greeting"
+    if "fenced ```json" in prompt:
+        return "structured"
+    return "generation"
+
+
+def parse_latency(spec: str):
+    """Turn a latency spec into a sampler taking a random.Random"""
+    kind, *params = spec.split(':')
+    values = [float(value) for value in params]
+    if kind == 'constant':
+        return lambda rng: values[0]
+    if kind == 'uniform':
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'normal':
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == 'lognormal':
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def _agent_for_prompt(prompt: str):
+    for name in _AGENTS:
+        if re.search(rf"\b{name}\b", prompt[:300]):
+            return name
+    return None
+
+
+def _extraction_payload(prompt: str):
+    if "JSON array of properties" in prompt:
+        return _PROPERTIES
+    if "categorized amenities" in prompt:
+        return _AMENITIES
+    if "structured strategy" in prompt:
+        return _STRATEGY
+    return _CLOSING
+
+
+def _load_canned(path: str) -> dict:
+    if not path:
+        return {}
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,6 @@
+import json
+
+
+def format_jsonl(payload) -> str:
+    """Encode one JSON Lines record"""
+    return json.dumps(payload) + "\n"
@@ -0,0 +1,15 @@
+import os
+
+
+def create_model(model_name: str, api_key: str):
+    """Build the generative model for the configured LLM_BACKEND ("gemini" or "fake")"""
+    backend = os.getenv('LLM_BACKEND', 'gemini').lower()
+    if backend == 'fake':
+        from utils.fake_gemini import FakeGenerativeModel
+        return FakeGenerativeModel(model_name)
+    if backend != 'gemini':
+        raise ValueError(f"Unknown LLM_BACKEND: {backend}")
+
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name)
@@ -0,0 +1,208 @@
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class LLMCache:
+    """Content-addressed cache of LLM responses
+
+    Entries are keyed on a hash of the model name and the final prompt. An
+    in-memory LRU bounded by entry count and bytes sits in front of an
+    optional SQLite table that survives restarts. Only the LRU is guarded by
+    the cache lock: SQLite is read outside it, on per-thread connections, and
+    written in batches by a background writer.
+    """
+
+    def __init__(self, max_entries: int = None, max_bytes: int = None,
+                 sqlite_path: str = None, sqlite_max_entries: int = None):
+        self.max_entries = max_entries or int(os.getenv('LLM_CACHE_MAX_ENTRIES', '2048'))
+        self.max_bytes = max_bytes or int(os.getenv('LLM_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+        self.sqlite_path = sqlite_path if sqlite_path is not None else os.getenv('LLM_CACHE_SQLITE_PATH')
+        self.sqlite_max_entries = sqlite_max_entries or int(os.getenv('LLM_CACHE_SQLITE_MAX_ENTRIES', '100000'))
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "sqlite_hits": 0, "evictions": 0, "writes": 0}
+        self.flush_interval = float(os.getenv('LLM_CACHE_FLUSH_INTERVAL', '0.5'))
+        # Responses waiting for the writer, readable until they are stored
+        self._pending = OrderedDict()
+        self._cond = threading.Condition()
+        self._writer = None
+        self._closed = False
+        self._rows_written = 0
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        if self.sqlite_path:
+            self._open_sqlite()
+
+    @staticmethod
+    def key(model_name: str, prompt: str) -> str:
+        """Cache key for a model and its final prompt"""
+        digest = hashlib.sha256()
+        digest.update(model_name.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(prompt.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached response, promoting SQLite hits into memory"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._entries[key]
+
+        value = self._sqlite_get(key)
+        with self._lock:
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            self._stats["sqlite_hits"] += 1
+            self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: str):
+        """Store a response in memory and, if configured, queue it for SQLite"""
+        with self._lock:
+            self._remember(key, value)
+            self._stats["writes"] += 1
+        if self.sqlite_path:
+            with self._cond:
+                if self._closed:
+                    return
+                self._pending[key] = value
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._run, name="llm-cache-writer", daemon=True)
+                    self._writer.start()
+                    atexit.register(self.close)
+
+    def flush(self) -> int:
+        """Write queued responses to SQLite now and return how many were written"""
+        with self._cond:
+            pending, self._pending = self._pending, OrderedDict()
+        if not pending:
+            return 0
+        now = time.time()
+        with self._connection() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO llm_cache (key, response, created_at) VALUES (?, ?, ?)",
+                ((key, value, now) for key, value in pending.items())
+            )
+            # Prune the oldest rows now and then rather than on every write
+            self._rows_written += len(pending)
+            if self._rows_written >= 1000:
+                self._rows_written = 0
+                connection.execute(
+                    "DELETE FROM llm_cache WHERE key NOT IN "
+                    "(SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT ?)",
+                    (self.sqlite_max_entries,)
+                )
+        return len(pending)
+
+    def close(self):
+        """Stop the writer after a final flush"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._writer is not None:
+            self._writer.join(timeout=self.flush_interval + 5)
+        if self.sqlite_path:
+            self.flush()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+    def clear(self):
+        """Drop all in-memory entries"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> dict:
+        """Hit, miss and eviction counters plus current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["sqlite_enabled"] = bool(self.sqlite_path)
+        with self._cond:
+            stats["sqlite_queued"] = len(self._pending)
+        return stats
+
+    def _remember(self, key: str, value: str):
+        if key in self._entries:
+            self._bytes -= len(self._entries.pop(key))
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = value
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self._stats["evictions"] += 1
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.sqlite_path, timeout=5, check_same_thread=False)
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def _open_sqlite(self):
+        with self._connection() as connection:
+            # WAL lets request threads read while the writer commits
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+
+    def _sqlite_get(self, key: str) -> Optional[str]:
+        if not self.sqlite_path:
+            return None
+        with self._cond:
+            value = self._pending.get(key)
+        if value is not None:
+            return value
+        row = self._connection().execute("SELECT response FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed:
+                    self._cond.wait(self.flush_interval)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # Dropped responses are only a cold cache after a restart; keep serving from memory
+                pass
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """Process-wide LLM response cache, configured from the environment"""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMCache()
+        return _llm_cache
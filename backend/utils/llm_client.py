@@ -0,0 +1,322 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from utils.llm_backend import create_model
+
+logger = logging.getLogger('RealEstateAgent')
+
+# Upstream errors worth retrying, matched by name so google.api_core does not
+# have to be importable (e.g. with the fake backend)
+RETRYABLE_ERRORS = {
+    'ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable', 'InternalServerError',
+    'DeadlineExceeded', 'GatewayTimeout', 'Aborted', 'Unavailable', 'FakeGeminiError'
+}
+
+
+class LLMUnavailableError(Exception):
+    """Base class for fast failures raised by the LLM client"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """The upstream is degraded and calls are being short-circuited"""
+
+
+class LLMTimeoutError(LLMUnavailableError):
+    """A call did not finish within its deadline"""
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an error looks like transient upstream trouble"""
+    if isinstance(error, (LLMTimeoutError, TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+class CircuitBreaker:
+    """Opens after consecutive upstream failures and lets one trial call through after a cool-down"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        return self.acquire() is not None
+
+    def acquire(self):
+        """None if the call must fail fast, otherwise whether it is the half-open trial"""
+        with self._lock:
+            if self.state == 'open':
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return None
+                self.state = 'half_open'
+                self._trial_in_flight = False
+            if self.state == 'half_open':
+                if self._trial_in_flight:
+                    return None
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def end_trial(self):
+        """Release a trial that ended without a verdict (non-retryable error, abandoned stream)"""
+        with self._lock:
+            if self.state == 'half_open':
+                self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == 'half_open' or self._failures >= self.failure_threshold:
+                if self.state != 'open':
+                    logger.warning("LLM circuit breaker opened")
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+class LLMClient:
+    """
+    Process-wide LLM client shared by the orchestrator and every agent
+
+    Wraps a single model object (so the underlying transport is reused) with
+    per-call deadlines, jittered exponential backoff on retryable errors,
+    optional hedged requests and a circuit breaker. It exposes the same
+    generate_content / generate_content_async interface as GenerativeModel.
+    """
+
+    def __init__(self, api_key: str, model_name: str, timeout: float = None, max_retries: int = None,
+                 backoff_base: float = None, backoff_max: float = None, hedge_after: float = None,
+                 max_concurrency: int = None, breaker_failures: int = None, breaker_reset: float = None):
+        self.model_name = model_name
+        self.api_key = api_key
+        # Built on first call, so importing the SDK stays off the startup path
+        self._model = None
+        self._model_lock = threading.Lock()
+        self.timeout = timeout or float(os.getenv('LLM_TIMEOUT_SECONDS', '30'))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('LLM_MAX_RETRIES', '2'))
+        self.backoff_base = backoff_base or float(os.getenv('LLM_BACKOFF_BASE_SECONDS', '0.5'))
+        self.backoff_max = backoff_max or float(os.getenv('LLM_BACKOFF_MAX_SECONDS', '8'))
+        # Send a duplicate request when the first is slower than this; 0 disables hedging
+        self.hedge_after = hedge_after if hedge_after is not None else float(
+            os.getenv('LLM_HEDGE_AFTER_SECONDS', '0'))
+        self.max_concurrency = max_concurrency or int(os.getenv('LLM_MAX_CONCURRENCY', '32'))
+        self.breaker = CircuitBreaker(
+            breaker_failures or int(os.getenv('LLM_BREAKER_FAILURES', '5')),
+            breaker_reset or float(os.getenv('LLM_BREAKER_RESET_SECONDS', '30'))
+        )
+        # Bounded pool: queued calls wait here, and the wait counts against the deadline
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='llm-client')
+        # Keyed weakly, so loops that finish (asyncio.run per test or request) don't accumulate
+        self._async_semaphores = weakref.WeakKeyDictionary()
+        self._stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """The underlying generative model, created on first use"""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = create_model(self.model_name, self.api_key)
+        return self._model
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        """Blocking call with deadline, retries, hedging and circuit breaking"""
+        if stream:
+            return self._stream(prompt, **kwargs)
+        trial = self._check_breaker()
+
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = self._call_with_deadline(prompt, **kwargs)
+                    self.breaker.record_success()
+                    return response
+                except Exception as e:
+                    if not self._should_retry(e, attempt):
+                        raise
+                    time.sleep(self._backoff(attempt))
+        finally:
+            if trial:
+                self.breaker.end_trial()
+
+    async def generate_content_async(self, prompt: str, **kwargs):
+        """Async call with the same deadline, retry, hedging and breaker policy"""
+        trial = self._check_breaker()
+
+        try:
+            async with self._async_semaphore():
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        response = await self._acall_with_deadline(prompt, **kwargs)
+                        self.breaker.record_success()
+                        return response
+                    except Exception as e:
+                        if not self._should_retry(e, attempt):
+                            raise
+                        await asyncio.sleep(self._backoff(attempt))
+        finally:
+            if trial:
+                self.breaker.end_trial()
+
+    def get_stats(self) -> dict:
+        """Call, retry, timeout, hedge and breaker counters"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["breaker_state"] = self.breaker.state
+        return stats
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _check_breaker(self) -> bool:
+        """Fail fast while the breaker is open; returns whether this call is the half-open trial"""
+        self._count("calls")
+        trial = self.breaker.acquire()
+        if trial is None:
+            self._count("short_circuited")
+            raise CircuitOpenError("LLM upstream is degraded, failing fast")
+        return trial
+
+    def _should_retry(self, error: Exception, attempt: int) -> bool:
+        if isinstance(error, LLMTimeoutError):
+            self._count("timeouts")
+        if not is_retryable(error):
+            return False
+        if attempt >= self.max_retries:
+            self._count("failures")
+            self.breaker.record_failure()
+            return False
+        self._count("retries")
+        logger.info(f"Retrying LLM call after {type(error).__name__} (attempt {attempt + 1})")
+        return True
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retrying clients from synchronising
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _with_timeout(self, kwargs: dict, deadline: float) -> dict:
+        """kwargs with the time left as the SDK's transport timeout, so an abandoned call frees its worker"""
+        options = dict(kwargs.get("request_options") or {})
+        remaining = max(deadline - time.monotonic(), 0.001)
+        options["timeout"] = min(options.get("timeout") or remaining, remaining)
+        return dict(kwargs, request_options=options)
+
+    def _call_with_deadline(self, prompt: str, **kwargs):
+        deadline = time.monotonic() + self.timeout
+        pending = {self._executor.submit(self.model.generate_content, prompt, **self._with_timeout(kwargs, deadline))}
+        hedged = self.hedge_after <= 0
+        error = None
+
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining if hedged else min(remaining, self.hedge_after),
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+            if not done and not hedged:
+                hedged = True
+                self._count("hedges")
+                pending.add(self._executor.submit(
+                    self.model.generate_content, prompt, **self._with_timeout(kwargs, deadline)))
+
+        if pending or error is None:
+            for future in pending:
+                future.cancel()
+            raise LLMTimeoutError(f"LLM call exceeded {self.timeout}s deadline")
+        raise error
+
+    async def _acall_with_deadline(self, prompt: str, **kwargs):
+        deadline = time.monotonic() + self.timeout
+        pending = {asyncio.ensure_future(
+            self.model.generate_content_async(prompt, **self._with_timeout(kwargs, deadline)))}
+        hedged = self.hedge_after <= 0
+        error = None
+
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining if hedged else min(remaining, self.hedge_after),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not done and not hedged:
+                    hedged = True
+                    self._count("hedges")
+                    pending.add(asyncio.ensure_future(
+                        self.model.generate_content_async(prompt, **self._with_timeout(kwargs, deadline))))
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if pending or error is None:
+            raise LLMTimeoutError(f"LLM call exceeded {self.timeout}s deadline")
+        raise error
+
+    def _async_semaphore(self) -> asyncio.Semaphore:
+        # Semaphores are bound to the event loop that first uses them
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_semaphores:
+            self._async_semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return self._async_semaphores[loop]
+
+    def _stream(self, prompt: str, **kwargs):
+        # Streams are not retried or hedged; chunks may already have reached the client
+        trial = self._check_breaker()
+        try:
+            for chunk in self.model.generate_content(prompt, stream=True, **kwargs):
+                yield chunk
+            self.breaker.record_success()
+        except Exception as e:
+            if is_retryable(e):
+                self._count("failures")
+                self.breaker.record_failure()
+            raise
+        finally:
+            # Also runs when the consumer stops reading early
+            if trial:
+                self.breaker.end_trial()
+
+
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+
+def get_llm_client(api_key: str, model_name: str) -> LLMClient:
+    """Return the process-wide LLM client, creating it on first use"""
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is None:
+            _llm_client = LLMClient(api_key, model_name)
+        return _llm_client
@@ -1,26 +1,214 @@
+import atexit
+import contextvars
+import json
 import logging
 import os
-from datetime import datetime
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOGGER_NAME = 'RealEstateAgent'
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Request-scoped fields copied onto every record logged while handling a request
+_session_id = contextvars.ContextVar('log_session_id', default=None)
+_agent = contextvars.ContextVar('log_agent', default=None)
+_timings = contextvars.ContextVar('log_timings', default=None)
+
+_configured = False
+_configure_lock = threading.Lock()
+_listener = None
+_stats = {"sampled_out": 0}
+# Guards _stats, and timings dicts shared by a request's parallel plan branches
+_stats_lock = threading.Lock()
+
+
+class SizeAndTimeRotatingFileHandler(RotatingFileHandler):
+    """Rotates when the file reaches max_bytes or is older than interval seconds
+
+    Rotated files are numbered like RotatingFileHandler's and only the newest
+    backup_count are kept.
+    """
+
+    def __init__(self, filename: str, max_bytes: int, interval: float, backup_count: int):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        self.interval = interval
+        self.rollover_at = self._next_rollover()
+
+    def shouldRollover(self, record) -> bool:
+        if self.interval and time.time() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = self._next_rollover()
+
+    def _next_rollover(self) -> float:
+        # A file left over from an earlier run keeps its age
+        try:
+            started = os.path.getmtime(self.baseFilename) if os.path.getsize(self.baseFilename) else time.time()
+        except OSError:
+            started = time.time()
+        return started + self.interval if self.interval else float("inf")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the request fields when present"""
+
+    def format(self, record) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for field in ("session_id", "agent", "timings"):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """Copy the request's session id and agent onto the record on the logging thread"""
+
+    def filter(self, record) -> bool:
+        if getattr(record, "session_id", None) is None:
+            record.session_id = _session_id.get()
+        if getattr(record, "agent", None) is None:
+            record.agent = _agent.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a sample of INFO and DEBUG records while the log queue is backed up
+
+    Warnings and errors, and records logged with extra={"sample": False}, are
+    always kept.
+    """
+
+    def __init__(self, log_queue: queue.Queue, queue_depth: int, rate: float):
+        super().__init__()
+        self.log_queue = log_queue
+        self.queue_depth = queue_depth
+        self.rate = rate
+
+    def filter(self, record) -> bool:
+        if record.levelno >= logging.WARNING or getattr(record, "sample", True) is False:
+            return True
+        if self.log_queue.qsize() < self.queue_depth or random.random() < self.rate:
+            return True
+        with _stats_lock:
+            _stats["sampled_out"] += 1
+        return False
+
+
+def configure_logging():
+    """Configure the process's logging once: a queue on the calling side, handlers on a listener thread
+
+    Request threads only enqueue records; the listener thread formats them and
+    writes to stderr and to a rotating log file.
+    """
+    global _configured, _listener
+    with _configure_lock:
+        if _configured:
+            return
+        level = getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO)
+
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers = [console]
+        if os.getenv('LOG_TO_FILE', 'true').lower() in ('1', 'true', 'yes'):
+            log_dir = os.getenv('LOG_DIR', 'logs')
+            os.makedirs(log_dir, exist_ok=True)
+            file_handler = SizeAndTimeRotatingFileHandler(
+                os.path.join(log_dir, 'real_estate_agent.log'),
+                max_bytes=int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+                interval=float(os.getenv('LOG_ROTATE_SECONDS', '86400')),
+                backup_count=int(os.getenv('LOG_BACKUP_COUNT', '7'))
+            )
+            json_file = os.getenv('LOG_FORMAT', 'json').lower() == 'json'
+            file_handler.setFormatter(JsonFormatter() if json_file else logging.Formatter(TEXT_FORMAT))
+            handlers.append(file_handler)
+
+        log_queue = queue.Queue(-1)
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.addFilter(RequestContextFilter())
+        queue_handler.addFilter(SamplingFilter(
+            log_queue,
+            queue_depth=int(os.getenv('LOG_SAMPLING_QUEUE_DEPTH', '1000')),
+            rate=float(os.getenv('LOG_SAMPLE_RATE', '0.1'))
+        ))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(level)
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        # Flush queued records on shutdown
+        atexit.register(_listener.stop)
+        _configured = True
+
 
 def setup_logger():
-    # Create logs directory if it doesn't exist
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
-    
-    # Configure logging
-    log_filename = f'logs/real_estate_agent_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log'
-    
-    # Set up logging format
-    logging_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    
-    # Configure the root logger
-    logging.basicConfig(
-        level=logging.INFO,
-        format=logging_format,
-        handlers=[
-            logging.FileHandler(log_filename),
-            logging.StreamHandler()
-        ]
-    )
-    
-    return logging.getLogger('RealEstateAgent')
+    """The application logger, configuring logging on first use"""
+    configure_logging()
+    return logging.getLogger(LOGGER_NAME)
+
+
+def get_logging_stats() -> dict:
+    """Records dropped by sampling while the log queue was backed up"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+@contextmanager
+def request_log_context(session_id: str = None, mode: str = None):
+    """Tag records with the session id and log one summary with the request's stage timings"""
+    previous = (_session_id.get(), _agent.get(), _timings.get())
+    timings = {}
+    # Every field is set, so a pooled thread never carries the previous request's agent
+    tokens = (_session_id.set(session_id), _agent.set(None), _timings.set(timings))
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        total_ms = round((time.perf_counter() - start) * 1000, 1)
+        with _stats_lock:
+            summary = dict(timings, total_ms=total_ms)
+        logging.getLogger(LOGGER_NAME).info(
+            f"Request completed in {total_ms} ms ({mode})", extra={"timings": summary, "sample": False}
+        )
+        try:
+            for variable, token in zip((_session_id, _agent, _timings), tokens):
+                variable.reset(token)
+        except ValueError:
+            # Streamed requests may finish in another context than they started; restore by value
+            for variable, value in zip((_session_id, _agent, _timings), previous):
+                variable.set(value)
+
+
+def bind_log_context(session_id: str = None, agent: str = None):
+    """Fill in request fields that become known part way through a request"""
+    if session_id is not None:
+        _session_id.set(session_id)
+    if agent is not None:
+        _agent.set(agent)
+
+
+def record_timing(name: str, seconds: float):
+    """Add a stage duration to the current request's summary record, if there is one"""
+    timings = _timings.get()
+    if timings is not None:
+        key = f"{name}_ms"
+        with _stats_lock:
+            timings[key] = round(timings.get(key, 0) + seconds * 1000, 1)
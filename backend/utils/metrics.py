@@ -0,0 +1,200 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from utils.logger import record_timing
+
+# Minimal Prometheus text-format metrics, kept dependency free. Recording is a
+# dict lookup and an add under a per-metric lock; all formatting happens at
+# scrape time.
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list:
+        with self._lock:
+            values = dict(self._values)
+        return [(self.name, dict(zip(self.labelnames, key)), value) for key, value in values.items()]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (last slot is +Inf), sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> list:
+        with self._lock:
+            values = {key: (list(state[0]), state[1], state[2]) for key, state in self._values.items()}
+        samples = []
+        for key, (counts, total, count) in values.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+
+class MetricsRegistry:
+    """Holds metrics and scrape-time collectors and renders the exposition text"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labelnames: tuple = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets)
+
+    def register_collector(self, key: str, collect):
+        """Register a callable returning (name, type, help, [(labels, value), ...]) tuples
+
+        Collectors run only at scrape time, so they suit values that already
+        live in stats dicts (cache hit counts, breaker state, session counts).
+        Registering again under the same key replaces the previous collector.
+        """
+        with self._lock:
+            self._collectors[key] = collect
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for collect in collectors:
+            for name, metric_type, help, samples in collect():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _get_or_create(self, cls, name: str, help: str, *args):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, help, *args)
+            return self._metrics[name]
+
+
+REGISTRY = MetricsRegistry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "realestate_request_seconds", "End-to-end chat request latency", ("mode",))
+STAGE_SECONDS = REGISTRY.histogram(
+    "realestate_stage_seconds", "Latency of each request stage", ("stage", "agent"))
+LLM_CALLS = REGISTRY.counter(
+    "realestate_llm_calls_total", "LLM calls made, excluding cache hits", ("agent", "mode"))
+LLM_CACHE_HITS = REGISTRY.counter(
+    "realestate_llm_cache_hits_total", "LLM calls answered from the response cache", ("agent",))
+LLM_ERRORS = REGISTRY.counter(
+    "realestate_llm_errors_total", "LLM calls that raised", ("agent", "error"))
+LLM_PROMPT_CHARS = REGISTRY.histogram(
+    "realestate_llm_prompt_chars", "Prompt size in characters", ("agent",), SIZE_BUCKETS)
+LLM_RESPONSE_CHARS = REGISTRY.histogram(
+    "realestate_llm_response_chars", "Response size in characters", ("agent",), SIZE_BUCKETS)
+STRUCTURED_OUTCOMES = REGISTRY.counter(
+    "realestate_structured_output_total", "How agent details were produced", ("agent", "outcome"))
+AGENT_ERRORS = REGISTRY.counter(
+    "realestate_agent_errors_total", "Agent failures, by exception type", ("agent", "error"))
+AGENT_FALLBACKS = REGISTRY.counter(
+    "realestate_agent_fallbacks_total", "Clarification replies sent instead of an agent answer", ("agent",))
+SPECULATION_OUTCOMES = REGISTRY.counter(
+    "realestate_speculation_total", "Speculative agent runs by outcome (hit, wasted, skipped)", ("outcome",))
+SPECULATION_SAVED_SECONDS = REGISTRY.histogram(
+    "realestate_speculation_saved_seconds", "Agent time overlapped with routing on speculation hits")
+BATCH_ITEMS = REGISTRY.counter(
+    "realestate_batch_items_total", "Batch items by outcome (processed, deduplicated, failed)", ("outcome",))
+
+
+@contextmanager
+def stage_timer(stage: str, agent: str):
+    """Time a request stage into STAGE_SECONDS and the request's log summary"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage, agent=agent)
+        record_timing(f"{agent}.{stage}", elapsed)
+
+
+def render_metrics() -> str:
+    """Prometheus exposition text for the process-wide registry"""
+    return REGISTRY.render()
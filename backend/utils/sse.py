@@ -0,0 +1,6 @@
+import json
+
+
+def format_sse(event: str, payload) -> str:
+    """Encode one server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
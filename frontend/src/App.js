@@ -18,6 +18,7 @@ const theme = createTheme({
 function App() {
   const [messages, setMessages] = useState([]);
   const [loading, setLoading] = useState(false);
+  const [sessionId, setSessionId] = useState(null);
 
   const handleSendMessage = async (message) => {
     setLoading(true);
@@ -31,10 +32,13 @@ function App() {
       const response = await fetch('http://localhost:5000/chat', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ message }),
+        body: JSON.stringify({ message, session_id: sessionId }),
       });
 
       const data = await response.json();
+      if (data.session_id) {
+        setSessionId(data.session_id);
+      }
 
       if (data.conversation) {
         let previousAgent = null;
@@ -50,8 +54,11 @@ function App() {
             id: Date.now()
           }]);
 
-          // Simulate typing time
-          await new Promise(resolve => setTimeout(resolve, Math.min(2000, 500 + Math.random() * 1000)));
+          // Simulate typing time, honouring the server's greeting pause hint
+          const typingDelay = msg.greeting_delay
+            ? msg.greeting_delay * 1000
+            : Math.min(2000, 500 + Math.random() * 1000);
+          await new Promise(resolve => setTimeout(resolve, typingDelay));
 
           // Remove typing indicator
           setMessages(prev => [